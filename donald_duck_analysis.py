@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis of the results of the Donald Duck Holiday Game
+Computes the tables of the publication from a results file of any size:
+winner shares by character and starting position, the distribution of
+the number of rounds played, shortcut and event frequencies and the
+lead changes. The results are memory-mapped (a .txt file is converted
+once into a .npy file next to it) and read in chunks of CHUNK_ROWS
+runs, each folded into all tables at once with a few vectorised
+operations, so the file is read a single time, memory use does not
+depend on the number of runs and no run becomes a Python object.
+This code has been published under the GNU GPLv3 license
+"""
+import argparse
+import os
+from itertools import islice
+
+import numpy as np
+
+from donald_duck_results import CHARACTER_LABELS, CHARACTER_NAMES, \
+    RESULT_COLUMNS, RESULT_DTYPE, NpyAppender, load_pyarrow, read_results, \
+    results_format
+
+CHUNK_ROWS = 1000000 # simulation runs read and folded in at once
+MAX_PLAYERS = 5 # starting positions 1 to 5, 0 if the character did not play
+
+# Per-character counters of the frequency table
+EVENT_COLUMNS = ("NumberOfShortcuts", "NumberOfEventSquaresVisited", \
+                 "NumberOfEventCardsDrawn", "NumberSquaresRandom", \
+                 "TurnsWaiting")
+# Game counters of the frequency table
+CARD_COLUMNS = ("NumberOfCampingCards", "NumberOfRouteMaps", \
+                "NumberOfCameras", "NumberOfPostcards")
+WINNER_NAMES = [name.encode() for name in CHARACTER_NAMES]
+
+def binary_path(path):
+    """Return the path of the .npy file converted from a text results file"""
+    return path + ".npy"
+
+def convert_results(path, binary=None, chunk_rows=CHUNK_ROWS):
+    """Convert a text results file into a .npy file, chunk by chunk"""
+    binary = binary or binary_path(path)
+    appender = NpyAppender(binary + ".tmp", RESULT_DTYPE)
+    with open(path) as game_results:
+        next(game_results)
+        while True:
+            lines = list(islice(game_results, chunk_rows))
+            if not lines:
+                break
+            appender.write(np.loadtxt(lines, dtype=RESULT_DTYPE, \
+                                      delimiter=";", comments=None, \
+                                      usecols=range(len(RESULT_COLUMNS)), \
+                                      ndmin=1))
+    appender.close()
+    os.replace(binary + ".tmp", binary)
+    return binary
+
+def open_results(path, file_format=None):
+    """Return the results as a memory-mapped record array
+
+    A text file is converted into a .npy file next to it first, unless
+    that is newer than the text file. SQLite results are read into
+    memory.
+    """
+    file_format = file_format or results_format(path)
+    if file_format == "csv":
+        binary = binary_path(path)
+        if not os.path.exists(binary) or \
+           os.path.getmtime(binary) < os.path.getmtime(path):
+            convert_results(path, binary)
+        path, file_format = binary, "npy"
+    if file_format == "arrow":
+        return ArrowRecords(path)
+    return read_results(path, file_format)
+
+def winner_indices(names):
+    """Return the character index of every winner name"""
+    winners = np.full(len(names), -1)
+    for index, name in enumerate(WINNER_NAMES):
+        winners[names == name] = index
+    if (winners < 0).any():
+        raise ValueError("Unknown winner name in the results")
+    return winners
+
+def add_counts(counts, other):
+    """Add two histograms of unit bins, growing the shorter one"""
+    if len(counts) < len(other):
+        counts, other = other, counts
+    counts = counts.copy()
+    counts[:len(other)] += other
+    return counts
+
+def quantile(counts, probability):
+    """Return a quantile read from a histogram of unit bins"""
+    return int(np.argmax(np.cumsum(counts) >= probability * counts.sum()))
+
+
+class ArrowRecords:
+    """Slice a memory-mapped Arrow results file into record arrays"""
+    def __init__(self, path):
+        pyarrow = load_pyarrow("Reading")
+        # The columns point into the mapped file, which stays open
+        self.source = pyarrow.memory_map(path)
+        self.table = pyarrow.ipc.open_file(self.source).read_all()
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __getitem__(self, rows):
+        table = self.table.slice(rows.start, rows.stop - rows.start)
+        records = np.empty(table.num_rows, dtype=RESULT_DTYPE)
+        for name in RESULT_COLUMNS:
+            records[name] = table.column(name).to_numpy()
+        return records
+
+
+class ResultsAnalysis:
+    """Tables of the publication, folded in chunk by chunk"""
+    def __init__(self):
+        number_of_characters = len(CHARACTER_NAMES)
+        self.games = 0
+        # Games played and won by character and starting position
+        self.played = np.zeros((number_of_characters, MAX_PLAYERS + 1), \
+                               dtype=np.int64)
+        self.won = np.zeros_like(self.played)
+        self.rounds = np.zeros(0, dtype=np.int64)
+        # Sums and games with at least one, by counter and character
+        self.event_totals = np.zeros((len(EVENT_COLUMNS), \
+                                      number_of_characters), dtype=np.int64)
+        self.event_games = np.zeros_like(self.event_totals)
+        self.card_totals = np.zeros(len(CARD_COLUMNS), dtype=np.int64)
+        self.card_games = np.zeros_like(self.card_totals)
+        self.leaders = np.zeros(0, dtype=np.int64)
+        self.turns_led_winner = np.zeros(0, dtype=np.int64)
+
+    def update(self, records):
+        """Fold a chunk of results records in"""
+        if not len(records):
+            return
+        self.games += len(records)
+        winners = winner_indices(records["WinnerName"])
+        for character, label in enumerate(CHARACTER_LABELS):
+            positions = np.clip(records["StartingPosition" + label], 0, \
+                                MAX_PLAYERS)
+            self.played[character] += np.bincount(positions, \
+                minlength=MAX_PLAYERS + 1)
+            self.won[character] += np.bincount(positions[winners == \
+                character], minlength=MAX_PLAYERS + 1)
+            for row, name in enumerate(EVENT_COLUMNS):
+                values = records[name + label]
+                self.event_totals[row, character] += values.sum(dtype=np.int64)
+                self.event_games[row, character] += np.count_nonzero(values)
+        for row, name in enumerate(CARD_COLUMNS):
+            self.card_totals[row] += records[name].sum(dtype=np.int64)
+            self.card_games[row] += np.count_nonzero(records[name])
+        self.rounds = add_counts(self.rounds, \
+            np.bincount(records["NumberOfRoundsPlayed"]))
+        self.leaders = add_counts(self.leaders, \
+            np.bincount(records["NumberOfLeaders"]))
+        self.turns_led_winner = add_counts(self.turns_led_winner, \
+            np.bincount(records["TurnsLedWinner"]))
+
+    def merge(self, other):
+        """Add the tables of another analysis"""
+        self.games += other.games
+        for name in ("played", "won", "event_totals", "event_games", \
+                     "card_totals", "card_games", "rounds", "leaders", \
+                     "turns_led_winner"):
+            setattr(self, name, add_counts(getattr(self, name), \
+                                           getattr(other, name)))
+
+    def winner_shares(self):
+        """Return the win share of every character and starting position
+
+        Column 0 is the overall share of a character over the games it
+        played; games with a starting position 0 are not counted there.
+        Shares of positions a character never started from are NaN.
+        """
+        shares = np.full(self.played.shape, np.nan)
+        np.divide(self.won, self.played, out=shares, where=self.played > 0)
+        played = self.played[:, 1:].sum(axis=1)
+        np.divide(self.won[:, 1:].sum(axis=1), played, out=shares[:, 0], \
+                  where=played > 0)
+        return shares
+
+    def report(self):
+        """Return the tables as text"""
+        lines = ["{} games".format(self.games), "", \
+                 "Winner share by starting position"]
+        lines.append("{:20}".format("") + "".join("{:>9}".format(heading) \
+            for heading in ["all"] + list(range(1, MAX_PLAYERS + 1))))
+        for name, shares in zip(CHARACTER_NAMES, self.winner_shares()):
+            lines.append("{:20}".format(name) + "".join("{:>9}".format( \
+                "n/a") if np.isnan(share) else "{:9.4f}".format(share) \
+                for share in shares))
+        played = np.maximum(self.played[:, 1:].sum(axis=1), 1)
+        lines += ["", "Mean per game played (share of games with any)"]
+        lines.append("{:30}".format("") + "".join("{:>16}".format(label) \
+                                                  for label in \
+                                                  CHARACTER_LABELS))
+        for name, totals, counts in zip(EVENT_COLUMNS, self.event_totals, \
+                                        self.event_games):
+            lines.append("{:30}".format(name) + "".join( \
+                "{:8.3f} ({:5.3f})".format(total / games, count / games) \
+                for total, count, games in zip(totals, counts, played)))
+        games = max(self.games, 1)
+        lines += ["", "Mean per game (share of games with any)"]
+        for name, total, count in zip(CARD_COLUMNS, self.card_totals, \
+                                      self.card_games):
+            lines.append("{:30}{:8.3f} ({:5.3f})".format(name, total / games, \
+                                                         count / games))
+        for title, counts in (("NumberOfRoundsPlayed", self.rounds), \
+                              ("TurnsLedWinner", self.turns_led_winner)):
+            lines += ["", "{}: mean {:.3f}, quantiles 5% {}, 25% {}, " \
+                      "50% {}, 75% {}, 95% {}, max {}".format(title, \
+                      (np.arange(len(counts)) * counts).sum() / games, \
+                      *[quantile(counts, probability) for probability in \
+                        (0.05, 0.25, 0.5, 0.75, 0.95)], len(counts) - 1)]
+        lines += ["", "NumberOfLeaders: share of games"]
+        for leaders, count in enumerate(self.leaders):
+            if count:
+                lines.append("{:30}{:8.4f}".format(str(leaders), \
+                                                   count / games))
+        return "\n".join(lines)
+
+
+def analyse(records, chunk_rows=CHUNK_ROWS):
+    """Compute the tables of a (memory-mapped) results record array"""
+    analysis = ResultsAnalysis()
+    for start in range(0, len(records), chunk_rows):
+        analysis.update(records[start:start + chunk_rows])
+    return analysis
+
+def main(argv=None):
+    """Print the tables of a results file"""
+    parser = argparse.ArgumentParser(description="Tables of the results of " \
+                                     "the Donald Duck Holiday Game")
+    parser.add_argument("results", nargs="?", default="GAMERESULTS.txt", \
+                        help="results file: .txt (text), .npy, .arrow or " \
+                        ".sqlite")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, \
+                        help="simulation runs read at once")
+    arguments = parser.parse_args(argv)
+    print(analyse(open_results(arguments.results), \
+                  arguments.chunk_rows).report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized batch engine for the Donald Duck Holiday Game
+Plays many games in lockstep: the state of every game (positions,
+waiting turns, shortcut state, deck order and event card cursor) is
+held in NumPy arrays, and all unfinished games advance one player turn
+at a time with masked array operations. The rules are identical to
+the scalar simulation in donald_duck_holiday_game.py, including its
+quirks; the random numbers differ, so results agree statistically.
+This code has been published under the GNU GPLv3 license
+"""
+import sys
+
+import numpy as np
+
+from donald_duck_board import BACK_TO_START, GO_TO, MOVE, \
+    NEXT_EVENT_CARD_SQUARE, RAIN, STUCK, THROW_BACK, THROW_FORWARD, WAIT, \
+    load_board
+from donald_duck_results import CHARACTER_LABELS, CHARACTER_NAMES, \
+    RESULT_COLUMNS, ResultsWriter
+from donald_duck_stats import GameStatistics
+
+NUMBER_OF_SIMULATION_RUNS = 100000
+NUMBER_OF_PLAYERS = 5 # between 2 and 5 players
+CHUNK_SIZE = 100000 # games simulated in lockstep
+RESULTS_FILE = "GAMERESULTS.txt" # .txt (text), .npy, .arrow, .sqlite or None
+STATISTICS_FILE = None # e.g. "statistics.npz" to save the aggregate metrics
+
+# Board and event card rules, see donald_duck_board.json
+BOARD = load_board()
+# Transport modes in the order of CHARACTER_NAMES
+TRANSPORT_MODES = BOARD.transport_modes
+FINISH_SQUARE = BOARD.finish_square
+WAIT_FOREVER = sys.maxsize
+NUMBER_OF_EVENT_CARDS = BOARD.number_of_event_cards
+
+def _mode_mask(modes):
+    """Boolean lookup table: character id -> transport mode in modes"""
+    return np.array([mode in modes for mode in TRANSPORT_MODES])
+
+# Event card tables, indexed by card number (and character id)
+CARD_RULE = np.array(BOARD.card_rule)
+CARD_APPLIES = np.array([_mode_mask(modes) for modes in BOARD.card_modes])
+CARD_WAIT = np.where(CARD_APPLIES & (CARD_RULE == WAIT)[:, np.newaxis], \
+                     np.array(BOARD.card_wait)[:, np.newaxis], 0)
+# Cards that move the player, and cards that draw again on a card square
+CARD_MOVES = np.array(BOARD.card_moves)
+CARD_DRAWS_AGAIN = np.array(BOARD.card_draws_again)
+CARD_SQUARE = np.array(BOARD.card_square)
+CARD_FROM_SQUARE = np.array(BOARD.card_from_square)
+CARD_SQUARES = np.array(BOARD.card_squares)
+MOVED_BY_RAIN = _mode_mask(BOARD.rain_modes)
+
+# Square tables, indexed by position (padded beyond the finish square)
+BOARD_SIZE = BOARD.board_size
+IS_EVENT_CARD_SQUARE = np.array(BOARD.is_event_card_square)
+IS_EVENT_SQUARE = np.array(BOARD.is_event_square)
+NEXT_EVENT_CARD = np.array(BOARD.next_event_card_square)
+SQUARE_RULE = np.array(BOARD.square_rule)
+SQUARE_APPLIES = np.array([_mode_mask(modes) for modes in BOARD.square_modes])
+SQUARE_WAIT = np.where(SQUARE_RULE == WAIT, BOARD.square_wait, 0)
+SQUARE_MOVE = np.array(BOARD.square_move)
+SHORTCUT_APPLIES = [_mode_mask(shortcut.modes) for shortcut in BOARD.shortcuts]
+
+# State arrays of a batch; the game is always the last axis
+STATE_ARRAYS = ("character", "active_card_deck", "event_card_id", \
+    "position_on_board", "number_of_turns_waiting", "shortcut_position", \
+    "number_of_turns_leading", "player_has_led", \
+    "number_of_shortcuts_taken", "number_of_event_squares_visited", \
+    "number_of_event_cards_drawn", "number_of_random_squares", \
+    "number_camping_cards_collected", "number_maps_collected", \
+    "turns_waiting", "starting_position", "allowed_to_start", \
+    "overall_starting_position", "round_id", "winner", \
+    "number_of_route_maps", "number_of_cameras", "number_of_postcards", \
+    "number_of_coffees", "number_of_dishes_washed", "number_of_tunnels", \
+    "number_of_camping_cards")
+
+
+class BatchGames:
+    """Define the state of a batch of games played in lockstep"""
+    def __init__(self, number_of_games, number_of_players, rng):
+        self.number_of_games = number_of_games
+        self.number_of_players = number_of_players
+        self.rng = rng
+        games = number_of_games
+        shape = (number_of_players, games)
+
+        # Random starting order and shuffled event card deck per game
+        self.character = np.argsort(rng.random((len(CHARACTER_NAMES), games)), \
+                                    axis=0)[:number_of_players]
+        self.active_card_deck = np.argsort( \
+            rng.random((NUMBER_OF_EVENT_CARDS, games)), axis=0) + 1
+        self.event_card_id = np.zeros(games, dtype=np.int64)
+
+        # Player state, one row per seat
+        self.position_on_board = np.zeros(shape, dtype=np.int64)
+        self.number_of_turns_waiting = np.zeros(shape, dtype=np.int64)
+        self.shortcut_position = np.zeros(shape, dtype=np.int64)
+        self.number_of_turns_leading = np.zeros(shape, dtype=np.int64)
+        self.player_has_led = np.zeros(shape, dtype=bool)
+        self.number_of_shortcuts_taken = np.zeros(shape, dtype=np.int64)
+        self.number_of_event_squares_visited = np.zeros(shape, dtype=np.int64)
+        self.number_of_event_cards_drawn = np.zeros(shape, dtype=np.int64)
+        self.number_of_random_squares = np.zeros(shape, dtype=np.int64)
+        self.number_camping_cards_collected = np.zeros(shape, dtype=np.int64)
+        self.number_maps_collected = np.zeros(shape, dtype=np.int64)
+        self.turns_waiting = np.zeros(shape, dtype=np.int64)
+        self.starting_position = np.zeros(shape, dtype=np.int64)
+
+        # Game state and metrics
+        self.allowed_to_start = np.zeros(games, dtype=bool)
+        self.overall_starting_position = np.zeros(games, dtype=np.int64)
+        self.round_id = np.zeros(games, dtype=np.int64)
+        self.winner = np.full(games, -1, dtype=np.int64)
+        self.number_of_route_maps = np.zeros(games, dtype=np.int64)
+        self.number_of_cameras = np.zeros(games, dtype=np.int64)
+        self.number_of_postcards = np.zeros(games, dtype=np.int64)
+        self.number_of_coffees = np.zeros(games, dtype=np.int64)
+        self.number_of_dishes_washed = np.zeros(games, dtype=np.int64)
+        self.number_of_tunnels = np.zeros(games, dtype=np.int64)
+        self.number_of_camping_cards = np.zeros(games, dtype=np.int64)
+
+        # Finished games are moved out of the working arrays into final
+        self.game_index = np.arange(games)
+        self.final = {name: getattr(self, name).copy() for name in STATE_ARRAYS}
+
+    def dicethrow(self, size):
+        """Throw a die for each of size players"""
+        return self.rng.integers(1, 7, size=size)
+
+    def draweventcard(self, seats, games):
+        """Draw event cards for one player in each of the given games"""
+        while games.size:
+            event_card_id = (self.event_card_id[games] + 1) % \
+                            NUMBER_OF_EVENT_CARDS
+            self.event_card_id[games] = event_card_id
+            card = self.active_card_deck[event_card_id, games]
+            character = self.character[seats, games]
+            position = self.position_on_board[seats, games]
+            rule = CARD_RULE[card]
+
+            # Cards for some transport modes, from some square or once
+            applies = CARD_APPLIES[card, character] & \
+                      (position >= CARD_FROM_SQUARE[card])
+            once = {}
+            for number, attribute in enumerate(BOARD.card_once):
+                if attribute is not None:
+                    once[number] = card == number
+                    applies &= ~once[number] | \
+                        (getattr(self, attribute)[seats, games] == 0)
+            self.number_of_event_cards_drawn[seats, games] += applies
+            for number, hit in once.items():
+                getattr(self, BOARD.card_once[number])[seats, games] += \
+                    applies & hit
+            for number, metric in enumerate(BOARD.card_metric):
+                if metric is not None:
+                    getattr(self, metric)[games] += applies & (card == number)
+
+            # Wait a number of turns
+            waiting = CARD_WAIT[card, character]
+            hit = waiting > 0
+            self.number_of_turns_waiting[seats[hit], games[hit]] = waiting[hit]
+
+            # Back to start, go to a square, ride to the next card square,
+            # throw again forward or back
+            dice_value = self.dicethrow(games.size)
+            next_position = np.where(rule == BACK_TO_START, 0, position)
+            next_position = np.where(rule == GO_TO, CARD_SQUARE[card], \
+                                     next_position)
+            next_position = np.where(rule == NEXT_EVENT_CARD_SQUARE, \
+                NEXT_EVENT_CARD[position], next_position)
+            next_position = np.where(rule == THROW_FORWARD, \
+                                     position + dice_value, next_position)
+            next_position = np.where(rule == THROW_BACK, \
+                np.maximum(0, position - dice_value), next_position)
+            moved = np.where(rule == THROW_BACK, -dice_value, \
+                             next_position - position)
+            hit = applies & CARD_MOVES[card]
+            self.position_on_board[seats[hit], games[hit]] = next_position[hit]
+            self.number_of_random_squares[seats[hit], games[hit]] += moved[hit]
+            draw_again = hit & CARD_DRAWS_AGAIN[card] & \
+                         IS_EVENT_CARD_SQUARE[next_position]
+
+            # Rain: every player of the rain modes moves back
+            hit = rule == RAIN
+            if hit.any():
+                self.rain(games[hit], CARD_SQUARES[card[hit]])
+                draw_again[hit] = MOVED_BY_RAIN[character[hit]] & \
+                    CARD_DRAWS_AGAIN[card[hit]] & IS_EVENT_CARD_SQUARE[ \
+                    self.position_on_board[seats[hit], games[hit]]]
+
+            seats, games = seats[draw_again], games[draw_again]
+
+    def rain(self, games, squares):
+        """Move every player moved by rain back the given squares"""
+        wind = MOVED_BY_RAIN[self.character[:, games]]
+        position = np.maximum(self.position_on_board[:, games] - squares, 0)
+
+        # Landing on a move square may draw a card, so those games go seat
+        # by seat
+        chased = (wind & (SQUARE_RULE[position] == MOVE)).any(axis=0)
+        for seat in range(self.number_of_players):
+            index = np.flatnonzero(chased & wind[seat])
+            if index.size:
+                self.rain_on_players(np.full(index.size, seat), \
+                                     games[index], squares[index])
+
+        # All other players move back at once
+        seats, index = np.nonzero(wind & ~chased)
+        if seats.size:
+            self.rain_on_players(seats, games[index], squares[index])
+
+    def rain_on_players(self, seats, games, squares):
+        """Move the given players back the given squares"""
+        position = np.maximum(self.position_on_board[seats, games] - squares, 0)
+        self.position_on_board[seats, games] = position
+        self.number_of_random_squares[seats, games] -= squares
+
+        on_event_square = IS_EVENT_SQUARE[position]
+        if on_event_square.any():
+            s, g = seats[on_event_square], games[on_event_square]
+            self.eventsquare(s, g)
+
+            # Correction in counter
+            position = self.position_on_board[s, g]
+            for square in BOARD.stuck_squares:
+                metric = BOARD.square_metric[square]
+                if metric is not None:
+                    np.subtract.at(getattr(self, metric), \
+                                   g[position == square], 1)
+
+        #End waiting when moved from event square
+        moved_off = ~IS_EVENT_SQUARE[self.position_on_board[seats, games]]
+        self.number_of_turns_waiting[seats[moved_off], games[moved_off]] = 0
+
+    def eventsquare(self, seats, games):
+        """Visit event square for the given players
+
+        A game may appear more than once, but then none of its players
+        may be on a move square.
+        """
+        position = self.position_on_board[seats, games]
+        waiting = self.number_of_turns_waiting[seats, games]
+        character = self.character[seats, games]
+        visited = np.zeros(games.size, dtype=np.int64)
+        rule = SQUARE_RULE[position]
+
+        # Move squares (chased away from money bin), then draw a card on
+        # an event card square. Only later squares are visited after that.
+        chased = rule == MOVE
+        eligible = True
+        if chased.any():
+            s, g = seats[chased], games[chased]
+            square = position[chased]
+            self.position_on_board[s, g] = square + SQUARE_MOVE[square]
+            visited += chased
+            draw = IS_EVENT_CARD_SQUARE[self.position_on_board[s, g]]
+            self.draweventcard(s[draw], g[draw])
+            eligible = np.ones(games.size, dtype=bool)
+            eligible[chased] = self.position_on_board[s, g] > square
+            position = np.where(chased, self.position_on_board[seats, games], \
+                                position)
+            waiting = np.where(chased, \
+                self.number_of_turns_waiting[seats, games], waiting)
+            rule = SQUARE_RULE[position]
+
+        # Waiting squares
+        applied = eligible & (rule == WAIT) & (waiting == 0) & \
+                  SQUARE_APPLIES[position, character]
+        self.number_of_turns_waiting[seats[applied], games[applied]] = \
+            SQUARE_WAIT[position[applied]]
+
+        # Stuck squares (wash dishes, lost in dark tunnel)
+        stuck = eligible & (rule == STUCK)
+        self.number_of_turns_waiting[seats[stuck], games[stuck]] = WAIT_FOREVER
+        applied |= stuck
+
+        # Back to start squares (forgot camping card), once per player
+        back = eligible & (rule == BACK_TO_START)
+        for square in np.unique(position[back]):
+            hit = back & (position == square)
+            once = BOARD.square_once[square]
+            if once is not None:
+                hit &= getattr(self, once)[seats, games] == 0
+                getattr(self, once)[seats[hit], games[hit]] += 1
+            self.position_on_board[seats[hit], games[hit]] = 0
+            applied |= hit
+
+        # Metrics of the squares applied
+        for square in BOARD.event_squares:
+            metric = BOARD.square_metric[square]
+            if metric is not None:
+                np.add.at(getattr(self, metric), \
+                          games[applied & (position == square)], 1)
+
+        visited += applied
+        self.number_of_event_squares_visited[seats, games] += visited
+
+    def play_turn(self, seat):
+        """Let the player in the given seat take a turn in every unfinished game"""
+        active = self.winner < 0
+        size = active.size
+        if seat == 0:
+            self.round_id += active
+            self.overall_starting_position[active] = 0
+
+        # Starting order bookkeeping and throwing 6 to start
+        allowed = active & self.allowed_to_start
+        self.overall_starting_position += allowed
+        starting_position = self.starting_position[seat]
+        starting_position[allowed] = self.overall_starting_position[allowed]
+        six = active & ~self.allowed_to_start & (self.dicethrow(size) == 6)
+        starting_position[six] = 1
+        self.overall_starting_position[six] = 1
+        self.allowed_to_start |= six
+
+        moving = active & self.allowed_to_start & \
+                 (self.number_of_turns_waiting[seat] == 0)
+        dice_value = np.where(moving, self.dicethrow(size), 0)
+
+        position = self.position_on_board[seat]
+        shortcut = self.shortcut_position[seat]
+        character = self.character[seat]
+        target = position + dice_value
+        next_position = target.copy()
+        next_shortcut = shortcut.copy()
+
+        # Short-cuts via bike lane and highway
+        remaining = active.copy()
+        for lane, modes in zip(BOARD.shortcuts, SHORTCUT_APPLIES):
+            enter = remaining & (position == lane.entry) & (shortcut == 0) & \
+                    (target != lane.avoid_square) & modes[character]
+            self.number_of_shortcuts_taken[seat] += enter
+            stay = enter & (dice_value < lane.length)
+            next_shortcut[stay] = dice_value[stay]
+            next_position[stay] = lane.entry
+            leave = enter & ~stay
+            next_position[leave] = lane.exit_square + dice_value[leave] - \
+                                   lane.length
+            next_shortcut[leave] = 0
+            remaining &= ~enter
+
+            inside = remaining & (position == lane.entry) & (shortcut > 0)
+            stay = inside & (dice_value <= lane.length - 1 - shortcut)
+            next_shortcut[stay] = shortcut[stay] + dice_value[stay]
+            next_position[stay] = lane.entry
+            leave = inside & ~stay
+            next_position[leave] = lane.exit_square - \
+                (lane.length - shortcut[leave]) + dice_value[leave]
+            next_shortcut[leave] = 0
+            remaining &= ~inside
+
+        # If not ending exactly at the finish square, bounce back
+        bounce = remaining & (target > FINISH_SQUARE) & BOARD.bounce_back
+        next_position[bounce] = 2 * FINISH_SQUARE - target[bounce]
+
+        # END OF GAME: winners skip the rest of their turn
+        won = remaining & ~bounce & (target >= FINISH_SQUARE)
+        self.winner[won] = seat
+        self.position_on_board[seat] = next_position
+        self.shortcut_position[seat] = next_shortcut
+        active &= ~won
+
+        # RANDOM EVENT CARDS
+        games = np.flatnonzero(active & IS_EVENT_CARD_SQUARE[next_position] & \
+                               (self.number_of_turns_waiting[seat] == 0))
+        if games.size:
+            self.draweventcard(np.full(games.size, seat), games)
+
+        # EVENT SQUARES
+        games = np.flatnonzero(active & \
+                               IS_EVENT_SQUARE[self.position_on_board[seat]])
+        if games.size:
+            self.eventsquare(np.full(games.size, seat), games)
+
+            # Wash dishes until throwing 6, then move on; leave tunnel
+            # only when throwing 2
+            for square in BOARD.stuck_squares:
+                g = games[self.position_on_board[seat, games] == square]
+                g = g[self.dicethrow(g.size) == BOARD.escape_throw[square]]
+                self.number_of_turns_waiting[seat, g] = 0
+                if BOARD.escape_square[square] < 0:
+                    self.position_on_board[seat, g] += self.dicethrow(g.size)
+                else:
+                    self.position_on_board[seat, g] = \
+                        BOARD.escape_square[square]
+
+        # Reduce waiting time
+        waiting = self.number_of_turns_waiting[seat]
+        waiting -= active & (waiting > 0)
+        self.turns_waiting[seat] += active & (waiting > 0)
+
+        # Check if player is currently in the lead
+        positions = self.position_on_board
+        overtaken = positions >= positions[seat]
+        overtaken[seat] = False
+        leading = self.number_of_turns_leading[seat]
+        leading += active
+        leading[active & overtaken.any(axis=0)] = 0
+        self.player_has_led[seat] |= leading > 0
+
+    def retire(self, finished):
+        """Move finished games from the working arrays into final"""
+        game_index = self.game_index
+        for name in STATE_ARRAYS:
+            values = getattr(self, name)
+            self.final[name][..., game_index[finished]] = values[..., finished]
+            setattr(self, name, values[..., ~finished])
+        self.game_index = game_index[~finished]
+
+    def play(self):
+        """Play all games until every game has a winner"""
+        seat = 0
+        while self.game_index.size:
+            self.play_turn(seat)
+            seat = (seat + 1) % self.number_of_players
+
+            # Compact the working arrays once a quarter of the games ended
+            finished = self.winner >= 0
+            if 4 * np.count_nonzero(finished) >= finished.size:
+                self.retire(finished)
+
+    def per_character(self, values):
+        """Scatter per-seat values into per-character columns"""
+        columns = np.zeros((len(CHARACTER_NAMES), self.number_of_games), \
+                           dtype=np.int64)
+        games = np.arange(self.number_of_games)
+        for seat in range(self.number_of_players):
+            columns[self.final["character"][seat], games] = values[seat]
+        return columns
+
+    def results(self, first_simulation_run=1, winners_so_far=None):
+        """Return game results as columns named as in GAMERESULTS.txt"""
+        final = self.final
+        games = np.arange(self.number_of_games)
+        winner_seat = final["winner"]
+        winner = final["character"][winner_seat, games]
+        won = np.zeros((self.number_of_games, len(CHARACTER_NAMES)), \
+                       dtype=np.int64)
+        won[games, winner] = 1
+        winners = np.cumsum(won, axis=0).T
+        if winners_so_far is not None:
+            winners += np.asarray(winners_so_far)[:, np.newaxis]
+
+        columns = {"SimulationRunID": games + first_simulation_run, \
+                   "NumberOfRoundsPlayed": final["round_id"], \
+                   "WinnerName": np.array(CHARACTER_NAMES)[winner]}
+        per_character = ( \
+            ("Winner", winners), \
+            ("TurnsWaiting", self.per_character(final["turns_waiting"])))
+        for prefix, values in per_character:
+            for label, column in zip(CHARACTER_LABELS, values):
+                columns[prefix + label] = column
+        columns["NumberOfCampingCards"] = final["number_of_camping_cards"]
+        columns["NumberOfRouteMaps"] = final["number_of_route_maps"]
+        columns["NumberOfCameras"] = final["number_of_cameras"]
+        columns["NumberOfPostcards"] = final["number_of_postcards"]
+        columns["TurnsLedWinner"] = \
+            final["number_of_turns_leading"][winner_seat, games]
+        columns["NumberOfLeaders"] = \
+            final["player_has_led"].sum(axis=0, dtype=np.int64)
+        per_character = ( \
+            ("NumberOfShortcuts", "number_of_shortcuts_taken"), \
+            ("StartingPosition", "starting_position"), \
+            ("NumberOfEventSquaresVisited", \
+             "number_of_event_squares_visited"), \
+            ("NumberOfEventCardsDrawn", "number_of_event_cards_drawn"), \
+            ("NumberSquaresRandom", "number_of_random_squares"))
+        for prefix, name in per_character:
+            for label, column in zip(CHARACTER_LABELS, \
+                                     self.per_character(final[name])):
+                columns[prefix + label] = column
+        columns["NumberOfCoffees"] = final["number_of_coffees"]
+        columns["NumberOfDishesWashed"] = final["number_of_dishes_washed"]
+        columns["NumberOfTunnels"] = final["number_of_tunnels"]
+        return columns
+
+
+def iterate_batches(number_of_games, number_of_players, seed=None, \
+                    chunk_size=CHUNK_SIZE):
+    """Simulate games in chunks and yield the result columns per chunk"""
+    if number_of_players < 2 or number_of_players > len(CHARACTER_NAMES):
+        raise ValueError("Please select a number of players between 2 and 5")
+    rng = np.random.default_rng(seed)
+    winners_so_far = np.zeros(len(CHARACTER_NAMES), dtype=np.int64)
+    first_simulation_run = 1
+    while first_simulation_run <= number_of_games:
+        games = min(chunk_size, number_of_games - first_simulation_run + 1)
+        batch = BatchGames(games, number_of_players, rng)
+        batch.play()
+        columns = batch.results(first_simulation_run, winners_so_far)
+        winners_so_far = np.array([columns["Winner" + label][-1] \
+                                   for label in CHARACTER_LABELS])
+        first_simulation_run += games
+        yield columns
+
+
+def simulate_batch(number_of_games, number_of_players, seed=None, \
+                   chunk_size=CHUNK_SIZE):
+    """Simulate games and return the result columns of all games"""
+    chunks = list(iterate_batches(number_of_games, number_of_players, \
+                                  seed, chunk_size))
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) \
+            for name in RESULT_COLUMNS}
+
+
+if __name__ == "__main__":
+    STATISTICS = GameStatistics()
+    if RESULTS_FILE is not None:
+        GAMERESULTS = ResultsWriter(RESULTS_FILE)
+    for RESULTS in iterate_batches(NUMBER_OF_SIMULATION_RUNS, \
+                                   NUMBER_OF_PLAYERS):
+        if RESULTS_FILE is not None:
+            GAMERESULTS.write_columns(RESULTS)
+        STATISTICS.update_columns(RESULTS)
+    if RESULTS_FILE is not None:
+        GAMERESULTS.close()
+    if STATISTICS_FILE is not None:
+        STATISTICS.save(STATISTICS_FILE)
+    for LABEL, NAME in zip(CHARACTER_LABELS, CHARACTER_NAMES):
+        print(NAME, "won", RESULTS["Winner" + LABEL][-1], "games.")
+    print(STATISTICS.summary())
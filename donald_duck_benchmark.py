@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the Donald Duck Holiday Game
+Measures single-game latency, throughput at 2 to 5 players for every
+engine in ENGINES, the longest games of a fixed seed range and the cost
+of the results and trajectory writers, all on fixed seeds. The timings
+are stored as JSON together with the commit they were measured on, and
+compared to a baseline file: a benchmark that got slower by more than
+REGRESSION_TOLERANCE makes the run fail.
+This code has been published under the GNU GPLv3 license
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from donald_duck_batch import iterate_batches
+from donald_duck_holiday_game import ENGINE_VERSION, GameState, run_seed
+from donald_duck_kernel import numba, play_kernel
+from donald_duck_results import CHARACTER_NAMES, ResultsWriter, \
+    pyarrow_available
+from donald_duck_trajectories import TrajectoryRecorder
+
+BENCHMARK_SEED = 1996 # master seed of all benchmark games
+BENCHMARK_FILE = "benchmark.json" # timings of this run, None to skip
+BASELINE_FILE = None # e.g. an earlier benchmark.json to compare against
+REGRESSION_TOLERANCE = 0.1 # allowed slowdown relative to the baseline
+REPEATS = 3 # timings per benchmark, the best one counts
+LATENCY_GAMES = 200 # games timed one by one
+LONG_GAME_SEARCH = 5000 # games searched for the longest ones
+LONG_GAMES = 10 # longest games that are replayed
+WRITER_GAMES = 5000 # games written by the writer benchmarks
+
+def play_scalar(number_of_games, number_of_players, seed):
+    """Play games with the scalar GameState loop"""
+    game = GameState(number_of_players)
+    for _ in game.play_many(number_of_games, seed):
+        pass
+
+def play_batch(number_of_games, number_of_players, seed):
+    """Play games with the vectorised batch engine"""
+    for _ in iterate_batches(number_of_games, number_of_players, seed):
+        pass
+
+def play_compiled(number_of_games, number_of_players, seed):
+    """Play games with the compiled kernel"""
+    play_kernel(number_of_games, number_of_players, seed)
+
+# Engines: a function playing n games, and the games per throughput timing
+# (the first kernel timing includes compiling it, or loading it from cache)
+ENGINES = {"scalar": (play_scalar, 2000), "batch": (play_batch, 50000), \
+           "kernel": (play_compiled, 50000 if numba is not None else 500)}
+
+def best_time(function, *args):
+    """Return the fastest of REPEATS calls, in seconds"""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def benchmark_latency():
+    """Time single five player games of the scalar loop"""
+    game = GameState(5)
+    timings = []
+    for simulation_run in range(LATENCY_GAMES):
+        seed = run_seed(BENCHMARK_SEED, simulation_run)
+        start = time.perf_counter()
+        game.play_game(seed)
+        timings.append(time.perf_counter() - start)
+    return {"latency/median": (np.median(timings) * 1e6, "us", False), \
+            "latency/p95": (np.percentile(timings, 95) * 1e6, "us", False)}
+
+def benchmark_throughput():
+    """Time every engine at 2 to 5 players"""
+    results = {}
+    for engine, (play, number_of_games) in ENGINES.items():
+        for number_of_players in range(2, 6):
+            seconds = best_time(play, number_of_games, number_of_players, \
+                                BENCHMARK_SEED)
+            results["throughput/{}/{}".format(engine, number_of_players)] = \
+                (number_of_games / seconds, "games/s", True)
+    return results
+
+def benchmark_long_games():
+    """Replay the longest games among the first LONG_GAME_SEARCH seeds"""
+    game = GameState(5)
+    rounds = [game.play_game(run_seed(BENCHMARK_SEED, simulation_run))[0] \
+              for simulation_run in range(LONG_GAME_SEARCH)]
+    longest = np.argsort(rounds)[-LONG_GAMES:]
+
+    def replay():
+        for simulation_run in longest:
+            game.play_game(run_seed(BENCHMARK_SEED, int(simulation_run)))
+
+    seconds = best_time(replay)
+    return {"long_games/rounds": (float(np.mean(np.take(rounds, longest))), \
+                                  "rounds", None), \
+            "long_games/time": (seconds / LONG_GAMES * 1e3, "ms", False)}
+
+def benchmark_writers():
+    """Time writing results and trajectories of WRITER_GAMES games"""
+    game = GameState(5, record_positions=True)
+    rows, trajectories = [], []
+    winners = dict.fromkeys(CHARACTER_NAMES, 0)
+    for simulation_run, (game_result, trajectory) in enumerate( \
+            game.play_many(WRITER_GAMES, BENCHMARK_SEED)):
+        winners[game_result[1]] += 1
+        rows.append([simulation_run + 1, game_result[0], \
+                     game_result[1]] + list(winners.values()) + \
+                     game_result[2:])
+        trajectories.append((simulation_run + 1, trajectory))
+
+    results = {}
+    formats = ["txt", "npy"] + (["arrow"] if pyarrow_available() else [])
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in formats:
+            path = os.path.join(directory, "results." + extension)
+
+            def write_results():
+                with ResultsWriter(path) as results_writer:
+                    for row in rows:
+                        results_writer.write_row(row)
+
+            results["writer/results/" + extension] = \
+                (WRITER_GAMES / best_time(write_results), "games/s", True)
+
+        def write_trajectories():
+            path = os.path.join(directory, "positions.npy")
+            with TrajectoryRecorder(path) as recorder:
+                for simulation_run_id, trajectory in trajectories:
+                    recorder.write(simulation_run_id, *trajectory)
+
+        results["writer/trajectories"] = \
+            (WRITER_GAMES / best_time(write_trajectories), "games/s", True)
+    return results
+
+def environment():
+    """Describe the commit and machine the benchmarks ran on"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], \
+                                capture_output=True, text=True, \
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "date": time.strftime("%Y-%m-%dT%H:%M:%S"), \
+            "engine_version": ENGINE_VERSION, \
+            "python": platform.python_version(), "numpy": np.__version__, \
+            "numba": None if numba is None else numba.__version__, \
+            "machine": platform.platform(), "cpu_count": os.cpu_count()}
+
+def run_benchmarks():
+    """Run all benchmarks, return the environment and the timings"""
+    benchmarks = {}
+    for benchmark in (benchmark_latency, benchmark_throughput, \
+                      benchmark_long_games, benchmark_writers):
+        for name, (value, unit, higher_is_better) in benchmark().items():
+            benchmarks[name] = {"value": float(value), "unit": unit, \
+                                "higher_is_better": higher_is_better}
+    return {"environment": environment(), "benchmarks": benchmarks}
+
+def regressions(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Return the benchmarks that got slower than the baseline allows"""
+    slower = []
+    for name, benchmark in results["benchmarks"].items():
+        if name not in baseline["benchmarks"] or \
+           benchmark["higher_is_better"] is None:
+            continue
+        ratio = benchmark["value"] / baseline["benchmarks"][name]["value"]
+        if not benchmark["higher_is_better"]:
+            ratio = 1 / ratio
+        if ratio < 1 - tolerance:
+            slower.append((name, ratio))
+    return slower
+
+
+if __name__ == "__main__":
+    RESULTS = run_benchmarks()
+    for NAME, BENCHMARK in RESULTS["benchmarks"].items():
+        print("{}: {:.1f} {}".format(NAME, BENCHMARK["value"], \
+                                     BENCHMARK["unit"]))
+    if BENCHMARK_FILE is not None:
+        with open(BENCHMARK_FILE, "w") as benchmark_file:
+            json.dump(RESULTS, benchmark_file, indent=1)
+
+    if BASELINE_FILE is not None:
+        with open(BASELINE_FILE) as baseline_file:
+            SLOWER = regressions(RESULTS, json.load(baseline_file))
+        for NAME, RATIO in SLOWER:
+            print("Regression: {} runs at {:.0%} of the baseline".format( \
+                  NAME, RATIO), file=sys.stderr)
+        if SLOWER:
+            sys.exit(1)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Board definition for the Donald Duck Holiday Game
+Reads the board geometry, the event squares and the event cards from a
+declarative JSON file (donald_duck_board.json) and compiles them into
+lookup tables indexed by square and card number. The scalar, batch and
+Markov chain engines all play on the compiled tables, so a board
+variant only needs another board file.
+This code has been published under the GNU GPLv3 license
+"""
+import json
+import os
+
+from donald_duck_results import CHARACTER_NAMES
+
+BOARD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), \
+                          "donald_duck_board.json")
+BOARD_PADDING = 13 # squares beyond the finish square in the tables
+
+# Rules of event squares and event cards
+NO_EVENT = 0
+WAIT = 1 # wait a number of turns
+MOVE = 2 # move a number of squares, then visit later event squares
+STUCK = 3 # wait until throwing the escape throw
+BACK_TO_START = 4 # back to start, once per player
+GO_TO = 5 # go to a square
+NEXT_EVENT_CARD_SQUARE = 6 # go to the next event card square
+THROW_FORWARD = 7 # throw again and move forward
+THROW_BACK = 8 # throw again and move back
+RAIN = 9 # move every player of the given modes back
+RULES = {"wait": WAIT, "move": MOVE, "stuck": STUCK, \
+         "back_to_start": BACK_TO_START, "go_to": GO_TO, \
+         "next_event_card_square": NEXT_EVENT_CARD_SQUARE, \
+         "throw_forward": THROW_FORWARD, "throw_back": THROW_BACK, \
+         "rain": RAIN}
+
+# Player attributes recording that a back_to_start rule was applied
+ONCE_ATTRIBUTES = {"route_map": "number_maps_collected", \
+                   "camping_card": "number_camping_cards_collected"}
+
+def default_shortcut_policy(character_id, shortcut, dice_value):
+    """Take a shortcut, unless the throw would end on its avoid square"""
+    return shortcut.entry + dice_value != shortcut.avoid_square
+
+
+class Shortcut:
+    """Define a shortcut that takes length throws from entry to exit"""
+    def __init__(self, name, entry, exit_square, length, avoid_square, \
+                 modes):
+        self.name = name
+        self.entry = entry
+        self.exit_square = exit_square
+        self.length = length
+        self.avoid_square = avoid_square
+        self.modes = modes
+
+
+class Board:
+    """Define the lookup tables compiled from a board definition
+
+    Tables are lists indexed by square or card number; transport modes
+    an event applies to are given as frozensets.
+    """
+    def __init__(self, definition):
+        self.finish_square = definition["finish_square"]
+        self.bounce_back = definition.get("bounce_back", True)
+        self.transport_modes = tuple(definition["transport_modes"][name] \
+                                     for name in CHARACTER_NAMES)
+        self.board_size = self.finish_square + BOARD_PADDING
+        squares = range(self.board_size)
+
+        self.shortcuts = tuple(Shortcut(shortcut["name"], \
+            shortcut["entry"], shortcut["exit"], shortcut["length"], \
+            shortcut.get("avoid_square", -1), self.event_modes(shortcut)) \
+            for shortcut in definition["shortcuts"])
+        self.shortcut_at = [None] * self.board_size
+        for shortcut in self.shortcuts:
+            self.shortcut_at[shortcut.entry] = shortcut
+
+        # Square tables, indexed by position
+        self.event_card_squares = tuple(sorted( \
+            definition["event_card_squares"]))
+        self.is_event_card_square = [square in self.event_card_squares \
+                                     for square in squares]
+        # Card square ahead of each position (the last one if none is ahead)
+        self.next_event_card_square = [next((square for square in \
+            self.event_card_squares if square > position), \
+            self.event_card_squares[-1]) for position in squares]
+
+        events = {int(square): event for square, event in \
+                  definition["event_squares"].items()}
+        self.event_squares = tuple(sorted(events))
+        self.is_event_square = [square in events for square in squares]
+        self.square_rule = [RULES[events[square]["rule"]] if square in events \
+                            else NO_EVENT for square in squares]
+        self.square_wait = [1 + events.get(square, {}).get("turns", 0) \
+                            for square in squares]
+        self.square_modes = [self.event_modes(events.get(square, {})) \
+                             for square in squares]
+        self.square_move = [events.get(square, {}).get("squares", 0) \
+                            for square in squares]
+        self.escape_throw = [events.get(square, {}).get("escape_throw", 0) \
+                             for square in squares]
+        self.escape_square = [events.get(square, {}).get("escape_square", -1) \
+                              for square in squares]
+        self.square_once = [self.once_attribute(events.get(square, {})) \
+                            for square in squares]
+        self.square_metric = [events.get(square, {}).get("metric") \
+                              for square in squares]
+        self.square_name = [events.get(square, {}).get("name") \
+                            for square in squares]
+        self.stuck_squares = tuple(square for square in self.event_squares \
+                                   if self.square_rule[square] == STUCK)
+
+        # Card tables, indexed by card number (card 0 does not exist)
+        cards = {int(card): event for card, event in \
+                 definition["event_cards"].items()}
+        self.number_of_event_cards = len(cards)
+        numbers = range(self.number_of_event_cards + 1)
+        cards[0] = {"rule": "wait", "modes": []}
+        self.card_rule = [RULES[cards[card]["rule"]] for card in numbers]
+        # Rain counts for everyone, but only moves the given modes
+        self.card_modes = [frozenset(self.transport_modes) \
+                           if self.card_rule[card] == RAIN else \
+                           self.event_modes(cards[card]) for card in numbers]
+        self.rain_modes = frozenset().union(*[self.event_modes(cards[card]) \
+            for card in numbers if self.card_rule[card] == RAIN])
+        self.card_wait = [1 + cards[card].get("turns", 0) for card in numbers]
+        self.card_square = [cards[card].get("square", 0) for card in numbers]
+        self.card_from_square = [cards[card].get("from_square", 0) \
+                                 for card in numbers]
+        self.card_squares = [cards[card].get("squares", 0) for card in numbers]
+        self.card_draws_again = [cards[card].get("draw_again", False) \
+                                 for card in numbers]
+        self.card_once = [self.once_attribute(cards[card]) for card in numbers]
+        self.card_metric = [cards[card].get("metric") for card in numbers]
+        self.card_name = [cards[card].get("name") for card in numbers]
+        self.card_moves = [rule in (BACK_TO_START, GO_TO, \
+            NEXT_EVENT_CARD_SQUARE, THROW_FORWARD, THROW_BACK) \
+            for rule in self.card_rule]
+
+    def event_modes(self, event):
+        """Transport modes an event square, card or shortcut applies to"""
+        return frozenset(event.get("modes", self.transport_modes))
+
+    def once_attribute(self, event):
+        """Player attribute that limits a back_to_start rule to once"""
+        if "once" in event:
+            return ONCE_ATTRIBUTES[event["once"]]
+        return None
+
+    def policy_table(self, policy=default_shortcut_policy):
+        """Tabulate a shortcut policy over all choice points
+
+        policy(character_id, shortcut, dice_value) returns whether a
+        player on the entry square takes the shortcut with that throw
+        (0 if the player waits). The table is indexed by character id,
+        shortcut (in the order of shortcuts) and throw; a shortcut the
+        transport mode of a character does not allow is never taken.
+        """
+        return [[[bool(policy(character_id, shortcut, dice_value)) and \
+                  transport_mode in shortcut.modes \
+                  for dice_value in range(7)] \
+                 for shortcut in self.shortcuts] \
+                for character_id, transport_mode in \
+                enumerate(self.transport_modes)]
+
+
+def load_board(path=BOARD_FILE, **changes):
+    """Read and compile a board file
+
+    Keyword arguments replace top-level entries of the file, e.g.
+    load_board(bounce_back=False) for a variant without bouncing back.
+    """
+    with open(path) as board_file:
+        definition = json.load(board_file)
+    definition.update(changes)
+    return Board(definition)
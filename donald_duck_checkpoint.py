@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoints for long simulation batches of the Donald Duck Holiday Game
+A checkpoint holds the state of the runner after a number of completed
+simulation runs: the run index, the master seed (every run reseeds from
+it, so no generator state is needed), the cumulative winner counters,
+the positions to resume the results and trajectory files from and the
+statistics aggregate including its collected rows. It is written to a
+temporary file and renamed, so a crash leaves either the old or the new
+checkpoint, never half of one.
+The run info of a results file (master seed, number of players and
+engine) stays next to it after the batch, so any of its simulation runs
+can be replayed (see donald_duck_replay).
+This code has been published under the GNU GPLv3 license
+"""
+import json
+import os
+
+import numpy as np
+
+from donald_duck_stats import load_statistics
+
+CHECKPOINT_SUFFIX = ".checkpoint.npz" # appended to the results file name
+RUN_INFO_SUFFIX = ".runs.json" # appended to the results file name
+
+def checkpoint_path(results_path):
+    """Return the checkpoint file that belongs to a results file"""
+    return results_path + CHECKPOINT_SUFFIX
+
+def save_checkpoint(path, state, statistics):
+    """Atomically write the runner state (a dict) and the statistics"""
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as checkpoint_file:
+        statistics.save(checkpoint_file, state=json.dumps(state))
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+def load_checkpoint(path):
+    """Return the runner state and statistics of a checkpoint, or None"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as checkpoint:
+        state = json.loads(str(checkpoint["state"]))
+    return state, load_statistics(path)
+
+def remove_checkpoint(path):
+    """Remove the checkpoint of a finished batch"""
+    if os.path.exists(path):
+        os.remove(path)
+
+def run_info_path(results_path):
+    """Return the run info file that belongs to a results file"""
+    return results_path + RUN_INFO_SUFFIX
+
+def save_run_info(results_path, run_info):
+    """Atomically write the run info (a dict) of a results file"""
+    path = run_info_path(results_path)
+    with open(path + ".tmp", "w") as run_info_file:
+        json.dump(run_info, run_info_file)
+    os.replace(path + ".tmp", path)
+
+def load_run_info(results_path):
+    """Return the run info of a results file"""
+    with open(run_info_path(results_path)) as run_info_file:
+        return json.load(run_info_file)
@@ -1,982 +1,849 @@
-# -*- coding: utf-8 -*-
-"""
-A Monte Carlo Simulation for the Donald Duck Holiday Game
-Author: W.J.A. van Heeswijk
-Date: 4-2-2020
-This code was used to analyze Donald Duck's Vakantiespel,
-which was published in Donald Duck Weekblad in 1996.
-Game copyright belongs to De Geïllustreerde Pers (1996).
-This code is supplemental to the following publication:
-'Donald Duck Holiday Game: A numerical analysis of a
-Game of the Goose role-playing variant'
-Board Game Studies Journal (2020)
-This code has been published under the GNU GPLv3 license
-"""
-import random
-import sys
-
-NUMBER_OF_SIMULATION_RUNS = 10 # at least 1 simulation run
-NUMBER_OF_PLAYERS = 5 # between 2 and 5 players
-
-# Game metrics
-class GamePerformanceMetrics():
-    """Define performance metrics"""
-    def __init__(self, number_of_route_maps, number_of_cameras, \
-                 number_of_postcards, number_of_coffees, \
-                 number_of_dishes_washed, number_of_tunnels, \
-                 number_of_camping_cards, number_event_squares_visited_hdl, \
-                 number_event_squares_visited_goofy, \
-                 number_event_squares_visited_donald, \
-                 number_event_squares_visited_horace, \
-                 number_event_squares_visited_clarabelle, \
-                 number_event_cards_drawn_hdl, \
-                 number_event_cards_drawn_goofy, \
-                 number_event_cards_drawn_donald, \
-                 number_event_cards_drawn_horace, \
-                 number_event_cards_drawn_clarabelle, \
-                 number_squares_random_hdl, \
-                 number_squares_random_goofy, number_squares_random_donald, \
-                 number_squares_random_horace, \
-                 number_squares_random_clarabelle):
-        self.number_of_route_maps = number_of_route_maps
-        self.number_of_cameras = number_of_cameras
-        self.number_of_postcards = number_of_postcards
-        self.number_of_coffees = number_of_coffees
-        self.number_of_dishes_washed = number_of_dishes_washed
-        self.number_of_tunnels = number_of_tunnels
-        self.number_of_camping_cards = number_of_camping_cards
-        self.number_event_squares_visited_hdl = number_event_squares_visited_hdl
-        self.number_event_squares_visited_goofy = number_event_squares_visited_goofy
-        self.number_event_squares_visited_donald = number_event_squares_visited_donald
-        self.number_event_squares_visited_horace = number_event_squares_visited_horace
-        self.number_event_squares_visited_clarabelle = number_event_squares_visited_clarabelle
-        self.number_event_cards_drawn_hdl = number_event_cards_drawn_hdl
-        self.number_event_cards_drawn_goofy = number_event_cards_drawn_goofy
-        self.number_event_cards_drawn_donald = number_event_cards_drawn_donald
-        self.number_event_cards_drawn_horace = number_event_cards_drawn_horace
-        self.number_event_cards_drawn_clarabelle = number_event_cards_drawn_clarabelle
-        self.number_squares_random_hdl = number_squares_random_hdl
-        self.number_squares_random_goofy = number_squares_random_goofy
-        self.number_squares_random_donald = number_squares_random_donald
-        self.number_squares_random_horace = number_squares_random_horace
-        self.number_squares_random_clarabelle = number_squares_random_clarabelle
-
-def dicethrow():
-    """Throw die"""
-    simulated_dice_value = random.randrange(1, 7)
-    return int(simulated_dice_value)
-
-def draweventcard(active_card_deck, active_player, active_characters, \
-                  event_card_id, gpm, event_card_squares, event_squares):
-    """Draw event card from deck"""
-    if event_card_id < 10:
-        event_card_id += 1
-    elif event_card_id == 10:
-        event_card_id = 0
-
-    event_card_number = 0
-    event_card_number = active_card_deck[event_card_id]
-
-    # 1. Forgot route map, return to start
-    if event_card_number == 1 and active_player.number_maps_collected == 0:
-        gpm.number_of_route_maps += 1
-        active_player.number_of_random_squares -= active_player.position_on_board
-        active_player.position_on_board = 0
-        active_player.number_of_event_cards_drawn += 1
-        active_player.number_maps_collected += 1
-
-    # 2. Forgot camera at saloon
-    if event_card_number == 2 and active_player.position_on_board >= 26:
-        gpm.number_of_cameras += 1
-        active_player.number_of_random_squares += (37 - active_player.position_on_board)
-        active_player.position_on_board = 37
-        active_player.number_of_event_cards_drawn += 1
-
-        # Necessary to draw new card (new square is 37)
-        if active_player.position_on_board in event_card_squares:
-            active_card_deck, active_player, active_characters, event_card_id, \
-            gpm, event_card_squares, event_squares = \
-            draweventcard(active_card_deck, active_player, active_characters, \
-                          event_card_id, gpm, event_card_squares, event_squares)
-
-    # 3. Post card in mailboxe (move might also be forward, no restriction)
-    if event_card_number == 3:
-        gpm.number_of_postcards += 1
-        active_player.number_of_event_cards_drawn += 1
-        active_player.number_of_random_squares += (32 - active_player.position_on_board)
-        active_player.position_on_board = 32
-
-    # 4. Walker has blister
-    if event_card_number == 4 and active_player.transport_mode == "Walk":
-        active_player.number_of_turns_waiting = 2
-        active_player.number_of_event_cards_drawn += 1
-
-    # 5. Walker gets ride (until next event card square)
-    next_position = -1000 # initialize
-    if event_card_number == 5 and active_player.transport_mode == "Walk":
-        for next_position in event_card_squares:
-            if next_position > active_player.position_on_board:
-               # exit loop when next square with circle is determined
-                break
-
-        active_player.number_of_random_squares += \
-        (next_position - active_player.position_on_board)
-        active_player.position_on_board = next_position
-        active_player.number_of_event_cards_drawn += 1
-
-        # Necessary to draw new card
-        if active_player.position_on_board in event_card_squares:
-            active_card_deck, active_player, active_characters, event_card_id,\
-            gpm, event_card_squares, event_squares = \
-            draweventcard(active_card_deck, active_player, active_characters, \
-                          event_card_id, gpm, event_card_squares, event_squares)
-
-    # 6. Tailwind (cast die again to move forward)
-    if event_card_number == 6 and active_player.transport_mode in ("Walk", "Bike", "Motor"):
-        dice_value = dicethrow()
-        active_player.number_of_random_squares += dice_value
-        active_player.position_on_board += dice_value
-        active_player.number_of_event_cards_drawn += 1
-
-        # Draw new card
-        if active_player.position_on_board in event_card_squares:
-            active_card_deck, active_player, active_characters, event_card_id, \
-            gpm, event_card_squares, event_squares = \
-            draweventcard(active_card_deck, active_player, active_characters, \
-                          event_card_id, gpm, event_card_squares, event_squares)
-
-    # 7. Head wind (cast die again to move backwards)
-    if event_card_number == 7 and \
-    active_player.transport_mode in ("Walk", "Bike", "Motor"):
-        dice_value = dicethrow()
-        active_player.number_of_random_squares -= dice_value
-        active_player.position_on_board = \
-        max(0, active_player.position_on_board - dice_value)
-        active_player.number_of_event_cards_drawn += 1
-
-        # Draw new card
-        if active_player.position_on_board in event_card_squares:
-            active_card_deck, active_player, active_characters, event_card_id, \
-            gpm, event_card_squares, event_squares = \
-            draweventcard(active_card_deck, active_player, active_characters, \
-                          event_card_id, gpm, event_card_squares, event_squares)
-
-    # 8. Flat tire  (skip 1 turn)
-    if event_card_number == 8 and \
-    active_player.transport_mode in ("Motor", "Bike", "Car", "Bus"):
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_cards_drawn += 1
-
-    # 9. Rain: every player moves back three squares (except for car and bus)
-    if event_card_number == 9:
-        active_player.number_of_event_cards_drawn += 1
-
-        copy_active_player = active_player
-        for active_player in active_characters:
-            if active_player.transport_mode in ("Walk", "Bike", "Motor"):
-                active_player.position_on_board = \
-                max(active_player.position_on_board - 3, 0)
-
-                active_player.number_of_random_squares -= 3
-                if active_player.position_on_board in \
-                event_squares:
-                    # Update based on new event square
-                    active_card_deck, active_player, active_characters, \
-                    event_card_id, gpm, event_card_squares, event_squares = \
-                    eventsquare(active_card_deck, active_player, \
-                    active_characters, event_card_id, gpm, event_card_squares, \
-                    event_squares)
-
-                    # Correction in counter
-                    if active_player.position_on_board == 92:
-                        gpm.number_of_dishes_washed -= 1
-
-                    if active_player.position_on_board == 98:
-                        gpm.number_of_tunnels -= 1
-
-                if active_player.position_on_board not in \
-                event_squares:
-                    active_player.number_of_turns_waiting = 0
-                    #End waiting when moved from event square
-
-        # Restore active player
-        active_player = copy_active_player
-
-        # Draw card (assumption: only for active player only)
-        if active_player.transport_mode in ("Walk", "Bike", "Motor") and \
-        active_player.position_on_board in event_card_squares:
-            active_card_deck, active_player, active_characters, event_card_id, \
-            gpm, event_card_squares, event_squares = \
-            draweventcard(active_card_deck, active_player, active_characters, \
-                          event_card_id, gpm, event_card_squares, event_squares)
-
-    # 10. Engine failure, wait for roadside assistance
-    if event_card_number == 10 and \
-    active_player.transport_mode in ("Car", "Bus", "Motor"):
-        turns_waiting = 2
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_cards_drawn += 1
-
-    # 11. Road maintenance
-    if event_card_number == 11:
-        turns_waiting = 3
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_cards_drawn += 1
-
-    return active_card_deck, active_player, active_characters, event_card_id, \
-           gpm, event_card_squares, event_squares
-
-
-def eventsquare(active_card_deck, active_player, active_characters, \
-                event_card_id, gpm, event_card_squares, event_squares):
-    """Visit event square"""
-    # (9) Have a coffee
-    if active_player.position_on_board == 9 and \
-    active_player.number_of_turns_waiting == 0:
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        gpm.number_of_coffees += 1
-        active_player.number_of_event_squares_visited += 1
-
-    # (13) Trash on the road
-    if active_player.position_on_board == 13 and \
-    active_player.number_of_turns_waiting == 0:
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (17,18,19) Takeover forbidden
-    if active_player.position_on_board in (17, 18, 19) and \
-    active_player.number_of_turns_waiting == 0:
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (24) Picnic
-    if active_player.position_on_board == 24 and \
-    active_player.number_of_turns_waiting == 0:
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (29) Money exchange
-    if active_player.position_on_board == 29 and \
-    active_player.number_of_turns_waiting == 0:
-        turns_waiting = 2
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (39,40,41) Dangerous turn
-    if active_player.position_on_board in (39, 40, 41) and \
-    active_player.number_of_turns_waiting == 0:
-        turns_waiting = 2
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (50) Take a break
-    if active_player.position_on_board == 50 and \
-    active_player.number_of_turns_waiting == 0:
-        turns_waiting = 2
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (56) Fill up gas tank
-    if active_player.position_on_board == 56 and \
-       active_player.number_of_turns_waiting == 0 and \
-       active_player.transport_mode in ("Motor", "Car", "Bus"):
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (63,64,65) Slow down
-    if active_player.position_on_board in (63, 64, 65) and \
-       active_player.number_of_turns_waiting == 0:
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (71) Chased away from money bin
-    if active_player.position_on_board == 71:
-        active_player.position_on_board = active_player.position_on_board + 3
-        active_player.number_of_event_squares_visited += 1
-
-        # Necessary to draw new card (square 74 is a random event square)
-        if active_player.position_on_board in event_card_squares:
-            active_card_deck, active_player, active_characters, event_card_id, \
-            gpm, event_card_squares, event_squares = \
-            draweventcard(active_card_deck, active_player, active_characters, \
-                          event_card_id, gpm, event_card_squares, event_squares)
-
-    # (81) Nice spot
-    if active_player.position_on_board == 81 and \
-       active_player.number_of_turns_waiting == 0:
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (83) Sick, nauseous, go to first aid
-    if active_player.position_on_board == 83 and \
-       active_player.number_of_turns_waiting == 0:
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (90) Eat a bite
-    if active_player.position_on_board == 90 and \
-    active_player.number_of_turns_waiting == 0:
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (91) Have a drink
-    if active_player.position_on_board == 91 and \
-    active_player.number_of_turns_waiting == 0:
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 1 + turns_waiting
-        active_player.number_of_event_squares_visited += 1
-
-    # (92) Wash dishes (continue only when throwing 6)
-    if active_player.position_on_board == 92:
-        gpm.number_of_dishes_washed += 1
-        active_player.number_of_turns_waiting = sys.maxsize
-        active_player.number_of_event_squares_visited += 1
-
-    # (98) Lost in dark tunnel (continue only when throwing 2)
-    if active_player.position_on_board == 98:
-        gpm.number_of_tunnels += 1
-        active_player.number_of_turns_waiting = sys.maxsize
-        active_player.number_of_event_squares_visited += 1
-
-    # (105) Speed control
-    if active_player.position_on_board == 105 and \
-    active_player.number_of_turns_waiting == 0 \
-    and active_player.transport_mode in ("Bus", "Car", "Motor"):
-        turns_waiting = 1
-        active_player.number_of_turns_waiting = 2
-        active_player.number_of_event_squares_visited += 1
-
-    # (112) Forgot camping card, back to start
-    if active_player.position_on_board == 112 and \
-    active_player.number_camping_cards_collected == 0:
-        gpm.number_of_camping_cards += 1
-        active_player.number_camping_cards_collected += 1
-        active_player.position_on_board = 0
-        active_player.number_of_event_squares_visited += 1
-
-    return active_card_deck, active_player, active_characters, event_card_id, \
-    gpm, event_card_squares, event_squares
-
-class Character:
-    """Define character attributes"""
-    def __init__(self, character_name, transport_mode, position_on_board, \
-                 allowed_to_start, number_of_turns_waiting, shortcut_position, \
-                 number_of_turns_leading, player_has_led, \
-                 number_of_shortcuts_taken, number_of_event_squares_visited, \
-                 number_of_event_cards_drawn, \
-                 number_of_random_squares, number_camping_cards_collected, \
-                 number_maps_collected):
-        self.character_name = character_name
-        self.transport_mode = transport_mode
-        self.position_on_board = position_on_board
-        self.allowed_to_start = allowed_to_start
-        self.number_of_turns_waiting = number_of_turns_waiting
-        self.shortcut_position = shortcut_position
-        self.number_of_turns_leading = number_of_turns_leading
-        self.player_has_led = player_has_led
-        self.number_of_shortcuts_taken = number_of_shortcuts_taken
-        self.number_of_event_squares_visited = number_of_event_squares_visited
-        self.number_of_event_cards_drawn = number_of_event_cards_drawn
-        self.number_of_random_squares = number_of_random_squares
-        self.number_camping_cards_collected = number_camping_cards_collected
-        self.number_maps_collected = number_maps_collected
-
-# START OF MAIN GAME CODE
-# Define number of active players
-if NUMBER_OF_PLAYERS < 1 or NUMBER_OF_PLAYERS > 5:
-    print("Please select a number of players between 2 and 5")
-    sys.exit()
-
-# Set number of simulation runs
-if NUMBER_OF_SIMULATION_RUNS < 1:
-    print("Please select a positve number of simulation runs")
-    sys.exit()
-
-# Initialize outer loop game metrics
-WINNERGOOFY = 0
-WINNERDONALD = 0
-WINNERHORACE = 0
-WINNERCLARABELLE = 0
-WINNERHDL = 0
-
-# Initialize text file with game results
-GAMERESULTS = open("GAMERESULTS.txt", "w")
-GAMERESULTS.write("SimulationRunID")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfRoundsPlayed")
-GAMERESULTS.write(";")
-GAMERESULTS.write("WinnerName")
-GAMERESULTS.write(";")
-GAMERESULTS.write("WinnerHDL")
-GAMERESULTS.write(";")
-GAMERESULTS.write("WinnerGoofy")
-GAMERESULTS.write(";")
-GAMERESULTS.write("WinnerDonald")
-GAMERESULTS.write(";")
-GAMERESULTS.write("WinnerHorace")
-GAMERESULTS.write(";")
-GAMERESULTS.write("WinnerClarabelle")
-GAMERESULTS.write(";")
-GAMERESULTS.write("TurnsWaitingHDL")
-GAMERESULTS.write(";")
-GAMERESULTS.write("TurnsWaitingGoofy")
-GAMERESULTS.write(";")
-GAMERESULTS.write("TurnsWaitingDonald")
-GAMERESULTS.write(";")
-GAMERESULTS.write("TurnsWaitingHorace")
-GAMERESULTS.write(";")
-GAMERESULTS.write("TurnsWaitingClarabelle")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfCampingCards")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfRouteMaps")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfCameras")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfPostcards")
-GAMERESULTS.write(";")
-GAMERESULTS.write("TurnsLedWinner")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfLeaders")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfShortcutsHDL")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfShortcutsGoofy")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfShortcutsDonald")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfShortcutsHorace")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfShortcutsClarabelle")
-GAMERESULTS.write(";")
-GAMERESULTS.write("StartingPositionHDL")
-GAMERESULTS.write(";")
-GAMERESULTS.write("StartingPositionGoofy")
-GAMERESULTS.write(";")
-GAMERESULTS.write("StartingPositionDonald")
-GAMERESULTS.write(";")
-GAMERESULTS.write("StartingPositionHorace")
-GAMERESULTS.write(";")
-GAMERESULTS.write("StartingPositionClarabelle")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventSquaresVisitedHDL")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventSquaresVisitedGoofy")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventSquaresVisitedDonald")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventSquaresVisitedHorace")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventSquaresVisitedClarabelle")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventCardsDrawnHDL")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventCardsDrawnGoofy")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventCardsDrawnDonald")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventCardsDrawnHorace")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberOfEventCardsDrawnClarabelle")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberSquaresRandomHDL")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberSquaresRandomGoofy")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberSquaresRandomDonald")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberSquaresRandomHorace")
-GAMERESULTS.write(";")
-GAMERESULTS.write("NumberSquaresRandomClarabelle")
-GAMERESULTS.write(";")
-GAMERESULTS.write(";\n")
-GAMERESULTS.close()
-
-for simulation_run in range(0, NUMBER_OF_SIMULATION_RUNS):
-    # Define characters
-    Donald = Character("Donald", "Car", 0, bool(False), \
-                       0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-    Goofy = Character("Goofy", "Bus", 0, bool(False), \
-                      0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-    Clarabelle = Character("Clarabelle", "Bike", 0, bool(False), \
-                           0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-    Horace = Character("Horace", "Motor", 0, bool(False), \
-                       0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-    HueyDeweyLouie = Character("Huey, Dewey & Louie", "Walk", 0, bool(False), \
-                               0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
-
-    all_characters = [Donald, Goofy, Clarabelle, Horace, HueyDeweyLouie]
-    active_characters = []
-
-    # Define sets of random event squares and event card squares
-    event_card_squares = (5, 11, 15, 22, 33, 37, 47, 60, 74, 75, \
-                          79, 86, 87, 88, 95, 102, 107)
-    event_squares = (9, 13, 17, 18, 19, 24, 29, 39, 40, 41, 50, 56,\
-                     63, 64, 65, 71, 81, 83, 90, 91, 92, 98, 105, 112)
-
-    #Create random set of active players (random starting order)
-    players_added = len(active_characters)
-    while players_added < NUMBER_OF_PLAYERS:
-        random_character_id = random.randrange(0, len(all_characters))
-        random_character = all_characters[random_character_id]
-        active_characters.append(random_character)
-        all_characters.remove(random_character)
-        players_added += 1
-
-    #Initialize sequence of random event cards
-    standard_card_deck = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]
-    active_card_deck = []
-
-    while standard_card_deck:
-        card_id = random.randrange(0, len(standard_card_deck))
-        card_number = standard_card_deck[card_id]
-        active_card_deck.append(card_number)
-        standard_card_deck.remove(card_number)
-
-    event_card_id = 0
-
-    gpm = GamePerformanceMetrics(0, 0, 0, \
-                 0, 0, 0, 0, \
-                 0, 0, 0, \
-                 0, 0, 0, \
-                 0, 0, 0, \
-                 0, 0, 0, 0, 0, 0)
-
-    #Initialize game metrics
-    round_id = 0
-    turns_waiting_goofy = 0
-    turns_waiting_donald = 0
-    turns_waiting_horace = 0
-    turns_waiting_clarabelle = 0
-    turns_waiting_hdl = 0
-    number_of_shortcuts_hdl = 0
-    number_of_shortcuts_goofy = 0
-    number_of_shortcuts_donald = 0
-    number_of_shortcuts_horace = 0
-    number_of_shortcuts_clarabelle = 0
-    starting_position_hdl = 0
-    starting_position_goofy = 0
-    starting_position_donald = 0
-    starting_position_horace = 0
-    starting_position_clarabelle = 0
-    gpm.number_of_dishes_washed = 0
-    gpm.number_of_tunnels = 0
-    gpm.number_of_camping_cards = 0
-    gpm.number_of_route_maps = 0
-    gpm.number_of_cameras = 0
-    gpm.number_of_postcards = 0
-    gpm.number_of_coffees = 0
-    gpm.number_of_event_cards_hdl = 0
-    gpm.number_of_event_cards_goofy = 0
-    gpm.number_of_event_cards_donald = 0
-    gpm.number_of_event_cards_horace = 0
-    gpm.number_of_event_cards_clarabelle = 0
-
-    player_positions = open("player_positions.txt", "w")
-    for active_player in active_characters:
-        player_positions.write(active_player.character_name)
-        player_positions.write(";")
-
-    player_positions.close()
-
-    #Game runs until first player reaches the camping (square 115)
-    game_finished = bool(False)
-
-    while game_finished == bool(False):
-        overall_starting_position = 0
-        round_id += 1
-        print("---Round", round_id, "has started---")
-
-        with open('player_positions.txt', 'a') as player_positions:
-            player_positions.write("\n")
-            player_positions.close()
-
-        for active_player in active_characters:
-            if active_player.character_name == "Huey, Dewey & Louie" and \
-            active_player.allowed_to_start:
-                overall_starting_position += 1
-                starting_position_hdl = overall_starting_position
-            if active_player.character_name == "Goofy" and \
-            active_player.allowed_to_start:
-                overall_starting_position += 1
-                starting_position_goofy = overall_starting_position
-            if active_player.character_name == "Donald" and \
-            active_player.allowed_to_start:
-                overall_starting_position += 1
-                starting_position_donald = overall_starting_position
-            if active_player.character_name == "Horace" and \
-            active_player.allowed_to_start:
-                overall_starting_position += 1
-                starting_position_horace = overall_starting_position
-            if active_player.character_name == "Clarabelle" and \
-            active_player.allowed_to_start:
-                overall_starting_position += 1
-                starting_position_clarabelle = overall_starting_position
-
-            if not active_player.allowed_to_start:
-                Startdice_value = dicethrow()
-
-                if Startdice_value == 6:
-                     # Store active player
-                    copy_active_player = active_player
-
-                    if active_player.character_name == "Huey, Dewey & Louie":
-                        starting_position_hdl = 1
-                    if active_player.character_name == "Goofy":
-                        starting_position_goofy = 1
-                    if active_player.character_name == "Donald":
-                        starting_position_donald = 1
-                    if active_player.character_name == "Horace":
-                        starting_position_horace = 1
-                    if active_player.character_name == "Clarabelle":
-                        starting_position_clarabelle = 1
-
-                    overall_starting_position = 1
-
-                    for active_player in active_characters:
-                        active_player.allowed_to_start = True
-
-                    # Restore active player
-                    active_player = copy_active_player
-
-            dice_value = 0
-            if active_player.allowed_to_start and \
-            active_player.number_of_turns_waiting == 0:
-                dice_value = dicethrow()
-
-            # Check if character can take short-cut via bike lane
-            if (active_player.position_on_board == 45) and   \
-            (active_player.shortcut_position == 0) and \
-            active_player.transport_mode in ("Walk", "Bike"):
-
-                if active_player.character_name == "Huey, Dewey & Louie":
-                    number_of_shortcuts_hdl += 1
-                if active_player.character_name == "Clarabelle":
-                    number_of_shortcuts_clarabelle += 1
-
-                if active_player.position_on_board + dice_value < 48:
-                    active_player.shortcut_position = \
-                    ((active_player.position_on_board + dice_value) - 45)
-                    active_player.position_on_board = 45
-                else:
-                    active_player.position_on_board = 55 + dice_value - 3
-                    active_player.shortcut_position = 0
-
-            # If character is in located the bikelane shortcut
-            elif active_player.position_on_board == 45 and \
-            active_player.shortcut_position > 0:
-                if dice_value <= 2 - active_player.shortcut_position:
-                    active_player.shortcut_position = \
-                    active_player.shortcut_position + dice_value #can only be 1
-                else:
-                    active_player.position_on_board = 55 - \
-                    (3 - active_player.shortcut_position) + dice_value
-                    active_player.shortcut_position = 0
-
-            # Check if character can take short-cut via highway
-            # If player would land on Square 116 (back to start), then take a detour
-            elif (active_player.position_on_board == 100) and \
-            (active_player.shortcut_position == 0) and \
-            active_player.position_on_board+dice_value != 112 and \
-            active_player.transport_mode in ("Car", "Bus", "Motor"):
-                if active_player.character_name == "Donald":
-                    number_of_shortcuts_donald += 1
-                if active_player.character_name == "Goofy":
-                    number_of_shortcuts_goofy += 1
-                if active_player.character_name == "Horace":
-                    number_of_shortcuts_horace += 1
-
-                if active_player.position_on_board+dice_value < 103:
-                    active_player.shortcut_position = \
-                    ((active_player.position_on_board+dice_value) - 100)
-                    active_player.position_on_board = 100
-                else:
-                    active_player.position_on_board = 109 + dice_value - 3
-                    active_player.shortcut_position = 0
-
-            # If character is in located the highway shortcut
-            elif active_player.position_on_board == 100 and \
-            active_player.shortcut_position > 0:
-                if dice_value <= 2-active_player.shortcut_position:
-                    active_player.shortcut_position = \
-                    active_player.shortcut_position + dice_value #can only be 1
-                else:
-                    active_player.position_on_board = 109 - \
-                    (3 - active_player.shortcut_position) + dice_value
-                    active_player.shortcut_position = 0
-
-            # If not ending exactly at 115
-            elif active_player.position_on_board + dice_value > 115:
-                active_player.position_on_board = 115 - \
-                (dice_value - (115 - active_player.position_on_board))
-
-            # END OF GAME, STORE METRICS
-            elif active_player.position_on_board + dice_value == 115:
-                active_player.position_on_board += dice_value
-                game_finished = bool(True)
-                print("Game finished: ", active_player.character_name, "won.")
-                if active_player.character_name == "Goofy":
-                    WINNERGOOFY += 1
-                    gpm.number_event_cards_drawn_goofy = \
-                    active_player.number_of_event_cards_drawn
-                    gpm.number_event_squares_visited_goofy = \
-                    active_player.number_of_event_squares_visited
-                if active_player.character_name == "Donald":
-                    WINNERDONALD += 1
-                    gpm.number_event_cards_drawn_donald = \
-                    active_player.number_of_event_cards_drawn
-                    gpm.number_event_squares_visited_donald = \
-                    active_player.number_of_event_squares_visited
-                if active_player.character_name == "Horace":
-                    WINNERHORACE += 1
-                    gpm.number_event_cards_drawn_horace = \
-                    active_player.number_of_event_cards_drawn
-                    gpm.number_event_squares_visited_horace = \
-                    active_player.number_of_event_squares_visited
-                if active_player.character_name == "Clarabelle":
-                    WINNERCLARABELLE += 1
-                    gpm.number_event_cards_drawn_clarabelle = \
-                    active_player.number_of_event_cards_drawn
-                    gpm.number_event_squares_visited_clarabelle = \
-                    active_player.number_of_event_squares_visited
-                if active_player.character_name == "Huey, Dewey & Louie":
-                    WINNERHDL += 1
-
-                # Store winner
-                copy_active_player = active_player
-
-                number_of_leaders_during_game = 0
-                for active_player in active_characters:
-                    number_of_leaders_during_game += active_player.player_has_led
-
-                    if active_player.character_name == "Goofy":
-                        gpm.number_event_cards_drawn_goofy = \
-                        active_player.number_of_event_cards_drawn
-                        gpm.number_event_squares_visited_goofy = \
-                        active_player.number_of_event_squares_visited
-                        gpm.number_squares_random_goofy = \
-                        active_player.number_of_random_squares
-
-                    if active_player.character_name == "Donald":
-                        gpm.number_event_cards_drawn_donald = \
-                        active_player.number_of_event_cards_drawn
-                        gpm.number_event_squares_visited_donald = \
-                        active_player.number_of_event_squares_visited
-                        gpm.number_squares_random_donald = \
-                        active_player.number_of_random_squares
-
-                    if active_player.character_name == "Horace":
-                        gpm.number_event_cards_drawn_horace = \
-                        active_player.number_of_event_cards_drawn
-                        gpm.number_event_squares_visited_horace = \
-                        active_player.number_of_event_squares_visited
-                        gpm.number_squares_random_horace = \
-                        active_player.number_of_random_squares
-
-                    if active_player.character_name == "Clarabelle":
-                        gpm.number_event_cards_drawn_clarabelle = \
-                        active_player.number_of_event_cards_drawn
-                        gpm.number_event_squares_visited_clarabelle = \
-                        active_player.number_of_event_squares_visited
-                        gpm.number_squares_random_clarabelle = \
-                        active_player.number_of_random_squares
-
-                    if active_player.character_name == "Huey, Dewey & Louie":
-                        gpm.number_event_cards_drawn_hdl = \
-                        active_player.number_of_event_cards_drawn
-                        gpm.number_event_squares_visited_hdl = \
-                        active_player.number_of_event_squares_visited
-                        gpm.number_squares_random_hdl = \
-                        active_player.number_of_random_squares
-
-                active_player = copy_active_player
-
-                with open('player_positions.txt', 'a') as player_positions:
-                    player_positions.write(str(active_player.position_on_board))
-                    player_positions.close()
-
-                with open('GAMERESULTS.txt', 'a') as GAMERESULTS:
-                    GAMERESULTS.write(str(simulation_run + 1))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(round_id))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(active_player.character_name))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(WINNERHDL))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(WINNERGOOFY))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(WINNERDONALD))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(WINNERHORACE))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(WINNERCLARABELLE))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(turns_waiting_hdl))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(turns_waiting_goofy))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(turns_waiting_donald))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(turns_waiting_horace))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(turns_waiting_clarabelle))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_of_camping_cards))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_of_route_maps))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_of_cameras))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_of_postcards))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(active_player.number_of_turns_leading))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(number_of_leaders_during_game))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(number_of_shortcuts_hdl))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(number_of_shortcuts_goofy))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(number_of_shortcuts_donald))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(number_of_shortcuts_horace))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(number_of_shortcuts_clarabelle))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(starting_position_hdl))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(starting_position_goofy))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(starting_position_donald))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(starting_position_horace))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(starting_position_clarabelle))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_squares_visited_hdl))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_squares_visited_goofy))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_squares_visited_donald))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_squares_visited_horace))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_squares_visited_clarabelle))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_cards_drawn_hdl))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_cards_drawn_goofy))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_cards_drawn_donald))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_cards_drawn_horace))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_event_cards_drawn_clarabelle))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_squares_random_hdl))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_squares_random_goofy))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_squares_random_donald))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_squares_random_horace))
-                    GAMERESULTS.write(";")
-                    GAMERESULTS.write(str(gpm.number_squares_random_clarabelle))
-                    GAMERESULTS.write(";\n")
-                    GAMERESULTS.close()
-
-                print("Simulation run", simulation_run+1)
-
-                #EXIT GAME
-                break
-
-            #Regular board movement
-            else:
-                active_player.position_on_board = \
-                active_player.position_on_board + dice_value
-
-            # RANDOM EVENT CARDS
-            if active_player.position_on_board in event_card_squares \
-            and active_player.number_of_turns_waiting == 0:
-                active_card_deck, active_player, active_characters, \
-                event_card_id, gpm, event_card_squares, event_squares =\
-                draweventcard(active_card_deck, active_player, \
-                active_characters, event_card_id, \
-                gpm, event_card_squares, event_squares)
-
-            # EVENT SQUARES
-            if active_player.position_on_board in \
-                event_squares:
-                active_card_deck, active_player, active_characters, \
-                event_card_id, gpm, event_card_squares, event_squares = \
-                eventsquare(active_card_deck, active_player, \
-                active_characters, event_card_id, gpm, event_card_squares,\
-                event_squares)
-
-                if active_player.position_on_board == 92:
-                    Dishesdice_value = dicethrow()
-                    if Dishesdice_value == 6:
-                        active_player.number_of_turns_waiting = 0
-                        dice_value = dicethrow()
-                        active_player.position_on_board = \
-                        active_player.position_on_board + dice_value
-
-                if active_player.position_on_board == 98:
-                    Tunneldice_value = dicethrow()
-                    if Tunneldice_value == 2:
-                        active_player.number_of_turns_waiting = 0
-                        active_player.position_on_board = 99
-
-            # Reduce waiting time
-            if active_player.number_of_turns_waiting > 0:
-                active_player.number_of_turns_waiting = \
-                active_player.number_of_turns_waiting - 1
-
-            # Update game metrics
-            if active_player.character_name == "Goofy" and \
-            active_player.number_of_turns_waiting > 0:
-                turns_waiting_goofy += 1
-            if active_player.character_name == "Donald" and \
-            active_player.number_of_turns_waiting > 0:
-                turns_waiting_donald += 1
-            if active_player.character_name == "Horace" and \
-            active_player.number_of_turns_waiting > 0:
-                turns_waiting_horace += 1
-            if active_player.character_name == "Clarabelle" and \
-            active_player.number_of_turns_waiting > 0:
-                turns_waiting_clarabelle += 1
-            if active_player.character_name == "Huey, Dewey & Louie" and \
-            active_player.number_of_turns_waiting > 0:
-                turns_waiting_hdl += 1
-
-            with open('player_positions.txt', 'a') as player_positions:
-                player_positions.write(str(active_player.position_on_board))
-                player_positions.write(";")
-                player_positions.close()
-
-            # Check if player is currently in the lead
-            copy_active_player = active_player
-            active_player.number_of_turns_leading += 1
-            for active_player in active_characters:
-                if copy_active_player.position_on_board <= \
-                active_player.position_on_board and \
-                copy_active_player.character_name != \
-                active_player.character_name:
-                    copy_active_player.number_of_turns_leading = 0
-                    break
-
-            active_player = copy_active_player
-
-            if active_player.number_of_turns_leading > 0:
-                active_player.player_has_led = 1
+# -*- coding: utf-8 -*-
+"""
+A Monte Carlo Simulation for the Donald Duck Holiday Game
+Author: W.J.A. van Heeswijk
+Date: 4-2-2020
+This code was used to analyze Donald Duck's Vakantiespel,
+which was published in Donald Duck Weekblad in 1996.
+Game copyright belongs to De Geïllustreerde Pers (1996).
+This code is supplemental to the following publication:
+'Donald Duck Holiday Game: A numerical analysis of a
+Game of the Goose role-playing variant'
+Board Game Studies Journal (2020)
+This code has been published under the GNU GPLv3 license
+"""
+import argparse
+import importlib.util
+import random
+import sys
+import time
+from functools import partial
+
+import numpy as np
+
+from donald_duck_board import BACK_TO_START, GO_TO, MOVE, \
+    NEXT_EVENT_CARD_SQUARE, RAIN, STUCK, THROW_FORWARD, WAIT, load_board
+from donald_duck_checkpoint import checkpoint_path, load_checkpoint, \
+    remove_checkpoint, save_checkpoint, save_run_info
+from donald_duck_results import CHARACTER_NAMES, ResultsWriter
+from donald_duck_stats import GameStatistics
+from donald_duck_trajectories import TrajectoryRecorder
+
+NUMBER_OF_SIMULATION_RUNS = 10 # at least 1 simulation run
+NUMBER_OF_PLAYERS = 5 # between 2 and 5 players
+NUMBER_OF_WORKERS = 1 # worker processes, e.g. os.cpu_count()
+MASTER_SEED = None # fixed integer for reproducible results, None for random
+RUNS_PER_TASK = 100 # simulation runs handed to a worker at once
+RESULTS_FILE = "GAMERESULTS.txt" # .txt (text), .npy, .arrow, .sqlite or None
+STATISTICS_FILE = None # e.g. "statistics.npz" to save the aggregate metrics
+TRAJECTORY_FILE = None # e.g. "player_positions.npy" to log all positions
+CHECKPOINT_INTERVAL = 60 # seconds between checkpoints, 0 to disable
+VERBOSITY = 1 # 0 silent, 1 summary per simulation run, 2 trace per round
+PROGRESS_INTERVAL = 5 # seconds between progress reports, 0 to disable
+DICE_BUFFER = 512 # random bytes drawn at once for the dice pool
+ENGINE_VERSION = 2 # increase when the same seed gives other results or columns
+
+# Random byte -> die value; bytes 252-255 are rejected (0) to stay uniform
+DICE_TABLE = bytes(byte % 6 + 1 if byte < 252 else 0 for byte in range(256))
+
+# Board and event card rules, see donald_duck_board.json
+BOARD = load_board()
+
+# Characters in the order new_game draws them from, as character ids
+# (indices in CHARACTER_NAMES)
+DRAW_ORDER = tuple(CHARACTER_NAMES.index(name) for name in \
+                   ("Donald", "Goofy", "Clarabelle", "Horace", \
+                    "Huey, Dewey & Louie"))
+
+# Game metrics
+class GamePerformanceMetrics:
+    """Define performance metrics
+
+    Game metrics are named as in the board file, per-character metrics
+    are lists indexed by character id.
+    """
+    __slots__ = ("number_of_route_maps", "number_of_cameras", \
+                 "number_of_postcards", "number_of_coffees", \
+                 "number_of_dishes_washed", "number_of_tunnels", \
+                 "number_of_camping_cards", "number_event_squares_visited", \
+                 "number_event_cards_drawn", "number_squares_random")
+
+    def __init__(self, number_of_characters=len(CHARACTER_NAMES)):
+        self.number_of_route_maps = 0
+        self.number_of_cameras = 0
+        self.number_of_postcards = 0
+        self.number_of_coffees = 0
+        self.number_of_dishes_washed = 0
+        self.number_of_tunnels = 0
+        self.number_of_camping_cards = 0
+        self.number_event_squares_visited = [0] * number_of_characters
+        self.number_event_cards_drawn = [0] * number_of_characters
+        self.number_squares_random = [0] * number_of_characters
+
+class Character:
+    """Define character attributes, identified by character id"""
+    __slots__ = ("character_id", "character_name", "transport_mode", \
+                 "position_on_board", "allowed_to_start", \
+                 "number_of_turns_waiting", "shortcut_position", \
+                 "number_of_turns_leading", "player_has_led", \
+                 "number_of_shortcuts_taken", \
+                 "number_of_event_squares_visited", \
+                 "number_of_event_cards_drawn", "number_of_random_squares", \
+                 "number_camping_cards_collected", "number_maps_collected", \
+                 "turns_waiting", "starting_position")
+
+    def __init__(self, character_id, transport_mode):
+        self.character_id = character_id
+        self.character_name = CHARACTER_NAMES[character_id]
+        self.transport_mode = transport_mode
+        self.position_on_board = 0
+        self.allowed_to_start = False
+        self.number_of_turns_waiting = 0
+        self.shortcut_position = 0
+        self.number_of_turns_leading = 0
+        self.player_has_led = 0
+        self.number_of_shortcuts_taken = 0
+        self.number_of_event_squares_visited = 0
+        self.number_of_event_cards_drawn = 0
+        self.number_of_random_squares = 0
+        self.number_camping_cards_collected = 0
+        self.number_maps_collected = 0
+        self.turns_waiting = 0
+        self.starting_position = 0
+
+class ProgressReporter:
+    """Report games per second and remaining time at most once per interval"""
+    def __init__(self, number_of_simulation_runs, interval, first_game=0):
+        self.number_of_simulation_runs = number_of_simulation_runs
+        self.interval = interval
+        self.first_game = first_game
+        self.start_time = time.monotonic()
+        self.next_report = self.start_time + interval
+
+    def update(self, games_played):
+        """Report progress if the interval has passed"""
+        now = time.monotonic()
+        if now < self.next_report and \
+           games_played < self.number_of_simulation_runs:
+            return
+        self.next_report = now + self.interval
+        games_per_second = (games_played - self.first_game) / \
+                           max(now - self.start_time, 1e-9)
+        remaining = (self.number_of_simulation_runs - games_played) / \
+                    max(games_per_second, 1e-9)
+        print("Progress: {}/{} games ({:.1f}%), {:.0f} games/s, ETA {}".format( \
+              games_played, self.number_of_simulation_runs, \
+              100 * games_played / self.number_of_simulation_runs, \
+              games_per_second, time.strftime("%H:%M:%S", \
+                                              time.gmtime(remaining))), \
+              file=sys.stderr, flush=True)
+
+def run_seed(master_seed, simulation_run):
+    """Derive the seed of a simulation run from the master seed"""
+    seed_sequence = np.random.SeedSequence(master_seed, \
+                                           spawn_key=(simulation_run,))
+    return int.from_bytes(seed_sequence.generate_state(4).tobytes(), "little")
+
+class GameState:
+    """Define the state of one game: characters, event card deck and metrics
+
+    The game draws its random numbers from its own random generator, so
+    several games can be played in one process. The starting order, the
+    deck and the dice use order_rng, deck_rng and dice_rng, which are all
+    the same generator unless seed_streams is overridden. Dice are handed
+    out from a pool that is filled with random bytes in bulk. A game is set up with
+    new_game(seed) and played with step_turn() until it returns True;
+    play_game(seed) and play_many(n) do both.
+    Players are drawn from the characters in roster, in random starting
+    order, or take the first seats in roster order without random_order.
+    shortcut_policy is a table of Board.policy_table deciding when
+    players take a shortcut, the rules if None.
+    """
+    def __init__(self, number_of_players=NUMBER_OF_PLAYERS, \
+                 record_positions=False, trace_rounds=False, board=BOARD, \
+                 roster=CHARACTER_NAMES, random_order=True, \
+                 shortcut_policy=None):
+        if number_of_players < 2 or number_of_players > len(roster):
+            raise ValueError("Please select a number of players between 2 and " \
+                             + str(len(roster)))
+        self.number_of_players = number_of_players
+        self.roster = tuple(roster)
+        self.roster_ids = tuple(CHARACTER_NAMES.index(name) for name in roster)
+        self.random_order = random_order
+        self.record_positions = record_positions
+        self.trace_rounds = trace_rounds
+        self.board = board
+        # Shortcut choices by character id and entry square, then throw
+        if shortcut_policy is None:
+            shortcut_policy = board.policy_table()
+        self.shortcut_choices = [[None] * len(board.shortcut_at) \
+                                 for _ in CHARACTER_NAMES]
+        for choices, table in zip(self.shortcut_choices, shortcut_policy):
+            for shortcut, throws in zip(board.shortcuts, table):
+                choices[shortcut.entry] = throws
+        self.rng = random.Random()
+        self.order_rng = self.deck_rng = self.dice_rng = self.rng
+        self.dice = b""
+        self.dice_cursor = 0
+        self.dice_thrown_before = 0
+        self.trajectory = None
+        self.winner = None
+
+    def dicethrow(self):
+        """Throw die"""
+        if self.dice_cursor == len(self.dice):
+            self.fill_dice()
+        self.dice_cursor += 1
+        return self.dice[self.dice_cursor - 1]
+
+    def fill_dice(self):
+        """Refill the dice pool from DICE_BUFFER random bytes"""
+        self.dice_thrown_before += self.dice_cursor
+        self.dice = self.dice_rng.getrandbits(8 * DICE_BUFFER).to_bytes( \
+            DICE_BUFFER, "little").translate(DICE_TABLE).replace(b"\0", b"")
+        self.dice_cursor = 0
+
+    def number_of_dice_thrown(self):
+        """Return the number of dice thrown in the current game"""
+        return self.dice_thrown_before + self.dice_cursor
+
+    def seed_streams(self, seed):
+        """Seed the random generator of a new game"""
+        self.rng.seed(seed)
+        self.order_rng = self.deck_rng = self.dice_rng = self.rng
+        self.dice = b""
+        self.dice_cursor = 0
+        self.dice_thrown_before = 0
+
+    def new_game(self, seed=None):
+        """Seed the random generator, pick the players and shuffle the deck"""
+        self.seed_streams(seed)
+
+        # Define characters, indexed by character id
+        self.characters = [Character(character_id, transport_mode) for \
+                           character_id, transport_mode in \
+                           enumerate(self.board.transport_modes)]
+        all_characters = [self.characters[character_id] for character_id in \
+                          DRAW_ORDER if character_id in self.roster_ids]
+
+        #Create random set of active players (random starting order)
+        self.active_characters = []
+        if not self.random_order:
+            self.active_characters = [self.characters[character_id] for \
+                                      character_id in \
+                                      self.roster_ids[:self.number_of_players]]
+        while len(self.active_characters) < self.number_of_players:
+            random_character_id = \
+            self.order_rng.randrange(0, len(all_characters))
+            self.active_characters.append( \
+                all_characters.pop(random_character_id))
+
+        #Initialize sequence of random event cards
+        self.active_card_deck = self.shuffle_deck()
+        self.event_card_id = 0
+
+        #Initialize game metrics
+        self.gpm = GamePerformanceMetrics()
+        self.round_id = 0
+        self.seat = 0
+        self.overall_starting_position = 0
+        self.winner = None
+
+        self.trajectory = None
+        if self.record_positions:
+            self.trajectory = ([active_player.character_name for \
+                                active_player in self.active_characters], \
+                               bytearray())
+
+    def shuffle_deck(self):
+        """Return the event cards in random order"""
+        standard_card_deck = list(range(1, \
+                                        self.board.number_of_event_cards + 1))
+        active_card_deck = []
+        while standard_card_deck:
+            card_id = self.deck_rng.randrange(0, len(standard_card_deck))
+            active_card_deck.append(standard_card_deck.pop(card_id))
+        return active_card_deck
+
+    def draweventcard(self, active_player):
+        """Draw event card from deck"""
+        board = self.board
+        self.event_card_id = (self.event_card_id + 1) % \
+                             board.number_of_event_cards
+        event_card_number = self.active_card_deck[self.event_card_id]
+        rule = board.card_rule[event_card_number]
+
+        # Card does not apply to transport mode, was applied before (route
+        # map) or player is not far enough on the board (camera)
+        once = board.card_once[event_card_number]
+        if active_player.transport_mode not in \
+           board.card_modes[event_card_number] or \
+           (once is not None and getattr(active_player, once) > 0) or \
+           active_player.position_on_board < \
+           board.card_from_square[event_card_number]:
+            return
+
+        active_player.number_of_event_cards_drawn += 1
+        metric = board.card_metric[event_card_number]
+        if metric is not None:
+            setattr(self.gpm, metric, getattr(self.gpm, metric) + 1)
+
+        # Blister, flat tire, engine failure, road maintenance
+        if rule == WAIT:
+            active_player.number_of_turns_waiting = \
+            board.card_wait[event_card_number]
+
+        # Route map, camera, post card, walker gets ride, tailwind, head wind
+        elif board.card_moves[event_card_number]:
+            position = active_player.position_on_board
+            if rule == BACK_TO_START:
+                next_position = 0
+                setattr(active_player, once, getattr(active_player, once) + 1)
+            elif rule == GO_TO:
+                next_position = board.card_square[event_card_number]
+            elif rule == NEXT_EVENT_CARD_SQUARE:
+                next_position = board.next_event_card_square[position]
+            elif rule == THROW_FORWARD:
+                next_position = position + self.dicethrow()
+            else:
+                dice_value = self.dicethrow()
+                next_position = max(0, position - dice_value)
+                # Squares behind the start count as well
+                position = next_position + dice_value
+
+            active_player.number_of_random_squares += next_position - position
+            active_player.position_on_board = next_position
+
+            # Draw new card
+            if board.card_draws_again[event_card_number] and \
+               board.is_event_card_square[active_player.position_on_board]:
+                self.draweventcard(active_player)
+
+        # Rain: every player moves back (except for car and bus)
+        elif rule == RAIN:
+            rain_squares = board.card_squares[event_card_number]
+            for player in self.active_characters:
+                if player.transport_mode in board.rain_modes:
+                    player.position_on_board = \
+                    max(player.position_on_board - rain_squares, 0)
+
+                    player.number_of_random_squares -= rain_squares
+                    if board.is_event_square[player.position_on_board]:
+                        # Update based on new event square
+                        self.eventsquare(player)
+
+                        # Correction in counter (dishes and tunnel)
+                        position = player.position_on_board
+                        metric = board.square_metric[position]
+                        if board.square_rule[position] == STUCK and \
+                           metric is not None:
+                            setattr(self.gpm, metric, \
+                                    getattr(self.gpm, metric) - 1)
+
+                    if not board.is_event_square[player.position_on_board]:
+                        player.number_of_turns_waiting = 0
+                        #End waiting when moved from event square
+
+            # Draw card (assumption: only for active player only)
+            if board.card_draws_again[event_card_number] and \
+               active_player.transport_mode in board.rain_modes and \
+               board.is_event_card_square[active_player.position_on_board]:
+                self.draweventcard(active_player)
+
+    def eventsquare(self, active_player):
+        """Visit event square"""
+        board = self.board
+        square = active_player.position_on_board
+        rule = board.square_rule[square]
+        metric = board.square_metric[square]
+
+        # Waiting squares (some only hold motorized characters)
+        if rule == WAIT:
+            if active_player.number_of_turns_waiting == 0 and \
+               active_player.transport_mode in board.square_modes[square]:
+                active_player.number_of_turns_waiting = \
+                board.square_wait[square]
+                active_player.number_of_event_squares_visited += 1
+                if metric is not None:
+                    setattr(self.gpm, metric, getattr(self.gpm, metric) + 1)
+
+        # Chased away from money bin
+        elif rule == MOVE:
+            active_player.position_on_board += board.square_move[square]
+            active_player.number_of_event_squares_visited += 1
+
+            # Necessary to draw new card (square 74 is a random event square)
+            if board.is_event_card_square[active_player.position_on_board]:
+                self.draweventcard(active_player)
+
+            # Only event squares further on the board are visited after moving
+            if active_player.position_on_board > square and \
+               board.is_event_square[active_player.position_on_board]:
+                self.eventsquare(active_player)
+
+        # Wash dishes (continue only when throwing 6), lost in dark tunnel
+        # (continue only when throwing 2)
+        elif rule == STUCK:
+            active_player.number_of_turns_waiting = sys.maxsize
+            active_player.number_of_event_squares_visited += 1
+            if metric is not None:
+                setattr(self.gpm, metric, getattr(self.gpm, metric) + 1)
+
+        # Forgot camping card, back to start
+        elif rule == BACK_TO_START:
+            once = board.square_once[square]
+            if once is None or getattr(active_player, once) == 0:
+                if once is not None:
+                    setattr(active_player, once, \
+                            getattr(active_player, once) + 1)
+                active_player.position_on_board = 0
+                active_player.number_of_event_squares_visited += 1
+                if metric is not None:
+                    setattr(self.gpm, metric, getattr(self.gpm, metric) + 1)
+
+    def step_turn(self):
+        """Play the turn of the next player, return whether the game ended"""
+        board = self.board
+        if self.seat == 0:
+            self.overall_starting_position = 0
+            self.round_id += 1
+            if self.trace_rounds:
+                print("---Round", self.round_id, "has started---")
+        active_player = self.active_characters[self.seat]
+        self.seat = (self.seat + 1) % self.number_of_players
+
+        if active_player.allowed_to_start:
+            self.overall_starting_position += 1
+            active_player.starting_position = self.overall_starting_position
+
+        # Throw 6 to start, then everyone may start
+        if not active_player.allowed_to_start:
+            Startdice_value = self.dicethrow()
+
+            if Startdice_value == 6:
+                active_player.starting_position = 1
+                self.overall_starting_position = 1
+
+                for player in self.active_characters:
+                    player.allowed_to_start = True
+
+        dice_value = 0
+        if active_player.allowed_to_start and \
+        active_player.number_of_turns_waiting == 0:
+            dice_value = self.dicethrow()
+
+        # Check if character can take short-cut via bike lane or highway
+        # If player would land on Square 112 (back to start), then take
+        # a detour (or as the shortcut policy decides)
+        shortcut = board.shortcut_at[active_player.position_on_board]
+        if shortcut is not None and \
+        active_player.shortcut_position == 0 and \
+        self.shortcut_choices[active_player.character_id] \
+        [active_player.position_on_board][dice_value]:
+            active_player.number_of_shortcuts_taken += 1
+
+            if dice_value < shortcut.length:
+                active_player.shortcut_position = dice_value
+            else:
+                active_player.position_on_board = shortcut.exit_square + \
+                dice_value - shortcut.length
+                active_player.shortcut_position = 0
+
+        # If character is in located in the shortcut
+        elif shortcut is not None and \
+        active_player.shortcut_position > 0:
+            if dice_value <= shortcut.length - 1 - \
+            active_player.shortcut_position:
+                active_player.shortcut_position = \
+                active_player.shortcut_position + dice_value #can only be 1
+            else:
+                active_player.position_on_board = shortcut.exit_square - \
+                (shortcut.length - active_player.shortcut_position) + \
+                dice_value
+                active_player.shortcut_position = 0
+
+        # If not ending exactly at the camping, bounce back
+        elif board.bounce_back and \
+        active_player.position_on_board + dice_value > board.finish_square:
+            active_player.position_on_board = board.finish_square - \
+            (dice_value - (board.finish_square - \
+                           active_player.position_on_board))
+
+        # END OF GAME
+        elif active_player.position_on_board + dice_value >= \
+        board.finish_square:
+            active_player.position_on_board += dice_value
+            if self.trace_rounds:
+                print("Game finished: ", active_player.character_name, "won.")
+            if self.record_positions:
+                self.trajectory[1].append(active_player.position_on_board)
+            self.winner = active_player
+            return True
+
+        #Regular board movement
+        else:
+            active_player.position_on_board = \
+            active_player.position_on_board + dice_value
+
+        # RANDOM EVENT CARDS
+        if board.is_event_card_square[active_player.position_on_board] \
+        and active_player.number_of_turns_waiting == 0:
+            self.draweventcard(active_player)
+
+        # EVENT SQUARES
+        if board.is_event_square[active_player.position_on_board]:
+            self.eventsquare(active_player)
+
+            # Wash dishes until throwing 6, then move on; leave tunnel
+            # only when throwing 2
+            for stuck_square in board.stuck_squares:
+                if active_player.position_on_board == stuck_square:
+                    Escapedice_value = self.dicethrow()
+                    if Escapedice_value == board.escape_throw[stuck_square]:
+                        active_player.number_of_turns_waiting = 0
+                        if board.escape_square[stuck_square] < 0:
+                            dice_value = self.dicethrow()
+                            active_player.position_on_board = \
+                            active_player.position_on_board + dice_value
+                        else:
+                            active_player.position_on_board = \
+                            board.escape_square[stuck_square]
+
+        # Reduce waiting time
+        if active_player.number_of_turns_waiting > 0:
+            active_player.number_of_turns_waiting = \
+            active_player.number_of_turns_waiting - 1
+
+        # Update game metrics
+        if active_player.number_of_turns_waiting > 0:
+            active_player.turns_waiting += 1
+
+        if self.record_positions:
+            self.trajectory[1].append(active_player.position_on_board)
+
+        # Check if player is currently in the lead
+        active_player.number_of_turns_leading += 1
+        for player in self.active_characters:
+            if active_player.position_on_board <= \
+            player.position_on_board and \
+            active_player.character_id != player.character_id:
+                active_player.number_of_turns_leading = 0
+                break
+
+        if active_player.number_of_turns_leading > 0:
+            active_player.player_has_led = 1
+        return False
+
+    def game_result(self):
+        """Return the game metrics of a finished game
+
+        The metrics are listed as in GAMERESULTS.txt, starting from the
+        number of rounds and leaving out the run id and winner counts.
+        """
+        characters = self.characters
+        gpm = self.gpm
+        for character in characters:
+            gpm.number_event_squares_visited[character.character_id] = \
+                character.number_of_event_squares_visited
+            gpm.number_event_cards_drawn[character.character_id] = \
+                character.number_of_event_cards_drawn
+            gpm.number_squares_random[character.character_id] = \
+                character.number_of_random_squares
+        number_of_leaders_during_game = sum(active_player.player_has_led for \
+                                            active_player in \
+                                            self.active_characters)
+
+        return [self.round_id, self.winner.character_name] + \
+               [character.turns_waiting for character in characters] + \
+               [gpm.number_of_camping_cards, gpm.number_of_route_maps, \
+                gpm.number_of_cameras, gpm.number_of_postcards, \
+                self.winner.number_of_turns_leading, \
+                number_of_leaders_during_game] + \
+               [character.number_of_shortcuts_taken for character in \
+                characters] + \
+               [character.starting_position for character in characters] + \
+               gpm.number_event_squares_visited + \
+               gpm.number_event_cards_drawn + gpm.number_squares_random + \
+               [gpm.number_of_coffees, gpm.number_of_dishes_washed, \
+                gpm.number_of_tunnels]
+
+    def play_game(self, seed=None):
+        """Play one game and return its game metrics"""
+        self.new_game(seed)
+        while not self.step_turn():
+            pass
+        return self.game_result()
+
+    def play_many(self, number_of_games, master_seed=None, \
+                  first_simulation_run=0):
+        """Yield game metrics and trajectory of consecutive simulation runs
+
+        Run i is seeded with run_seed(master_seed, i), as in run_simulations.
+        """
+        for simulation_run in range(first_simulation_run, \
+                                    first_simulation_run + number_of_games):
+            game_result = self.play_game(run_seed(master_seed, simulation_run))
+            yield game_result, self.trajectory
+
+def play_games(simulation_runs, master_seed, number_of_players, \
+               record_positions, trace_rounds=False):
+    """Play a range of simulation runs (one worker task)"""
+    game = GameState(number_of_players, record_positions, trace_rounds)
+    return list(game.play_many(len(simulation_runs), master_seed, \
+                               simulation_runs.start))
+
+def run_simulations(number_of_simulation_runs, number_of_players, \
+                    number_of_workers, master_seed, record_positions=False, \
+                    trace_rounds=False, first_simulation_run=0):
+    """Yield game metrics and trajectory of all simulation runs in run order
+
+    Every run draws its random numbers from its own seed stream, so the
+    results only depend on the master seed, not on the number of workers,
+    and a batch can be resumed from any run (first_simulation_run).
+    """
+    tasks = [range(first_run, min(first_run + RUNS_PER_TASK, \
+                                  number_of_simulation_runs)) \
+             for first_run in range(first_simulation_run, \
+                                    number_of_simulation_runs, RUNS_PER_TASK)]
+
+    if number_of_workers == 1:
+        for simulation_runs in tasks:
+            yield from play_games(simulation_runs, master_seed, \
+                                  number_of_players, record_positions, \
+                                  trace_rounds)
+        return
+
+    task = partial(play_games, master_seed=master_seed, \
+                   number_of_players=number_of_players, \
+                   record_positions=record_positions, \
+                   trace_rounds=trace_rounds)
+    # Imported here, as plain imports of this module should stay fast
+    from multiprocessing import Pool
+    with Pool(number_of_workers) as pool:
+        for game_results in pool.imap(task, tasks):
+            yield from game_results
+
+def parse_arguments(argv=None):
+    """Parse the command line, defaulting to the settings above"""
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation " \
+                                     "of the Donald Duck Holiday Game")
+    parser.add_argument("-n", "--runs", type=int, \
+                        default=NUMBER_OF_SIMULATION_RUNS, \
+                        help="number of simulation runs")
+    parser.add_argument("-p", "--players", type=int, \
+                        default=NUMBER_OF_PLAYERS, help="2 to 5 players")
+    parser.add_argument("-w", "--workers", type=int, \
+                        default=NUMBER_OF_WORKERS, \
+                        help="worker processes (scalar engine)")
+    parser.add_argument("-s", "--seed", type=int, default=MASTER_SEED, \
+                        help="master seed, random if not given")
+    parser.add_argument("-e", "--engine", \
+                        choices=("scalar", "batch", "kernel"), \
+                        default="scalar", help="game loop per game (scalar), " \
+                        "vectorised over many games (batch) or compiled " \
+                        "with Numba (kernel)")
+    parser.add_argument("-o", "--results", default=RESULTS_FILE, \
+                        help="results file: .txt (text), .npy, .arrow or " \
+                        ".sqlite")
+    parser.add_argument("--no-results", dest="results", \
+                        action="store_const", const=None, \
+                        help="do not write a results file")
+    parser.add_argument("--statistics", default=STATISTICS_FILE, \
+                        help=".npz file to save the aggregate metrics to")
+    parser.add_argument("--trajectories", default=TRAJECTORY_FILE, \
+                        help=".npy file to log all positions to " \
+                        "(scalar engine)")
+    parser.add_argument("--checkpoint-interval", type=float, \
+                        default=CHECKPOINT_INTERVAL, \
+                        help="seconds between checkpoints, 0 to disable " \
+                        "(scalar and kernel engines)")
+    parser.add_argument("--progress-interval", type=float, \
+                        default=PROGRESS_INTERVAL, \
+                        help="seconds between progress reports, 0 to disable")
+    parser.add_argument("-v", "--verbosity", type=int, default=VERBOSITY, \
+                        help="0 silent, 1 summary per simulation run, " \
+                        "2 trace per round")
+    arguments = parser.parse_args(argv)
+
+    if arguments.players < 2 or arguments.players > 5:
+        parser.error("Please select a number of players between 2 and 5")
+    if arguments.runs < 1:
+        parser.error("Please select a positve number of simulation runs")
+    if arguments.workers < 1:
+        parser.error("Please select a positive number of workers")
+    # Uncompiled, the kernel is many times slower than the scalar engine
+    if arguments.engine == "kernel" and \
+       importlib.util.find_spec("numba") is None:
+        parser.error("The kernel engine needs Numba, please install it " \
+                     "or select the scalar or batch engine")
+    if arguments.engine != "scalar" and arguments.trajectories is not None:
+        parser.error("The " + arguments.engine + " engine does not record " \
+                     "trajectories")
+    return arguments
+
+def run_info(arguments, master_seed):
+    """Return what it takes to replay the runs of a batch"""
+    return {"master_seed": master_seed, \
+            "number_of_players": arguments.players, \
+            "engine": arguments.engine, "engine_version": ENGINE_VERSION}
+
+def simulate(arguments):
+    """Play all simulation runs with the scalar engine or the compiled
+    kernel, resuming if possible"""
+    # Resume from the checkpoint of an interrupted batch with the same
+    # output, unless it was played with other settings
+    master_seed = arguments.seed
+    checkpoint_interval = arguments.checkpoint_interval
+    checkpoint_file = checkpoint_path(arguments.results or "GAMERESULTS")
+    checkpoint = None
+    if checkpoint_interval > 0:
+        checkpoint = load_checkpoint(checkpoint_file)
+    if checkpoint is not None:
+        state, statistics = checkpoint
+        if state["number_of_players"] != arguments.players or \
+           state["engine_version"] != ENGINE_VERSION or \
+           state.get("engine", "scalar") != arguments.engine or \
+           state["trajectory_file"] != arguments.trajectories or \
+           master_seed not in (None, state["master_seed"]) or \
+           state["completed_runs"] > arguments.runs:
+            print("Ignoring checkpoint of other settings:", checkpoint_file, \
+                  file=sys.stderr)
+            checkpoint = None
+    if checkpoint is not None:
+        master_seed = state["master_seed"]
+        print("Resuming after simulation run", state["completed_runs"], \
+              file=sys.stderr)
+    else:
+        state = {"number_of_players": arguments.players, \
+                 "engine_version": ENGINE_VERSION, \
+                 "engine": arguments.engine, \
+                 "trajectory_file": arguments.trajectories, \
+                 "completed_runs": 0, "winners": [0] * len(CHARACTER_NAMES), \
+                 "results_position": None, "trajectory_position": None}
+        statistics = GameStatistics()
+
+    # Draw a master seed, printed so the simulation can be repeated
+    if master_seed is None:
+        master_seed = np.random.SeedSequence().entropy
+        print("Master seed:", master_seed, file=sys.stderr)
+    state["master_seed"] = master_seed
+    # Stored next to the results, so any run can be replayed
+    if arguments.results is not None:
+        save_run_info(arguments.results, run_info(arguments, master_seed))
+
+    # Initialize outer loop game metrics, in the order of CHARACTER_NAMES
+    winners = list(state["winners"])
+
+    # Game results are collected and written in blocks, and aggregated
+    if arguments.results is not None:
+        game_results = ResultsWriter(arguments.results, \
+                                     resume_from=state["results_position"])
+    if arguments.trajectories is not None:
+        player_positions = TrajectoryRecorder(arguments.trajectories, \
+            resume_from=state["trajectory_position"])
+    if arguments.progress_interval > 0:
+        progress = ProgressReporter(arguments.runs, \
+                                    arguments.progress_interval, \
+                                    state["completed_runs"])
+    # Arrow files are written as a whole and cannot be resumed
+    if checkpoint_interval > 0 and arguments.results is not None and \
+       game_results.file_format == "arrow":
+        checkpoint_interval = 0
+    next_checkpoint = time.monotonic() + checkpoint_interval
+
+    if arguments.engine == "kernel":
+        # Imported here, the kernel builds its tables when imported
+        from donald_duck_kernel import play_kernel_many
+        simulations = play_kernel_many(arguments.runs - \
+                                       state["completed_runs"], \
+                                       arguments.players, master_seed, \
+                                       state["completed_runs"])
+    else:
+        simulations = run_simulations(arguments.runs, arguments.players, \
+                                      arguments.workers, master_seed, \
+                                      arguments.trajectories is not None, \
+                                      arguments.verbosity >= 2, \
+                                      state["completed_runs"])
+    for simulation_run, (game_result, trajectory) in enumerate( \
+            simulations, state["completed_runs"]):
+        winner_name = game_result[1]
+        winners[CHARACTER_NAMES.index(winner_name)] += 1
+
+        row = [simulation_run + 1, game_result[0], winner_name] + winners + \
+              game_result[2:]
+        if arguments.results is not None:
+            game_results.write_row(row)
+        statistics.update_row(row)
+        if trajectory is not None:
+            player_positions.write(simulation_run + 1, *trajectory)
+
+        if arguments.verbosity >= 1:
+            print("Simulation run", simulation_run + 1, "-", winner_name, \
+                  "won after", game_result[0], "rounds")
+        if arguments.progress_interval > 0:
+            progress.update(simulation_run + 1)
+
+        # Files first, then the checkpoint that points into them
+        if checkpoint_interval > 0 and time.monotonic() >= next_checkpoint:
+            state["completed_runs"] = simulation_run + 1
+            state["winners"] = list(winners)
+            if arguments.results is not None:
+                state["results_position"] = game_results.checkpoint()
+            if arguments.trajectories is not None:
+                state["trajectory_position"] = player_positions.checkpoint()
+            save_checkpoint(checkpoint_file, state, statistics)
+            next_checkpoint = time.monotonic() + checkpoint_interval
+
+    if arguments.results is not None:
+        game_results.close()
+    if arguments.trajectories is not None:
+        player_positions.close()
+    remove_checkpoint(checkpoint_file)
+    return statistics
+
+def simulate_batch_engine(arguments):
+    """Play all simulation runs with the vectorised batch engine"""
+    # Imported here, the batch engine builds its tables when imported
+    from donald_duck_batch import iterate_batches
+
+    master_seed = arguments.seed
+    if master_seed is None:
+        master_seed = np.random.SeedSequence().entropy
+        print("Master seed:", master_seed, file=sys.stderr)
+    statistics = GameStatistics()
+    if arguments.results is not None:
+        save_run_info(arguments.results, run_info(arguments, master_seed))
+        print("Runs of the batch engine cannot be replayed one by one", \
+              file=sys.stderr)
+        game_results = ResultsWriter(arguments.results)
+    if arguments.progress_interval > 0:
+        progress = ProgressReporter(arguments.runs, \
+                                    arguments.progress_interval)
+    games_played = 0
+    for results in iterate_batches(arguments.runs, arguments.players, \
+                                   master_seed):
+        if arguments.results is not None:
+            game_results.write_columns(results)
+        statistics.update_columns(results)
+        games_played += len(results["SimulationRunID"])
+        if arguments.progress_interval > 0:
+            progress.update(games_played)
+    if arguments.results is not None:
+        game_results.close()
+    return statistics
+
+def main(argv=None):
+    """Run the simulation as configured on the command line"""
+    arguments = parse_arguments(argv)
+    if arguments.engine == "batch":
+        statistics = simulate_batch_engine(arguments)
+    else:
+        statistics = simulate(arguments)
+    if arguments.statistics is not None:
+        statistics.save(arguments.statistics)
+    if arguments.verbosity >= 1:
+        print(statistics.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+Importance sampling for the Donald Duck Holiday Game
+Estimates the probabilities of rare events (very long games, long stays
+on the squares that need a 6 or a 2 to leave, a player sent back to
+start by both the route map and the camping card) from games played
+with biased dice and a biased event card deck: escape throws succeed
+less often, and chosen cards are shuffled towards the top of the deck.
+Every game carries its likelihood ratio, the probability of its random
+draws with fair dice and a uniform shuffle over their probability with
+the biased ones. The means of the weighted metrics are unbiased
+estimates under the real rules, and their confidence intervals come
+from the spread of the weighted values. For every metric the summary
+shows how many times more runs plain sampling would need for the same
+precision, which tells whether a bias pays off: a bias that changes
+every throw of a game spreads the weights so much that it rarely does.
+Without any bias the games are the plain games of a seed.
+This code has been published under the GNU GPLv3 license
+"""
+import sys
+from bisect import bisect
+from itertools import accumulate
+from math import exp, log
+from statistics import NormalDist
+
+import numpy as np
+
+from donald_duck_holiday_game import GameState, run_seed
+from donald_duck_stats import CONFIDENCE, STATISTIC_COLUMNS, metric_values
+
+NUMBER_OF_SIMULATION_RUNS = 10000
+MASTER_SEED = None # fixed integer for reproducible results, None for random
+NUMBER_OF_PLAYERS = 5
+# Biased dice and deck (None and {} keep the fair die and uniform deck)
+MOVE_DICE = None # probabilities of throwing 1 to 6, except escape throws
+ESCAPE_PROBABILITY = 1 / 8 # chance to throw the 6 or 2 leaving squares 92/98
+CARD_WEIGHTS = {} # event card number -> weight in the shuffle, default 1
+
+TAIL_ROUNDS = 150 # games with more rounds are long games
+STUCK_TURNS = 50 # turns on squares 92 and 98, all players, of long stays
+RESET_PLAYERS = 4 # players sent back by both the route map and camping card
+TAIL_EVENTS = ("RoundsOver{}".format(TAIL_ROUNDS), \
+               "StuckOver{}Turns".format(STUCK_TURNS), \
+               "BothResetsFor{}Players".format(RESET_PLAYERS))
+COLUMNS = STATISTIC_COLUMNS + TAIL_EVENTS
+
+def tail_events(game):
+    """Return whether each of TAIL_EVENTS occurred in a finished game"""
+    gpm = game.gpm
+    return [game.round_id > TAIL_ROUNDS, \
+            gpm.number_of_dishes_washed + gpm.number_of_tunnels > \
+            STUCK_TURNS, \
+            sum(player.number_maps_collected > 0 and \
+                player.number_camping_cards_collected > 0 \
+                for player in game.active_characters) >= RESET_PLAYERS]
+
+
+class ImportanceSampledGame(GameState):
+    """Game with biased dice and deck that keeps its likelihood ratio
+
+    An escape throw (on squares 92 and 98) succeeds with
+    escape_probability, other throws follow move_dice, and the deck is
+    drawn card by card with probabilities proportional to card_weights.
+    log_weight is the log likelihood ratio of the game so far.
+    """
+    def __init__(self, move_dice=MOVE_DICE, \
+                 escape_probability=ESCAPE_PROBABILITY, \
+                 card_weights=CARD_WEIGHTS, **game_arguments):
+        GameState.__init__(self, **game_arguments)
+        self.move_dice = move_dice
+        if move_dice is not None:
+            if len(move_dice) != 6 or min(move_dice) <= 0 or \
+               abs(sum(move_dice) - 1) > 1e-9:
+                raise ValueError("Please select six positive dice " \
+                                 "probabilities adding up to 1")
+            self.move_cumulative = list(accumulate(move_dice))
+            self.move_log_ratio = [log(1 / 6 / probability) for \
+                                   probability in move_dice]
+        self.escape_probability = escape_probability
+        if escape_probability is not None:
+            if not 0 < escape_probability < 1:
+                raise ValueError("Please select an escape probability " \
+                                 "between 0 and 1")
+            self.escape_log_ratio = (log(1 / 6 / escape_probability), \
+                                     log(5 / 6 / (1 - escape_probability)))
+        if min(card_weights.values(), default=1) <= 0:
+            raise ValueError("Please select positive card weights")
+        self.card_weights = [card_weights.get(card, 1) for card in \
+                             range(self.board.number_of_event_cards + 1)]
+        self.log_weight = 0.0
+
+    def seed_streams(self, seed):
+        """Seed the random generator and reset the likelihood ratio"""
+        GameState.seed_streams(self, seed)
+        self.log_weight = 0.0
+
+    def weight(self):
+        """Return the likelihood ratio of the game"""
+        return exp(self.log_weight)
+
+    def shuffle_deck(self):
+        """Draw the deck card by card, heavier cards first"""
+        if len(set(self.card_weights[1:])) <= 1:
+            return GameState.shuffle_deck(self)
+        standard_card_deck = list(range(1, \
+                                        self.board.number_of_event_cards + 1))
+        weights = self.card_weights[1:]
+        draw_order = []
+        while standard_card_deck:
+            cumulative = list(accumulate(weights))
+            card_id = min(bisect(cumulative, self.deck_rng.random() * \
+                                 cumulative[-1]), len(weights) - 1)
+            self.log_weight += log(cumulative[-1] / weights.pop(card_id) / \
+                                   len(standard_card_deck))
+            draw_order.append(standard_card_deck.pop(card_id))
+        # draweventcard starts at the second card and ends with the first
+        return draw_order[-1:] + draw_order[:-1]
+
+    def dicethrow(self):
+        """Throw die from the biased distribution of this kind of throw"""
+        active_player = self.active_characters[self.seat - 1]
+        escape_throw = self.board.escape_throw[active_player.position_on_board]
+        if self.escape_probability is not None and escape_throw and \
+           active_player.number_of_turns_waiting == sys.maxsize:
+            if self.dice_rng.random() < self.escape_probability:
+                self.log_weight += self.escape_log_ratio[0]
+                return escape_throw
+            self.log_weight += self.escape_log_ratio[1]
+            dice_value = self.dice_rng.randrange(1, 6)
+            return dice_value + (dice_value >= escape_throw)
+        if self.move_dice is None:
+            return GameState.dicethrow(self)
+        dice_value = min(bisect(self.move_cumulative, \
+                                self.dice_rng.random()), 5) + 1
+        self.log_weight += self.move_log_ratio[dice_value - 1]
+        return dice_value
+
+
+class WeightedStatistics:
+    """Aggregate weighted metrics and tail events of biased games"""
+    def __init__(self):
+        self.count = 0
+        self.weighted_sum = np.zeros(len(COLUMNS))
+        # Sums of (weight * value)^2 and weight * value^2
+        self.weighted_squares = np.zeros(len(COLUMNS))
+        self.second_moment_sum = np.zeros(len(COLUMNS))
+        self.weight_sum = 0.0
+        self.weight_squares = 0.0
+
+    def update(self, values, weight):
+        """Add the metrics of one game with its likelihood ratio"""
+        values = np.asarray(values, dtype=np.float64)
+        self.count += 1
+        self.weighted_sum += weight * values
+        self.weighted_squares += (weight * values) ** 2
+        self.second_moment_sum += weight * values ** 2
+        self.weight_sum += weight
+        self.weight_squares += weight ** 2
+
+    def merge(self, other):
+        """Add the games aggregated by another WeightedStatistics"""
+        self.count += other.count
+        self.weighted_sum += other.weighted_sum
+        self.weighted_squares += other.weighted_squares
+        self.second_moment_sum += other.second_moment_sum
+        self.weight_sum += other.weight_sum
+        self.weight_squares += other.weight_squares
+
+    def mean(self):
+        """Return the unbiased estimate of every metric"""
+        return self.weighted_sum / self.count
+
+    def variance(self):
+        """Return the sample variance of the weighted values"""
+        mean = self.mean()
+        return np.maximum(self.weighted_squares - self.count * mean ** 2, \
+                          0) / max(self.count - 1, 1)
+
+    def confidence_interval(self, confidence=CONFIDENCE):
+        """Return the lower and upper bounds of the estimates"""
+        margin = NormalDist().inv_cdf(0.5 + confidence / 2) * \
+                 np.sqrt(self.variance() / self.count)
+        mean = self.mean()
+        return mean - margin, mean + margin
+
+    def speedup(self):
+        """Return how many times more runs plain sampling would need
+
+        The variance of plain sampling is estimated from the weighted
+        second moments.
+        """
+        plain_variance = self.second_moment_sum / self.count - \
+                         self.mean() ** 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return plain_variance / self.variance()
+
+    def effective_sample_size(self):
+        """Return the effective number of games of the weights"""
+        return self.weight_sum ** 2 / self.weight_squares
+
+    def summary(self, confidence=CONFIDENCE):
+        """Return one line per metric with estimate, interval and speedup"""
+        lower, upper = self.confidence_interval(confidence)
+        speedup = self.speedup()
+        lines = ["{} biased games, effective sample size {:.0f}, mean " \
+                 "weight {:.4f}, {:.0%} confidence intervals".format( \
+                 self.count, self.effective_sample_size(), \
+                 self.weight_sum / self.count, confidence)]
+        for column, name in enumerate(COLUMNS):
+            lines.append("{}: {:.6f} [{:.6f}, {:.6f}], speedup {:.2f}" \
+                         .format(name, self.mean()[column], lower[column], \
+                                 upper[column], speedup[column]))
+        return "\n".join(lines)
+
+
+def estimate(number_of_games, master_seed, \
+             number_of_players=NUMBER_OF_PLAYERS, **bias):
+    """Play biased games and return their weighted statistics"""
+    game = ImportanceSampledGame(number_of_players=number_of_players, **bias)
+    statistics = WeightedStatistics()
+    for simulation_run in range(number_of_games):
+        game_result = game.play_game(run_seed(master_seed, simulation_run))
+        statistics.update(metric_values(game_result[0], game_result[1], \
+                                        game_result[2:]) + \
+                          tail_events(game), game.weight())
+    return statistics
+
+
+if __name__ == "__main__":
+    # Draw a master seed, printed so the estimates can be repeated
+    if MASTER_SEED is None:
+        MASTER_SEED = np.random.SeedSequence().entropy
+        print("Master seed:", MASTER_SEED, file=sys.stderr)
+
+    print(estimate(NUMBER_OF_SIMULATION_RUNS, MASTER_SEED, \
+                   move_dice=MOVE_DICE, \
+                   escape_probability=ESCAPE_PROBABILITY, \
+                   card_weights=CARD_WEIGHTS).summary())
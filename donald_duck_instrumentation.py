@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation of the turn loop of the Donald Duck Holiday Game
+InstrumentedGame plays exactly the games of GameState, but counts turns,
+start throws, shortcuts, stuck escapes, event cards drawn and applied
+per card number, event square visits per square, the recursion depth of
+draweventcard and the event squares reached through rain. Every
+SAMPLE_INTERVAL-th turn is timed, split into the event card and event
+square handling and the rest of the turn (start throw, movement,
+shortcuts and leader tracking), as are the results and trajectory
+writers. Ordinary runs use GameState and pay nothing for this.
+This code has been published under the GNU GPLv3 license
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+from donald_duck_board import RAIN
+from donald_duck_holiday_game import GameState
+from donald_duck_results import CHARACTER_NAMES, ResultsWriter
+from donald_duck_trajectories import TrajectoryRecorder
+
+NUMBER_OF_SIMULATION_RUNS = 10000 # at least 1 simulation run
+NUMBER_OF_PLAYERS = 5 # between 2 and 5 players
+MASTER_SEED = None # fixed integer for reproducible results, None for random
+SAMPLE_INTERVAL = 16 # every n-th turn is timed
+WRITER_FORMAT = "txt" # results written to a temporary file, None to skip
+
+# Phases of a turn, timed on sampled turns
+PHASES = ("draweventcard", "eventsquare", "rest of turn")
+
+
+class InstrumentedGame(GameState):
+    """Game counting calls and branch hits and sampling phase timings"""
+    def __init__(self, *args, sample_interval=SAMPLE_INTERVAL, **kwargs):
+        GameState.__init__(self, *args, **kwargs)
+        self.sample_interval = sample_interval
+        self.counters = Counter()
+        self.seconds = Counter() # sampled wall time per phase
+        self.samples = Counter() # sampled calls per phase
+        self.sampling = False
+        self.depth = 0 # nested draweventcard and eventsquare calls
+        self.card_depth = 0
+        self.rain_depth = 0
+        self.cards_applied_below = []
+
+    def cards_drawn(self):
+        """Return the number of event cards applied in this game so far"""
+        return sum(player.number_of_event_cards_drawn for player in \
+                   self.active_characters)
+
+    def timed(self, phase, function, *args):
+        """Call function, timing it on sampled turns if it is not nested"""
+        if not self.sampling or self.depth > 0:
+            self.depth += 1
+            try:
+                return function(*args)
+            finally:
+                self.depth -= 1
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.seconds[phase] += time.perf_counter() - start
+            self.samples[phase] += 1
+            self.depth -= 1
+
+    def fill_dice(self):
+        """Refill the dice pool, counting the refills"""
+        self.counters["dice pool refills"] += 1
+        GameState.fill_dice(self)
+
+    def dicethrow(self):
+        """Throw die, counting the escape throws on squares 92 and 98
+
+        Every stuck turn, including the turn a player lands on the
+        square, has one escape throw.
+        """
+        dice_value = GameState.dicethrow(self)
+        active_player = self.active_characters[self.seat - 1]
+        escape_throw = self.board.escape_throw[active_player.position_on_board]
+        if escape_throw and \
+           active_player.number_of_turns_waiting == sys.maxsize:
+            self.counters["stuck turns"] += 1
+            self.counters["stuck escapes"] += dice_value == escape_throw
+        return dice_value
+
+    def draweventcard(self, active_player):
+        """Draw an event card, counting it per card number and depth"""
+        board = self.board
+        event_card_number = self.active_card_deck[ \
+            (self.event_card_id + 1) % board.number_of_event_cards]
+        rain = board.card_rule[event_card_number] == RAIN
+        self.card_depth += 1
+        self.rain_depth += rain
+        self.counters["draweventcard depth", self.card_depth] += 1
+        self.cards_applied_below.append(0)
+        cards_drawn = self.cards_drawn()
+        try:
+            self.timed("draweventcard", GameState.draweventcard, self, \
+                       active_player)
+        finally:
+            self.card_depth -= 1
+            self.rain_depth -= rain
+        applied = self.cards_drawn() - cards_drawn
+        nested = self.cards_applied_below.pop()
+        if self.cards_applied_below:
+            self.cards_applied_below[-1] += applied
+        self.counters["card", event_card_number, \
+                      "applied" if applied > nested else "skipped"] += 1
+
+    def eventsquare(self, active_player):
+        """Visit an event square, counting visits and rain cascades"""
+        square = active_player.position_on_board
+        self.counters["square", square] += 1
+        if self.rain_depth > 0:
+            self.counters["rain cascade", square] += 1
+        self.timed("eventsquare", GameState.eventsquare, self, active_player)
+
+    def step_turn(self):
+        """Play a turn, counting its branches and timing sampled turns"""
+        active_player = self.active_characters[self.seat]
+        allowed_to_start = active_player.allowed_to_start
+        turns_waiting = active_player.number_of_turns_waiting
+        shortcuts_taken = active_player.number_of_shortcuts_taken
+        self.counters["turns"] += 1
+        self.sampling = self.counters["turns"] % self.sample_interval == 0
+        if self.sampling:
+            start = time.perf_counter()
+            game_ended = GameState.step_turn(self)
+            self.seconds["turn"] += time.perf_counter() - start
+            self.samples["turn"] += 1
+            self.sampling = False
+        else:
+            game_ended = GameState.step_turn(self)
+
+        if not allowed_to_start:
+            self.counters["start throws"] += 1
+            self.counters["starts"] += active_player.allowed_to_start
+        # Stuck players start their turns at sys.maxsize - 1, their
+        # turns are counted by dicethrow
+        elif 0 < turns_waiting < sys.maxsize - 1:
+            self.counters["waiting turns"] += 1
+        self.counters["shortcuts taken"] += \
+            active_player.number_of_shortcuts_taken - shortcuts_taken
+        if game_ended:
+            self.counters["games"] += 1
+            self.counters["rounds"] += self.round_id
+        else:
+            self.counters["turns in the lead"] += \
+                active_player.number_of_turns_leading > 0
+        return game_ended
+
+    def merge(self, other):
+        """Add the counters and timings of another InstrumentedGame"""
+        self.counters.update(other.counters)
+        self.seconds.update(other.seconds)
+        self.samples.update(other.samples)
+
+    def report(self):
+        """Return the breakdown of counters and phase timings as text"""
+        counters = self.counters
+        games = max(counters["games"], 1)
+        lines = ["{} games, {} rounds, {} turns, {:.1f} turns per game".format( \
+                 counters["games"], counters["rounds"], counters["turns"], \
+                 counters["turns"] / games)]
+        for name in ("start throws", "starts", "waiting turns", \
+                     "stuck turns", "stuck escapes", "shortcuts taken", \
+                     "turns in the lead", "dice pool refills"):
+            lines.append("{}: {} ({:.2f} per game)".format( \
+                         name, counters[name], counters[name] / games))
+
+        lines.append("draweventcard calls by recursion depth: " + \
+                     ", ".join("{}: {}".format(key[1], counters[key]) for \
+                               key in sorted(k for k in counters if \
+                               k[0] == "draweventcard depth")))
+        for event_card_number in range(1, \
+                                       self.board.number_of_event_cards + 1):
+            applied = counters["card", event_card_number, "applied"]
+            skipped = counters["card", event_card_number, "skipped"]
+            if applied or skipped:
+                lines.append("card {}: {} applied, {} skipped ({:.2f} " \
+                             "applied per game)".format(event_card_number, \
+                             applied, skipped, applied / games))
+        for square in range(self.board.board_size):
+            if counters["square", square]:
+                lines.append("event square {}: {} visits, {} through rain" \
+                             .format(square, counters["square", square], \
+                                     counters["rain cascade", square]))
+
+        # Phase times from sampled turns, the rest of the turn is the
+        # turn time not spent in event cards or event squares
+        turn_time = self.seconds["turn"]
+        if self.samples["turn"]:
+            lines.append("turn: {:.2f} us per turn ({} sampled turns)".format( \
+                         1e6 * turn_time / self.samples["turn"], \
+                         self.samples["turn"]))
+            rest = turn_time - self.seconds["draweventcard"] - \
+                   self.seconds["eventsquare"]
+            for phase in PHASES:
+                seconds = rest if phase == "rest of turn" else \
+                          self.seconds[phase]
+                calls = self.samples["turn"] if phase == "rest of turn" else \
+                        self.samples[phase]
+                lines.append("{}: {:.1%} of turn time, {:.2f} us per " \
+                             "call".format(phase, seconds / turn_time, \
+                                           1e6 * seconds / max(calls, 1)))
+        for phase in sorted(set(self.samples) - set(PHASES) - {"turn"}):
+            lines.append("{}: {:.2f} us per call ({} calls)".format( \
+                         phase, 1e6 * self.seconds[phase] / \
+                         self.samples[phase], self.samples[phase]))
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if MASTER_SEED is None:
+        MASTER_SEED = np.random.SeedSequence().entropy
+        print("Master seed:", MASTER_SEED, file=sys.stderr)
+
+    GAME = InstrumentedGame(NUMBER_OF_PLAYERS, \
+                            record_positions=WRITER_FORMAT is not None)
+    WINNERS = dict.fromkeys(CHARACTER_NAMES, 0)
+    with tempfile.TemporaryDirectory() as DIRECTORY:
+        if WRITER_FORMAT is not None:
+            GAMERESULTS = ResultsWriter(os.path.join(DIRECTORY, \
+                                                     "results." + WRITER_FORMAT))
+            PLAYER_POSITIONS = TrajectoryRecorder(os.path.join(DIRECTORY, \
+                                                  "positions.npy"))
+        for SIMULATION_RUN, (GAME_RESULT, TRAJECTORY) in enumerate( \
+                GAME.play_many(NUMBER_OF_SIMULATION_RUNS, MASTER_SEED)):
+            WINNERS[GAME_RESULT[1]] += 1
+            if WRITER_FORMAT is not None:
+                ROW = [SIMULATION_RUN + 1, GAME_RESULT[0], GAME_RESULT[1]] + \
+                      list(WINNERS.values()) + GAME_RESULT[2:]
+                START = time.perf_counter()
+                GAMERESULTS.write_row(ROW)
+                MIDDLE = time.perf_counter()
+                PLAYER_POSITIONS.write(SIMULATION_RUN + 1, *TRAJECTORY)
+                GAME.seconds["results writer"] += MIDDLE - START
+                GAME.seconds["trajectory writer"] += \
+                    time.perf_counter() - MIDDLE
+                GAME.samples["results writer"] += 1
+                GAME.samples["trajectory writer"] += 1
+        # Closing writes the last blocks, which counts as writer time
+        if WRITER_FORMAT is not None:
+            START = time.perf_counter()
+            GAMERESULTS.close()
+            MIDDLE = time.perf_counter()
+            PLAYER_POSITIONS.close()
+            GAME.seconds["results writer"] += MIDDLE - START
+            GAME.seconds["trajectory writer"] += time.perf_counter() - MIDDLE
+    print(GAME.report())
@@ -0,0 +1,562 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled game kernel for the Donald Duck Holiday Game
+Plays whole games on plain integer arrays with the rules of GameState
+(event cards, event squares, shortcuts, bouncing back and leader
+tracking, read from the tables of the board file) and returns one
+metrics row per game. The kernel is compiled with Numba when it is
+installed and runs as plain Python otherwise, with the same results.
+Cards drawing new cards, rain and moving event squares are handled on
+an explicit stack of pending events instead of by recursion, which
+keeps the compiled functions cacheable. Every simulation run draws its
+dice from its own xoshiro256** stream, seeded from the master seed and
+the run number, so the results do not depend on how runs are split
+over tasks or workers; they are statistically, not bitwise, identical
+to GameState.
+This code has been published under the GNU GPLv3 license
+"""
+import sys
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+from donald_duck_board import BACK_TO_START, GO_TO, MOVE, ONCE_ATTRIBUTES, \
+    NEXT_EVENT_CARD_SQUARE, RAIN, STUCK, THROW_FORWARD, WAIT, load_board
+from donald_duck_results import CHARACTER_NAMES
+
+NUMBER_OF_PLAYERS = 5 # between 2 and 5 players
+KERNEL_BLOCK = 10000 # games played per kernel call
+EVENT_STACK_SIZE = 64 # pending events, far more than any game needs
+WAIT_FOREVER = sys.maxsize
+
+# Board and event card rules, see donald_duck_board.json; the tables are
+# compiled into the kernel, so it always plays on this board
+BOARD = load_board()
+
+def jit(function):
+    """Compile function with Numba if it is installed"""
+    if numba is None:
+        return function
+    return numba.njit(cache=True, error_model="numpy")(function)
+
+# Characters in the order new_game draws them from
+DRAW_ORDER = np.array([CHARACTER_NAMES.index(name) for name in \
+                       ("Donald", "Goofy", "Clarabelle", "Horace", \
+                        "Huey, Dewey & Louie")])
+# Game metrics in the results, in column order
+RESULT_METRICS = ("number_of_camping_cards", "number_of_route_maps", \
+                  "number_of_cameras", "number_of_postcards")
+STAY_METRICS = ("number_of_coffees", "number_of_dishes_washed", \
+                "number_of_tunnels") # the last results columns
+METRICS = tuple(sorted(set(name for name in BOARD.card_metric + \
+                           BOARD.square_metric if name is not None) | \
+                       set(RESULT_METRICS + STAY_METRICS)))
+ONCE_COUNTERS = tuple(sorted(set(ONCE_ATTRIBUTES.values())))
+NUMBER_OF_CHARACTERS = len(CHARACTER_NAMES)
+NUMBER_OF_EVENT_CARDS = BOARD.number_of_event_cards
+FINISH_SQUARE = BOARD.finish_square
+BOUNCE_BACK = BOARD.bounce_back
+# Metrics row: rounds, winner id and the per-game results columns
+ROW_LENGTH = 2 + NUMBER_OF_CHARACTERS + len(RESULT_METRICS) + 2 + \
+             5 * NUMBER_OF_CHARACTERS + len(STAY_METRICS)
+
+# Square table fields, indexed by position
+(IS_CARD_SQUARE, IS_EVENT_SQUARE, NEXT_CARD_SQUARE, SQUARE_RULE, \
+ SQUARE_WAIT, SQUARE_MOVE, SQUARE_ONCE, SQUARE_METRIC, SQUARE_SHORTCUT, \
+ ESCAPE_THROW, ESCAPE_SQUARE) = range(11)
+# Card table fields, indexed by card number
+(CARD_RULE, CARD_WAIT, CARD_SQUARE, CARD_FROM_SQUARE, CARD_SQUARES, \
+ CARD_DRAWS_AGAIN, CARD_ONCE, CARD_METRIC, CARD_MOVES) = range(9)
+# Shortcut table fields
+SHORTCUT_EXIT, SHORTCUT_LENGTH = range(2)
+
+# The state of a game is one integer array: a row per character, the
+# game row and a row per pending event. It is indexed element by element,
+# compiled array views (state[player]) cost about as much as a turn.
+(POSITION, WAITING, SHORTCUT_POSITION, TURNS_WAITING, STARTING_POSITION, \
+ SHORTCUTS_TAKEN, SQUARES_VISITED, CARDS_DRAWN, RANDOM_SQUARES, \
+ TURNS_LEADING, HAS_LED, ONCE) = range(12) # character row
+(EVENT_CARD_ID, OVERALL_STARTING_POSITION, ROUND_ID, SEAT, \
+ ALLOWED_TO_START, PLAYERS, PENDING_EVENTS, METRIC) = range(8) # game row
+DECK = METRIC + len(METRICS) # the shuffled deck, then the seats
+SEATS = DECK + NUMBER_OF_EVENT_CARDS
+GAME = NUMBER_OF_CHARACTERS
+EVENTS = GAME + 1
+STATE_COLUMNS = max(ONCE + len(ONCE_COUNTERS), SEATS + NUMBER_OF_CHARACTERS)
+# Pending events: kind, player and two arguments
+DRAW_CARD = 0 # draw an event card
+VISIT_SQUARE = 1 # visit the event square of the player
+MOVED_FROM_SQUARE = 2 # visit squares further on after a move (square)
+RAIN_ON_SEAT = 3 # let it rain on the player at a seat (card, seat)
+RAINED_ON_SQUARE = 4 # correct counters after rain moved a player
+
+def _mode_mask(modes):
+    """Lookup table: character id -> transport mode in modes"""
+    return [mode in modes for mode in BOARD.transport_modes]
+
+# Board tables, indexed by square, card number and character id
+_ONCE = {name: index for index, name in enumerate(ONCE_COUNTERS)}
+_METRIC = {name: index for index, name in enumerate(METRICS)}
+_SHORTCUT = {id(shortcut): index for index, shortcut in \
+             enumerate(BOARD.shortcuts)}
+SQUARES = np.array([[BOARD.is_event_card_square[square], \
+    BOARD.is_event_square[square], BOARD.next_event_card_square[square], \
+    BOARD.square_rule[square], BOARD.square_wait[square], \
+    BOARD.square_move[square], _ONCE.get(BOARD.square_once[square], -1), \
+    _METRIC.get(BOARD.square_metric[square], -1), \
+    _SHORTCUT.get(id(BOARD.shortcut_at[square]), -1), \
+    BOARD.escape_throw[square], BOARD.escape_square[square]] \
+    for square in range(BOARD.board_size)], dtype=np.int64)
+SQUARE_APPLIES = np.array([_mode_mask(modes) for modes in BOARD.square_modes])
+CARDS = np.array([[BOARD.card_rule[card], BOARD.card_wait[card], \
+    BOARD.card_square[card], BOARD.card_from_square[card], \
+    BOARD.card_squares[card], BOARD.card_draws_again[card], \
+    _ONCE.get(BOARD.card_once[card], -1), \
+    _METRIC.get(BOARD.card_metric[card], -1), BOARD.card_moves[card]] \
+    for card in range(NUMBER_OF_EVENT_CARDS + 1)], dtype=np.int64)
+CARD_APPLIES = np.array([_mode_mask(modes) for modes in BOARD.card_modes])
+MOVED_BY_RAIN = np.array(_mode_mask(BOARD.rain_modes))
+SHORTCUTS = np.array([[shortcut.exit_square, shortcut.length] for \
+                      shortcut in BOARD.shortcuts], \
+                     dtype=np.int64).reshape(-1, 2)
+STUCK_SQUARES = np.array(BOARD.stuck_squares, dtype=np.int64)
+RESULT_METRIC_INDEX = np.array([_METRIC[name] for name in RESULT_METRICS])
+STAY_METRIC_INDEX = np.array([_METRIC[name] for name in STAY_METRICS])
+# Shortcut choices of the rules, by character, shortcut and throw
+DEFAULT_POLICY = np.array(BOARD.policy_table(), dtype=np.int64) \
+                 .reshape(NUMBER_OF_CHARACTERS, -1, 7)
+
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+@jit
+def splitmix64(state):
+    """Return the splitmix64 output of a counter state"""
+    z = (state ^ (state >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+@jit
+def seed_random(rng, key, simulation_run):
+    """Seed the xoshiro256** stream of one simulation run"""
+    state = key + np.uint64(4) * np.uint64(simulation_run) * GOLDEN_GAMMA
+    for index in range(4):
+        state += GOLDEN_GAMMA
+        rng[index] = splitmix64(state)
+    rng[4] = 0 # random bytes not handed out yet
+    rng[5] = 0 # number of those bytes
+
+@jit
+def random_byte(rng):
+    """Return the next random byte of the xoshiro256** stream"""
+    if rng[5] == 0:
+        result = rng[1] * np.uint64(5)
+        result = ((result << np.uint64(7)) | \
+                  (result >> np.uint64(57))) * np.uint64(9)
+        shifted = rng[1] << np.uint64(17)
+        rng[2] ^= rng[0]
+        rng[3] ^= rng[1]
+        rng[1] ^= rng[2]
+        rng[0] ^= rng[3]
+        rng[2] ^= shifted
+        rng[3] = (rng[3] << np.uint64(45)) | (rng[3] >> np.uint64(19))
+        rng[4] = result
+        rng[5] = 8
+    byte = rng[4] & np.uint64(0xFF)
+    rng[4] >>= np.uint64(8)
+    rng[5] -= np.uint64(1)
+    return np.int64(byte)
+
+@jit
+def randrange(rng, stop):
+    """Return a uniform integer from 0 to stop - 1 (stop below 256)"""
+    limit = 256 - 256 % stop
+    byte = random_byte(rng)
+    while byte >= limit:
+        byte = random_byte(rng)
+    return byte % stop
+
+@jit
+def dicethrow(rng):
+    """Throw die"""
+    return randrange(rng, 6) + 1
+
+@jit
+def push_event(state, kind, player, first=0, second=0):
+    """Put an event on the stack of pending events"""
+    pending = state[GAME, PENDING_EVENTS]
+    if pending == EVENT_STACK_SIZE:
+        raise RuntimeError("Too many pending events")
+    state[EVENTS + pending, 0] = kind
+    state[EVENTS + pending, 1] = player
+    state[EVENTS + pending, 2] = first
+    state[EVENTS + pending, 3] = second
+    state[GAME, PENDING_EVENTS] = pending + 1
+
+@jit
+def draw_card(state, rng, player):
+    """Draw event card from deck"""
+    state[GAME, EVENT_CARD_ID] = (state[GAME, EVENT_CARD_ID] + 1) % \
+                                 NUMBER_OF_EVENT_CARDS
+    card = state[GAME, DECK + state[GAME, EVENT_CARD_ID]]
+    rule = CARDS[card, CARD_RULE]
+
+    # Card does not apply to transport mode, was applied before (route
+    # map) or player is not far enough on the board (camera)
+    once = CARDS[card, CARD_ONCE]
+    if not CARD_APPLIES[card, player] or \
+       (once >= 0 and state[player, ONCE + once] > 0) or \
+       state[player, POSITION] < CARDS[card, CARD_FROM_SQUARE]:
+        return
+
+    state[player, CARDS_DRAWN] += 1
+    if CARDS[card, CARD_METRIC] >= 0:
+        state[GAME, METRIC + CARDS[card, CARD_METRIC]] += 1
+
+    if rule == WAIT:
+        state[player, WAITING] = CARDS[card, CARD_WAIT]
+
+    elif CARDS[card, CARD_MOVES]:
+        position = state[player, POSITION]
+        if rule == BACK_TO_START:
+            next_position = 0
+            state[player, ONCE + once] += 1
+        elif rule == GO_TO:
+            next_position = CARDS[card, CARD_SQUARE]
+        elif rule == NEXT_EVENT_CARD_SQUARE:
+            next_position = SQUARES[position, NEXT_CARD_SQUARE]
+        elif rule == THROW_FORWARD:
+            next_position = position + dicethrow(rng)
+        else:
+            dice_value = dicethrow(rng)
+            next_position = max(0, position - dice_value)
+            # Squares behind the start count as well
+            position = next_position + dice_value
+
+        state[player, RANDOM_SQUARES] += next_position - position
+        state[player, POSITION] = next_position
+
+        # Draw new card
+        if CARDS[card, CARD_DRAWS_AGAIN] and \
+           SQUARES[next_position, IS_CARD_SQUARE]:
+            push_event(state, DRAW_CARD, player)
+
+    # Rain: every player moves back (except for car and bus)
+    elif rule == RAIN:
+        push_event(state, RAIN_ON_SEAT, player, card, 0)
+
+@jit
+def rain_on_seat(state, player, card, seat):
+    """Move the player at a seat back, then the next seat"""
+    # After the last seat, draw card (assumption: active player only)
+    if seat == state[GAME, PLAYERS]:
+        if CARDS[card, CARD_DRAWS_AGAIN] and MOVED_BY_RAIN[player] and \
+           SQUARES[state[player, POSITION], IS_CARD_SQUARE]:
+            push_event(state, DRAW_CARD, player)
+        return
+    push_event(state, RAIN_ON_SEAT, player, card, seat + 1)
+
+    other = state[GAME, SEATS + seat]
+    if MOVED_BY_RAIN[other]:
+        rain_squares = CARDS[card, CARD_SQUARES]
+        state[other, POSITION] = max(state[other, POSITION] - rain_squares, 0)
+        state[other, RANDOM_SQUARES] -= rain_squares
+        if SQUARES[state[other, POSITION], IS_EVENT_SQUARE]:
+            # Update based on new event square, then correct counters
+            push_event(state, RAINED_ON_SQUARE, other)
+            push_event(state, VISIT_SQUARE, other)
+        else:
+            # End waiting when moved from event square
+            state[other, WAITING] = 0
+
+@jit
+def rained_on_square(state, player):
+    """Correct the counters of a player that rain moved to an event square"""
+    # Correction in counter (dishes and tunnel)
+    position = state[player, POSITION]
+    if SQUARES[position, SQUARE_RULE] == STUCK and \
+       SQUARES[position, SQUARE_METRIC] >= 0:
+        state[GAME, METRIC + SQUARES[position, SQUARE_METRIC]] -= 1
+
+    # End waiting when moved from event square
+    if not SQUARES[state[player, POSITION], IS_EVENT_SQUARE]:
+        state[player, WAITING] = 0
+
+@jit
+def visit_square(state, player):
+    """Visit event square"""
+    square = state[player, POSITION]
+    rule = SQUARES[square, SQUARE_RULE]
+    metric = SQUARES[square, SQUARE_METRIC]
+
+    # Waiting squares (some only hold motorized characters)
+    if rule == WAIT:
+        if state[player, WAITING] == 0 and SQUARE_APPLIES[square, player]:
+            state[player, WAITING] = SQUARES[square, SQUARE_WAIT]
+            state[player, SQUARES_VISITED] += 1
+            if metric >= 0:
+                state[GAME, METRIC + metric] += 1
+
+    # Chased away from money bin
+    elif rule == MOVE:
+        state[player, POSITION] += SQUARES[square, SQUARE_MOVE]
+        state[player, SQUARES_VISITED] += 1
+        # Necessary to draw new card (square 74 is a random event square)
+        push_event(state, MOVED_FROM_SQUARE, player, square)
+        if SQUARES[state[player, POSITION], IS_CARD_SQUARE]:
+            push_event(state, DRAW_CARD, player)
+
+    # Wash dishes, lost in dark tunnel
+    elif rule == STUCK:
+        state[player, WAITING] = WAIT_FOREVER
+        state[player, SQUARES_VISITED] += 1
+        if metric >= 0:
+            state[GAME, METRIC + metric] += 1
+
+    # Forgot camping card, back to start
+    elif rule == BACK_TO_START:
+        once = SQUARES[square, SQUARE_ONCE]
+        if once < 0 or state[player, ONCE + once] == 0:
+            if once >= 0:
+                state[player, ONCE + once] += 1
+            state[player, POSITION] = 0
+            state[player, SQUARES_VISITED] += 1
+            if metric >= 0:
+                state[GAME, METRIC + metric] += 1
+
+@jit
+def play_events(state, rng):
+    """Handle the pending events and the events they cause, in the order
+    GameState handles them recursively"""
+    while state[GAME, PENDING_EVENTS] > 0:
+        state[GAME, PENDING_EVENTS] -= 1
+        event = EVENTS + state[GAME, PENDING_EVENTS]
+        kind, player = state[event, 0], state[event, 1]
+        first, second = state[event, 2], state[event, 3]
+        if kind == DRAW_CARD:
+            draw_card(state, rng, player)
+        elif kind == VISIT_SQUARE:
+            visit_square(state, player)
+        elif kind == MOVED_FROM_SQUARE:
+            # Only event squares further on the board are visited after moving
+            position = state[player, POSITION]
+            if position > first and SQUARES[position, IS_EVENT_SQUARE]:
+                push_event(state, VISIT_SQUARE, player)
+        elif kind == RAIN_ON_SEAT:
+            rain_on_seat(state, player, first, second)
+        else:
+            rained_on_square(state, player)
+
+@jit
+def step_turn(state, rng, policy):
+    """Play the turn of the next player, return the winner or -1"""
+    if state[GAME, SEAT] == 0:
+        state[GAME, OVERALL_STARTING_POSITION] = 0
+        state[GAME, ROUND_ID] += 1
+    player = state[GAME, SEATS + state[GAME, SEAT]]
+    state[GAME, SEAT] = (state[GAME, SEAT] + 1) % state[GAME, PLAYERS]
+
+    if state[GAME, ALLOWED_TO_START]:
+        state[GAME, OVERALL_STARTING_POSITION] += 1
+        state[player, STARTING_POSITION] = \
+            state[GAME, OVERALL_STARTING_POSITION]
+
+    # Throw 6 to start, then everyone may start
+    elif dicethrow(rng) == 6:
+        state[player, STARTING_POSITION] = 1
+        state[GAME, OVERALL_STARTING_POSITION] = 1
+        state[GAME, ALLOWED_TO_START] = 1
+
+    dice_value = 0
+    if state[GAME, ALLOWED_TO_START] and state[player, WAITING] == 0:
+        dice_value = dicethrow(rng)
+
+    # Check if character can take short-cut via bike lane or highway
+    # If player would land on Square 112 (back to start), then take
+    # a detour (or as the shortcut policy decides)
+    position = state[player, POSITION]
+    shortcut = SQUARES[position, SQUARE_SHORTCUT]
+    if shortcut >= 0 and state[player, SHORTCUT_POSITION] == 0 and \
+       policy[player, shortcut, dice_value]:
+        state[player, SHORTCUTS_TAKEN] += 1
+        if dice_value < SHORTCUTS[shortcut, SHORTCUT_LENGTH]:
+            state[player, SHORTCUT_POSITION] = dice_value
+        else:
+            state[player, POSITION] = SHORTCUTS[shortcut, SHORTCUT_EXIT] + \
+                dice_value - SHORTCUTS[shortcut, SHORTCUT_LENGTH]
+            state[player, SHORTCUT_POSITION] = 0
+
+    # If character is in located in the shortcut
+    elif shortcut >= 0 and state[player, SHORTCUT_POSITION] > 0:
+        length = SHORTCUTS[shortcut, SHORTCUT_LENGTH]
+        if dice_value <= length - 1 - state[player, SHORTCUT_POSITION]:
+            state[player, SHORTCUT_POSITION] += dice_value
+        else:
+            state[player, POSITION] = SHORTCUTS[shortcut, SHORTCUT_EXIT] - \
+                (length - state[player, SHORTCUT_POSITION]) + dice_value
+            state[player, SHORTCUT_POSITION] = 0
+
+    # If not ending exactly at the camping, bounce back
+    elif BOUNCE_BACK and position + dice_value > FINISH_SQUARE:
+        state[player, POSITION] = FINISH_SQUARE - \
+            (dice_value - (FINISH_SQUARE - position))
+
+    # END OF GAME
+    elif position + dice_value >= FINISH_SQUARE:
+        state[player, POSITION] += dice_value
+        return player
+
+    #Regular board movement
+    else:
+        state[player, POSITION] += dice_value
+
+    # RANDOM EVENT CARDS
+    if SQUARES[state[player, POSITION], IS_CARD_SQUARE] and \
+       state[player, WAITING] == 0:
+        draw_card(state, rng, player)
+        play_events(state, rng)
+
+    # EVENT SQUARES
+    if SQUARES[state[player, POSITION], IS_EVENT_SQUARE]:
+        visit_square(state, player)
+        play_events(state, rng)
+
+        # Wash dishes until throwing 6, then move on; leave tunnel
+        # only when throwing 2
+        for stuck_square in STUCK_SQUARES:
+            if state[player, POSITION] == stuck_square:
+                if dicethrow(rng) == SQUARES[stuck_square, ESCAPE_THROW]:
+                    state[player, WAITING] = 0
+                    if SQUARES[stuck_square, ESCAPE_SQUARE] < 0:
+                        state[player, POSITION] += dicethrow(rng)
+                    else:
+                        state[player, POSITION] = \
+                            SQUARES[stuck_square, ESCAPE_SQUARE]
+
+    # Reduce waiting time
+    if state[player, WAITING] > 0:
+        state[player, WAITING] -= 1
+
+    # Update game metrics
+    if state[player, WAITING] > 0:
+        state[player, TURNS_WAITING] += 1
+
+    # Check if player is currently in the lead
+    state[player, TURNS_LEADING] += 1
+    for seat in range(state[GAME, PLAYERS]):
+        other = state[GAME, SEATS + seat]
+        if other != player and \
+           state[player, POSITION] <= state[other, POSITION]:
+            state[player, TURNS_LEADING] = 0
+            break
+    if state[player, TURNS_LEADING] > 0:
+        state[player, HAS_LED] = 1
+    return -1
+
+@jit
+def new_game(state, rng, number_of_players):
+    """Pick the players in random order and shuffle the deck"""
+    state[:EVENTS] = 0
+    state[GAME, PLAYERS] = number_of_players
+
+    # Random starting order, drawn as in GameState.new_game: the seats
+    # not taken yet hold the remaining characters in draw order
+    for seat in range(NUMBER_OF_CHARACTERS):
+        state[GAME, SEATS + seat] = DRAW_ORDER[seat]
+    for seat in range(number_of_players):
+        index = seat + randrange(rng, NUMBER_OF_CHARACTERS - seat)
+        character = state[GAME, SEATS + index]
+        for other in range(index, seat, -1):
+            state[GAME, SEATS + other] = state[GAME, SEATS + other - 1]
+        state[GAME, SEATS + seat] = character
+
+    # Initialize sequence of random event cards
+    for card in range(NUMBER_OF_EVENT_CARDS):
+        state[GAME, DECK + card] = card + 1
+    for card in range(NUMBER_OF_EVENT_CARDS - 1):
+        index = card + randrange(rng, NUMBER_OF_EVENT_CARDS - card)
+        state[GAME, DECK + card], state[GAME, DECK + index] = \
+            state[GAME, DECK + index], state[GAME, DECK + card]
+
+@jit
+def game_result(state, winner, rows, game_index):
+    """Fill the metrics row of a finished game"""
+    number_of_leaders = 0
+    for seat in range(state[GAME, PLAYERS]):
+        number_of_leaders += state[state[GAME, SEATS + seat], HAS_LED]
+    rows[game_index, 0] = state[GAME, ROUND_ID]
+    rows[game_index, 1] = winner
+    column = 2
+    for character in range(NUMBER_OF_CHARACTERS):
+        rows[game_index, column + character] = state[character, TURNS_WAITING]
+    column += NUMBER_OF_CHARACTERS
+    for metric in RESULT_METRIC_INDEX:
+        rows[game_index, column] = state[GAME, METRIC + metric]
+        column += 1
+    rows[game_index, column] = state[winner, TURNS_LEADING]
+    rows[game_index, column + 1] = number_of_leaders
+    column += 2
+    for field in (SHORTCUTS_TAKEN, STARTING_POSITION, SQUARES_VISITED, \
+                  CARDS_DRAWN, RANDOM_SQUARES):
+        for character in range(NUMBER_OF_CHARACTERS):
+            rows[game_index, column + character] = state[character, field]
+        column += NUMBER_OF_CHARACTERS
+    for metric in STAY_METRIC_INDEX:
+        rows[game_index, column] = state[GAME, METRIC + metric]
+        column += 1
+
+@jit
+def play_games(number_of_players, key, first_simulation_run, rows, policy):
+    """Play len(rows) consecutive simulation runs, filling a row for each"""
+    state = np.zeros((EVENTS + EVENT_STACK_SIZE, STATE_COLUMNS), \
+                     dtype=np.int64)
+    rng = np.zeros(6, dtype=np.uint64)
+    for game_index in range(len(rows)):
+        seed_random(rng, key, first_simulation_run + game_index)
+        new_game(state, rng, number_of_players)
+        winner = -1
+        while winner < 0:
+            winner = step_turn(state, rng, policy)
+        game_result(state, winner, rows, game_index)
+
+def master_key(master_seed):
+    """Derive the 64 bit key of the kernel streams from the master seed"""
+    return np.random.SeedSequence(master_seed).generate_state(1, np.uint64)[0]
+
+def play_kernel(number_of_games, number_of_players=NUMBER_OF_PLAYERS, \
+                master_seed=None, first_simulation_run=0, \
+                shortcut_policy=None):
+    """Play consecutive simulation runs, return their metrics rows
+
+    A row holds the number of rounds, the winner (index in
+    CHARACTER_NAMES) and the per-game results columns. shortcut_policy
+    is a table of Board.policy_table, the rules if None.
+    """
+    if number_of_players < 2 or number_of_players > NUMBER_OF_CHARACTERS:
+        raise ValueError("Please select a number of players between 2 and " \
+                         + str(NUMBER_OF_CHARACTERS))
+    policy = DEFAULT_POLICY
+    if shortcut_policy is not None:
+        policy = np.array(shortcut_policy, dtype=np.int64) \
+                 .reshape(DEFAULT_POLICY.shape)
+    rows = np.zeros((number_of_games, ROW_LENGTH), dtype=np.int64)
+    # The random streams wrap around on purpose (uncompiled, NumPy warns)
+    with np.errstate(over="ignore"):
+        play_games(number_of_players, master_key(master_seed), \
+                   first_simulation_run, rows, policy)
+    return rows
+
+def play_kernel_many(number_of_games, number_of_players=NUMBER_OF_PLAYERS, \
+                     master_seed=None, first_simulation_run=0):
+    """Yield game metrics as GameState.play_many does, without trajectory"""
+    for first_run in range(first_simulation_run, \
+                           first_simulation_run + number_of_games, \
+                           KERNEL_BLOCK):
+        rows = play_kernel(min(KERNEL_BLOCK, first_simulation_run + \
+                               number_of_games - first_run), \
+                           number_of_players, master_seed, first_run)
+        for row in rows.tolist():
+            yield [row[0], CHARACTER_NAMES[row[1]]] + row[2:], None
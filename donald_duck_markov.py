@@ -0,0 +1,578 @@
+# -*- coding: utf-8 -*-
+"""
+Markov chain solver for the Donald Duck Holiday Game
+Computes the winner shares and the distribution of the number of rounds
+without simulation. Every character moves on its own absorbing Markov
+chain over (position, waiting turns, shortcut position, route map and
+camping card collected); the transition probabilities are obtained by
+enumerating all dice throws and event cards of a single turn with the
+same rules (and quirks) as donald_duck_holiday_game.py. The chains are
+combined in turn order over all seatings, with the start phase (waiting
+for the first 6) handled exactly.
+Two approximations remain, both due to state shared between players:
+- Event cards are drawn uniformly at random; within one turn no card is
+  drawn twice, but the deck cursor is not carried over between turns.
+- Rain (card 9) moves the other walkers, bikers and motor riders back.
+  With mean_field_rain, the other players receive rain with the
+  probability that the active player draws it, as if the players were
+  independent. Without it, rain only moves the active player. The
+  games are then exact until rain drawn by one player moves another,
+  so the probability of that bounds the error of every probability the
+  solver returns. It is exact for uniformly drawn cards (0.59 for two
+  players, 0.84 for three; the real deck gives 0.69 and 0.95), so the
+  bound is only tight for few players.
+The mean field has no such bound: for five players its winner shares
+are within one percentage point of simulation (MEAN_FIELD_ERROR) and
+games are about one round (1.5%) shorter, mostly because the real deck
+repeats the same order every 11 cards.
+This code has been published under the GNU GPLv3 license
+"""
+import sys
+from itertools import permutations
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+from donald_duck_board import BACK_TO_START, GO_TO, MOVE, \
+    NEXT_EVENT_CARD_SQUARE, RAIN, STUCK, THROW_FORWARD, WAIT, load_board
+from donald_duck_results import CHARACTER_NAMES
+
+NUMBER_OF_PLAYERS = 5 # between 2 and 5 players
+MEAN_FIELD_RAIN = True # False: rain only moves the player drawing it
+TOLERANCE = 1e-12 # probability mass left when the solver stops
+MEAN_FIELD_ERROR = 0.01 # largest winner share error seen against simulation
+WAIT_FOREVER = sys.maxsize
+
+# Board and event card rules, see donald_duck_board.json
+BOARD = load_board()
+
+START_PROBABILITY = 1 / 6 # throwing the 6 that starts the game
+FINISHED = "finished" # absorbing state of a character chain
+RAIN_CARD = BOARD.card_rule.index(RAIN) # event card drawn by other players
+
+
+class PlayerState:
+    """Define the state of one character between two turns"""
+    def __init__(self, position_on_board, number_of_turns_waiting, \
+                 shortcut_position, number_maps_collected, \
+                 number_camping_cards_collected):
+        self.restore((position_on_board, number_of_turns_waiting, \
+                      shortcut_position, number_maps_collected, \
+                      number_camping_cards_collected))
+
+    def restore(self, state):
+        """Set the state from a tuple"""
+        position_on_board, number_of_turns_waiting, shortcut_position, \
+        number_maps_collected, number_camping_cards_collected = state
+        self.position_on_board = position_on_board
+        self.number_of_turns_waiting = number_of_turns_waiting
+        self.shortcut_position = shortcut_position
+        self.number_maps_collected = number_maps_collected
+        self.number_camping_cards_collected = number_camping_cards_collected
+
+    def key(self):
+        """Return the state as a tuple"""
+        return (self.position_on_board, self.number_of_turns_waiting, \
+                self.shortcut_position, self.number_maps_collected, \
+                self.number_camping_cards_collected)
+
+INITIAL_STATE = (0, 0, 0, 0, 0)
+
+
+class Branching(Exception):
+    """Raised when a turn needs a random outcome that is not chosen yet"""
+    def __init__(self, number_of_options):
+        Exception.__init__(self)
+        self.number_of_options = number_of_options
+
+
+class Branch:
+    """Replay a turn along a fixed sequence of random outcomes"""
+    def __init__(self, choices, cards_drawn):
+        self.choices = choices
+        self.step = 0
+        self.probability = 1.0
+        self.cards_drawn = list(cards_drawn)
+        self.rain = False
+
+    def choose(self, options, probabilities=None):
+        """Return the next outcome (equally likely unless probabilities)"""
+        if self.step == len(self.choices):
+            raise Branching(len(options))
+        choice = self.choices[self.step]
+        self.step += 1
+        if probabilities is None:
+            self.probability /= len(options)
+        else:
+            self.probability *= probabilities[choice]
+        return options[choice]
+
+    def dicethrow(self):
+        """Throw die"""
+        return self.choose(range(1, 7))
+
+    def drawcard(self):
+        """Draw an event card that has not been drawn this turn"""
+        card = self.choose([card for card in \
+                            range(1, BOARD.number_of_event_cards + 1) \
+                            if card not in self.cards_drawn])
+        self.cards_drawn.append(card)
+        if BOARD.card_rule[card] == RAIN:
+            self.rain = True
+        return card
+
+def outcomes(function, state, transport_mode, cards_drawn=()):
+    """Return the probability of every outcome of function
+
+    The function is replayed once per branch; whenever it asks for an
+    outcome beyond the replayed ones, all options are queued. Outcomes
+    are (state or FINISHED, cards drawn this turn, rain drawn).
+    """
+    probabilities = {}
+    queue = [[]]
+    while queue:
+        choices = queue.pop()
+        branch = Branch(choices, cards_drawn)
+        player = PlayerState(*state)
+        try:
+            finished = function(player, transport_mode, branch)
+        except Branching as branching:
+            queue.extend(choices + [option] for option in \
+                         range(branching.number_of_options))
+            continue
+        outcome = (FINISHED if finished else player.key(), \
+                   frozenset(branch.cards_drawn), branch.rain)
+        probabilities[outcome] = probabilities.get(outcome, 0) + \
+                                 branch.probability
+    return probabilities
+
+# Outcomes of a part of a turn, shared by all branches and turns
+PARTIAL_OUTCOMES = {}
+
+def continue_with(function, player, transport_mode, branch, \
+                  forget_cards=False):
+    """Continue a branch with one outcome of function
+
+    The outcomes are enumerated once per state. With forget_cards, the
+    cards drawn by function are not remembered for the rest of the turn.
+    """
+    key = (function, player.key(), transport_mode, \
+           frozenset(branch.cards_drawn), forget_cards)
+    if key not in PARTIAL_OUTCOMES:
+        probabilities = {}
+        for (state, cards_drawn, rain_drawn), probability in \
+                outcomes(function, key[1], transport_mode, key[3]).items():
+            outcome = (state, key[3] if forget_cards else cards_drawn, \
+                       rain_drawn)
+            probabilities[outcome] = probabilities.get(outcome, 0) + \
+                                     probability
+        PARTIAL_OUTCOMES[key] = (list(probabilities), \
+                                 list(probabilities.values()))
+    state, cards_drawn, rain_drawn = branch.choose(*PARTIAL_OUTCOMES[key])
+    player.restore(state)
+    branch.cards_drawn = list(cards_drawn)
+    branch.rain = branch.rain or rain_drawn
+
+def draweventcard(player, transport_mode, branch):
+    """Draw event card from deck"""
+    continue_with(applyeventcard, player, transport_mode, branch)
+
+def applyeventcard(player, transport_mode, branch):
+    """Draw one event card and apply it"""
+    event_card_number = branch.drawcard()
+    rule = BOARD.card_rule[event_card_number]
+    once = BOARD.card_once[event_card_number]
+    if transport_mode not in BOARD.card_modes[event_card_number] or \
+       (once is not None and getattr(player, once) > 0) or \
+       player.position_on_board < BOARD.card_from_square[event_card_number]:
+        return False
+    if once is not None:
+        setattr(player, once, getattr(player, once) + 1)
+
+    # Wait a number of turns
+    if rule == WAIT:
+        player.number_of_turns_waiting = BOARD.card_wait[event_card_number]
+
+    # Move, then draw a new card on an event card square
+    if BOARD.card_moves[event_card_number]:
+        if rule == BACK_TO_START:
+            player.position_on_board = 0
+        elif rule == GO_TO:
+            player.position_on_board = BOARD.card_square[event_card_number]
+        elif rule == NEXT_EVENT_CARD_SQUARE:
+            player.position_on_board = \
+            BOARD.next_event_card_square[player.position_on_board]
+        elif rule == THROW_FORWARD:
+            player.position_on_board += branch.dicethrow()
+        else:
+            player.position_on_board = \
+            max(0, player.position_on_board - branch.dicethrow())
+        if BOARD.card_draws_again[event_card_number] and \
+           BOARD.is_event_card_square[player.position_on_board]:
+            draweventcard(player, transport_mode, branch)
+
+    # Rain, then draw a card on an event card square
+    if rule == RAIN:
+        rain(player, transport_mode, branch, \
+             BOARD.card_squares[event_card_number])
+        if transport_mode in BOARD.rain_modes and \
+           BOARD.card_draws_again[event_card_number] and \
+           BOARD.is_event_card_square[player.position_on_board]:
+            draweventcard(player, transport_mode, branch)
+    return False
+
+def eventsquare(player, transport_mode, branch):
+    """Visit event square"""
+    square = player.position_on_board
+    rule = BOARD.square_rule[square]
+
+    # Waiting squares
+    if rule == WAIT:
+        if player.number_of_turns_waiting == 0 and \
+           transport_mode in BOARD.square_modes[square]:
+            player.number_of_turns_waiting = BOARD.square_wait[square]
+
+    # Chased away from money bin, only later squares are checked
+    elif rule == MOVE:
+        player.position_on_board += BOARD.square_move[square]
+        if BOARD.is_event_card_square[player.position_on_board]:
+            draweventcard(player, transport_mode, branch)
+        if player.position_on_board > square and \
+           BOARD.is_event_square[player.position_on_board]:
+            eventsquare(player, transport_mode, branch)
+
+    # Wash dishes, lost in dark tunnel
+    elif rule == STUCK:
+        player.number_of_turns_waiting = WAIT_FOREVER
+
+    # Forgot camping card, back to start
+    elif rule == BACK_TO_START:
+        once = BOARD.square_once[square]
+        if once is None or getattr(player, once) == 0:
+            if once is not None:
+                setattr(player, once, getattr(player, once) + 1)
+            player.position_on_board = 0
+
+def rain(player, transport_mode, branch, squares):
+    """Move a player back the given squares in the rain"""
+    if transport_mode in BOARD.rain_modes:
+        player.position_on_board = max(player.position_on_board - squares, 0)
+        if BOARD.is_event_square[player.position_on_board]:
+            eventsquare(player, transport_mode, branch)
+        if not BOARD.is_event_square[player.position_on_board]:
+            player.number_of_turns_waiting = 0
+
+def play_turn(player, transport_mode, branch):
+    """Play one turn, return whether the player reached the camping"""
+    dice_value = 0
+    if player.number_of_turns_waiting == 0:
+        dice_value = branch.dicethrow()
+    position = player.position_on_board
+    shortcut = BOARD.shortcut_at[position]
+
+    # Bike lane and highway shortcuts
+    if shortcut is not None and player.shortcut_position == 0 and \
+       position + dice_value != shortcut.avoid_square and \
+       transport_mode in shortcut.modes:
+        if dice_value < shortcut.length:
+            player.shortcut_position = dice_value
+        else:
+            player.position_on_board = shortcut.exit_square + dice_value - \
+            shortcut.length
+            player.shortcut_position = 0
+    elif shortcut is not None and player.shortcut_position > 0:
+        if dice_value <= shortcut.length - 1 - player.shortcut_position:
+            player.shortcut_position += dice_value
+        else:
+            player.position_on_board = shortcut.exit_square - \
+            (shortcut.length - player.shortcut_position) + dice_value
+            player.shortcut_position = 0
+
+    # Bounce back from the camping, or reach it
+    elif BOARD.bounce_back and position + dice_value > BOARD.finish_square:
+        player.position_on_board = BOARD.finish_square - \
+        (dice_value - (BOARD.finish_square - position))
+    elif position + dice_value >= BOARD.finish_square:
+        return True
+    else:
+        player.position_on_board += dice_value
+
+    continue_with(visitsquare, player, transport_mode, branch, \
+                  forget_cards=True)
+    if 0 < player.number_of_turns_waiting < WAIT_FOREVER:
+        player.number_of_turns_waiting -= 1
+    return False
+
+def visitsquare(player, transport_mode, branch):
+    """Draw event cards and visit event squares after moving"""
+    if BOARD.is_event_card_square[player.position_on_board] and \
+       player.number_of_turns_waiting == 0:
+        draweventcard(player, transport_mode, branch)
+
+    if BOARD.is_event_square[player.position_on_board]:
+        eventsquare(player, transport_mode, branch)
+
+        # The square reached after washing dishes is not visited
+        for square in BOARD.stuck_squares:
+            if player.position_on_board == square and \
+               branch.dicethrow() == BOARD.escape_throw[square]:
+                player.number_of_turns_waiting = 0
+                if BOARD.escape_square[square] < 0:
+                    player.position_on_board += branch.dicethrow()
+                else:
+                    player.position_on_board = BOARD.escape_square[square]
+    return False
+
+def rained_on(player, transport_mode, branch):
+    """Rain drawn by another player (never finishes the game)"""
+    rain(player, transport_mode, branch, BOARD.card_squares[RAIN_CARD])
+    return False
+
+
+class CharacterChain:
+    """Absorbing Markov chain of one character's own turns
+
+    Matrices map a column of state probabilities to the next column:
+    turn (own turn), dry_turn (own turn without drawing the rain card),
+    rain (rain drawn by another player). The vectors finish, dry_finish
+    and draws_rain give the probability that a turn from each state
+    reaches the camping, reaches it without drawing the rain card or
+    draws the rain card.
+    """
+    def __init__(self, transport_mode):
+        self.transport_mode = transport_mode
+        self.states = [INITIAL_STATE]
+        self.state_ids = {INITIAL_STATE: 0}
+        turn_entries, dry_entries, rain_entries = [], [], []
+        finish, dry_finish, draws_rain = [], [], []
+
+        # Explore all states reachable by own turns and rain
+        for state_id, state in enumerate(self.states):
+            finish.append(0.0)
+            dry_finish.append(0.0)
+            draws_rain.append(0.0)
+            for (next_state, _, rain_drawn), probability in \
+                    outcomes(play_turn, state, transport_mode).items():
+                if rain_drawn:
+                    draws_rain[state_id] += probability
+                if next_state == FINISHED:
+                    finish[state_id] += probability
+                    if not rain_drawn:
+                        dry_finish[state_id] += probability
+                else:
+                    entry = (self.state_id(next_state), state_id, \
+                             probability)
+                    turn_entries.append(entry)
+                    if not rain_drawn:
+                        dry_entries.append(entry)
+            for (next_state, _, _), probability in outcomes(rained_on, \
+                    state, transport_mode, cards_drawn=(RAIN_CARD,)).items():
+                rain_entries.append((self.state_id(next_state), state_id, \
+                                     probability))
+
+        self.turn = self.sparse_matrix(turn_entries)
+        self.dry_turn = self.sparse_matrix(dry_entries)
+        self.rain = self.sparse_matrix(rain_entries)
+        self.finish = np.array(finish)
+        self.dry_finish = np.array(dry_finish)
+        self.draws_rain = np.array(draws_rain)
+        self.moved_by_rain = transport_mode in BOARD.rain_modes
+
+    def state_id(self, state):
+        """Return the index of a state, adding it if it is new"""
+        if state not in self.state_ids:
+            self.state_ids[state] = len(self.states)
+            self.states.append(state)
+        return self.state_ids[state]
+
+    def sparse_matrix(self, entries):
+        """Build a square transition matrix from (to, from, p) entries"""
+        rows, columns, probabilities = zip(*entries)
+        return scipy.sparse.csr_matrix((probabilities, (rows, columns)), \
+            shape=(len(self.states), len(self.states)))
+
+    def initial(self):
+        """Return the state distribution before the first turn"""
+        distribution = np.zeros(len(self.states))
+        distribution[0] = 1
+        return distribution
+
+    def first_passage(self, number_of_turns):
+        """Probability of reaching the camping in turn 1..number_of_turns"""
+        distribution = self.initial()
+        probabilities = np.zeros(number_of_turns)
+        for turn in range(number_of_turns):
+            probabilities[turn] = self.finish @ distribution
+            distribution = self.turn @ distribution
+        return probabilities
+
+    def expected_turns(self):
+        """Expected number of own turns to reach the camping"""
+        identity = scipy.sparse.identity(len(self.states), format="csr")
+        return scipy.sparse.linalg.spsolve((identity - self.turn).T.tocsc(), \
+                                           np.ones(len(self.states)))[0]
+
+def character_chains():
+    """Build the chains of all characters, in the order of CHARACTER_NAMES"""
+    return [CharacterChain(transport_mode) for transport_mode in \
+            BOARD.transport_modes]
+
+def solve_game(number_of_players, mean_field_rain=MEAN_FIELD_RAIN, \
+               tolerance=TOLERANCE, chains=None):
+    """Compute winner shares and the distribution of the number of rounds
+
+    Returns a dict with the winner share of each character (in the order
+    of CHARACTER_NAMES), the probability of each number of rounds (index
+    is the number of rounds), the probability that rain drawn by one
+    player moves another (rain_probability) and the error_bound of
+    every returned probability due to rain. Without mean_field_rain,
+    the error bound is the rain probability; with it, the error is not
+    bounded (None), winner shares were within MEAN_FIELD_ERROR of
+    simulation for five players.
+    """
+    chains = chains or character_chains()
+    number_of_characters = len(chains)
+    if number_of_players < 2 or number_of_players > number_of_characters:
+        raise ValueError("Please select a number of players between 2 and " \
+                         + str(number_of_characters))
+
+    # Every seating is equally likely; rotating a seating moves the
+    # first mover, so all seatings started at seat 0 cover all orders
+    seatings = np.array(list(permutations(range(number_of_characters), \
+                                          number_of_players)))
+    number_of_seatings = len(seatings)
+    seated = np.zeros((number_of_characters, number_of_seatings), dtype=bool)
+    for seat in range(number_of_players):
+        seated[seatings[:, seat], np.arange(number_of_seatings)] = True
+    moving = [[np.flatnonzero(seatings[:, seat] == character) \
+               for character in range(number_of_characters)] \
+              for seat in range(number_of_players)]
+    distributions = [np.outer(chain.initial(), seated[character]) \
+                     for character, chain in enumerate(chains)]
+    alive = np.ones((number_of_characters, number_of_seatings))
+
+    # Rain drawn by others is applied just before a character's own turn:
+    # coefficient k is the probability of having been moved back k times
+    pending_rain = np.zeros((number_of_characters, number_of_seatings, \
+                             number_of_players))
+    pending_rain[:, :, 0] = 1
+    moved_by_rain = np.array([chain.moved_by_rain for chain in chains])
+    vulnerable_others = [(moved_by_rain[:, None] & seated).sum(axis=0) - \
+                         (moved_by_rain[character] & seated[character]) > 0 \
+                         for character in range(number_of_characters)]
+
+    winner_shares = np.zeros(number_of_characters)
+    finished = [] # probability of finishing per turn, summed over seatings
+    # The same chains, for the games in which no rain drawn by one player
+    # moved another so far; in these the players are independent
+    dry_distributions = [distribution.copy() for distribution in \
+                         distributions]
+    dry_alive = alive.copy()
+    dry_finished = 0.0
+    turn = 0
+    while np.prod(alive, axis=0).sum() / number_of_seatings > tolerance:
+        seat = turn % number_of_players
+        playing = np.prod(alive, axis=0)
+        rain_probability = np.zeros(number_of_seatings)
+        finished_turn = 0.0
+        for character, chain in enumerate(chains):
+            games = moving[seat][character]
+            if len(games) == 0:
+                continue
+            distribution = distributions[character][:, games]
+            if chain.moved_by_rain:
+                moved = distribution * pending_rain[character, games, 0]
+                for times in range(1, number_of_players):
+                    distribution = chain.rain @ distribution
+                    moved += distribution * \
+                             pending_rain[character, games, times]
+                distribution = moved
+                pending_rain[character, games] = 0
+                pending_rain[character, games, 0] = 1
+
+            finishing = chain.finish @ distribution
+            drawing_rain = chain.draws_rain @ distribution
+            others_playing = playing[games] / alive[character, games]
+            winning = finishing * others_playing
+            winner_shares[character] += winning.sum()
+            finished_turn += winning.sum()
+            continuing = alive[character, games] - finishing
+            distributions[character][:, games] = chain.turn @ distribution
+            alive[character, games] = continuing
+
+            if mean_field_rain:
+                rain_probability[games] = np.divide( \
+                    drawing_rain, continuing, \
+                    out=np.zeros_like(drawing_rain), where=continuing > 0)
+
+            # Rain drawn with others to move back ends a dry game
+            distribution = dry_distributions[character][:, games]
+            vulnerable = vulnerable_others[character][games]
+            finishing = np.where(vulnerable, \
+                                 chain.dry_finish @ distribution, \
+                                 chain.finish @ distribution)
+            others = np.arange(number_of_characters) != character
+            dry_finished += (finishing * np.prod(dry_alive[others][:, \
+                games], axis=0)).sum()
+            dry_distributions[character][:, games] = np.where(vulnerable, \
+                chain.dry_turn @ distribution, chain.turn @ distribution)
+            dry_alive[character, games] = \
+                dry_distributions[character][:, games].sum(axis=0)
+        finished.append(finished_turn / number_of_seatings)
+
+        # Rain drawn by the active player moves the other players
+        if rain_probability.any():
+            for character in np.flatnonzero(moved_by_rain):
+                hit = seated[character] & (seatings[:, seat] != character)
+                pending_rain[character, hit, 1:] = \
+                    pending_rain[character, hit, 1:] * \
+                    (1 - rain_probability[hit, None]) + \
+                    pending_rain[character, hit, :-1] * \
+                    rain_probability[hit, None]
+                pending_rain[character, hit, 0] *= 1 - rain_probability[hit]
+        turn += 1
+
+    # Seat j throws the first 6 after r full rounds without a 6 with
+    # probability q^(r*n+j)*p; the game then takes (j+turn)//n more rounds
+    no_start = (1 - START_PROBABILITY) ** number_of_players
+    start_seat = (1 - START_PROBABILITY) ** np.arange(number_of_players) * \
+                 START_PROBABILITY / (1 - no_start)
+    finished = np.array(finished)
+    rounds_after_start = np.zeros((len(finished) + number_of_players - 2) // \
+                                  number_of_players + 2)
+    for first_seat, probability in enumerate(start_seat):
+        np.add.at(rounds_after_start, (first_seat + np.arange(len(finished))) \
+                  // number_of_players + 1, probability * finished)
+    full_rounds = int(np.log(tolerance) / np.log(no_start)) + 1
+    rounds = np.convolve(rounds_after_start, \
+                         no_start ** np.arange(full_rounds) * (1 - no_start))
+
+    rain_probability = 1 - dry_finished / number_of_seatings
+    return {"winner_shares": winner_shares / number_of_seatings, \
+            "rounds": rounds, \
+            "mean_rounds": rounds @ np.arange(len(rounds)), \
+            "rain_probability": rain_probability, \
+            "error_bound": None if mean_field_rain else rain_probability}
+
+# START OF MAIN CODE
+if __name__ == "__main__":
+    CHAINS = character_chains()
+    for NAME, CHAIN in zip(CHARACTER_NAMES, CHAINS):
+        print(NAME, "needs", round(CHAIN.expected_turns(), 2), \
+              "turns on average when playing alone (" + \
+              str(len(CHAIN.states)), "states)")
+
+    SOLUTION = solve_game(NUMBER_OF_PLAYERS, MEAN_FIELD_RAIN, TOLERANCE, \
+                          CHAINS)
+    for NAME, SHARE in zip(CHARACTER_NAMES, SOLUTION["winner_shares"]):
+        print(NAME, "wins", round(100 * SHARE, 2), "% of the games.")
+    print("Mean number of rounds:", round(SOLUTION["mean_rounds"], 3))
+    print("Probability that rain moves another player:", \
+          round(SOLUTION["rain_probability"], 4))
+    if SOLUTION["error_bound"] is None:
+        print("Mean field rain, winner shares were within", \
+              MEAN_FIELD_ERROR, "of simulation")
+    else:
+        print("Every probability is within", \
+              round(SOLUTION["error_bound"], 4), "of the real game")
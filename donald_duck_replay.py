@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Replay of single simulation runs of the Donald Duck Holiday Game
+Every simulation run is seeded from the master seed and its index
+(run_seed), so run k of a batch is played again exactly from the run
+info stored next to the results file and its SimulationRunID k. A
+replay can record a turn by turn trace of the dice, the event cards
+drawn and the event squares visited, so batches need no trajectory
+logging: the detail of any odd game is regenerated on demand, and
+checked against its row in the results file. Runs of the compiled
+kernel are replayed without trace; the batch engine draws the random
+numbers of a whole chunk of games at once, so its runs cannot be
+replayed one by one.
+This code has been published under the GNU GPLv3 license
+"""
+import argparse
+import os
+
+import numpy as np
+
+from donald_duck_analysis import open_results
+from donald_duck_checkpoint import load_run_info
+from donald_duck_holiday_game import BOARD, ENGINE_VERSION, GameState, \
+    run_seed
+from donald_duck_results import RESULT_COLUMNS
+from donald_duck_stats import FIRST_METRIC
+
+
+class TracedGame(GameState):
+    """Game that records every die, event card and event square
+
+    trace holds (round, character name, event, value) tuples: "die"
+    with the value thrown, "card" with the event card drawn (whether or
+    not it applies), "square" with the event square visited and
+    "position" with the square at the end of a turn.
+    """
+    def new_game(self, seed=None):
+        """Start a new game with an empty trace"""
+        self.trace = []
+        self.turn_player = None
+        GameState.new_game(self, seed)
+
+    def record(self, player, event, value):
+        """Add an event of a player to the trace"""
+        self.trace.append((self.round_id, player.character_name, event, \
+                           value))
+
+    def dicethrow(self):
+        """Throw die and record it"""
+        dice_value = GameState.dicethrow(self)
+        self.record(self.turn_player, "die", dice_value)
+        return dice_value
+
+    def draweventcard(self, active_player):
+        """Record the event card on top of the deck and draw it"""
+        self.record(active_player, "card", self.active_card_deck[ \
+            (self.event_card_id + 1) % self.board.number_of_event_cards])
+        GameState.draweventcard(self, active_player)
+
+    def eventsquare(self, active_player):
+        """Record the event square and visit it"""
+        self.record(active_player, "square", active_player.position_on_board)
+        GameState.eventsquare(self, active_player)
+
+    def step_turn(self):
+        """Play a turn and record the position it ends on"""
+        self.turn_player = self.active_characters[self.seat]
+        finished = GameState.step_turn(self)
+        self.record(self.turn_player, "position", \
+                    self.turn_player.position_on_board)
+        return finished
+
+
+def replay(run_info, simulation_run_id, trace=False):
+    """Play a simulation run again, return its game metrics and trace
+
+    The game metrics are those of GameState.game_result; the trace is
+    that of TracedGame, or None without trace.
+    """
+    if run_info["engine_version"] != ENGINE_VERSION:
+        raise ValueError("The runs were played with another engine version")
+    engine = run_info.get("engine", "scalar")
+    simulation_run = simulation_run_id - 1
+    if engine == "kernel":
+        if trace:
+            raise ValueError("Runs of the kernel engine are replayed " \
+                             "without trace")
+        # Imported here, the kernel builds its tables when imported
+        from donald_duck_kernel import play_kernel_many
+        game_result, _ = next(play_kernel_many(1, \
+            run_info["number_of_players"], run_info["master_seed"], \
+            simulation_run))
+        return game_result, None
+    if engine != "scalar":
+        raise ValueError("Runs of the " + engine + " engine cannot be " \
+                         "replayed one by one")
+    if trace:
+        game = TracedGame(run_info["number_of_players"])
+    else:
+        game = GameState(run_info["number_of_players"])
+    game_result = game.play_game(run_seed(run_info["master_seed"], \
+                                          simulation_run))
+    return game_result, game.trace if trace else None
+
+def stored_result(records, simulation_run_id):
+    """Return the game metrics of a run as stored in a results file"""
+    row = np.searchsorted(records["SimulationRunID"], simulation_run_id)
+    if row == len(records) or \
+       records["SimulationRunID"][row] != simulation_run_id:
+        raise ValueError("Simulation run {} is not in the results".format( \
+                         simulation_run_id))
+    record = records[row]
+    return [int(record["NumberOfRoundsPlayed"]), \
+            record["WinnerName"].decode()] + \
+           [int(record[name]) for name in RESULT_COLUMNS[FIRST_METRIC:]]
+
+def format_trace(trace, board=BOARD):
+    """Return the lines of a trace"""
+    lines = []
+    for round_id, character_name, event, value in trace:
+        if event == "card":
+            value = "{} ({})".format(value, board.card_name[value])
+        elif event == "square":
+            value = "{} ({})".format(value, board.square_name[value])
+        lines.append("Round {}, {}: {} {}".format(round_id, character_name, \
+                                                  event, value))
+    return lines
+
+def main(argv=None):
+    """Replay simulation runs of a results file"""
+    parser = argparse.ArgumentParser(description="Replay simulation runs " \
+                                     "of the Donald Duck Holiday Game")
+    parser.add_argument("results", help="results file of the batch")
+    parser.add_argument("runs", type=int, nargs="+", \
+                        help="SimulationRunID of the runs to replay")
+    parser.add_argument("-t", "--trace", action="store_true", \
+                        help="print a turn by turn trace")
+    arguments = parser.parse_args(argv)
+    if min(arguments.runs) < 1:
+        parser.error("Please select SimulationRunIDs from 1")
+    try:
+        run_info = load_run_info(arguments.results)
+    except FileNotFoundError:
+        parser.error("No run info was stored next to " + arguments.results)
+    records = None
+    if os.path.exists(arguments.results):
+        records = open_results(arguments.results)
+    for simulation_run_id in arguments.runs:
+        try:
+            stored = None
+            if records is not None:
+                stored = stored_result(records, simulation_run_id)
+            game_result, trace = replay(run_info, simulation_run_id, \
+                                        arguments.trace)
+        except ValueError as error:
+            parser.error(str(error))
+        if trace is not None:
+            print("\n".join(format_trace(trace)))
+        check = ""
+        if stored is not None:
+            check = ", as in the results file" if game_result == stored \
+                else ", NOT as in the results file"
+        print("Simulation run", simulation_run_id, "-", game_result[1], \
+              "won after", game_result[0], "rounds" + check)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Results writer for the Donald Duck Holiday Game
+Collects the game results of all simulation runs in memory and writes
+them in large blocks, either as the semicolon separated GAMERESULTS.txt,
+as a NumPy record array (.npy), as an Arrow IPC file (.arrow) or as an
+indexed SQLite database (.sqlite, see donald_duck_sqlite).
+All formats hold the same columns.
+This code has been published under the GNU GPLv3 license
+"""
+import importlib.util
+import os
+import sys
+
+import numpy as np
+
+BUFFER_ROWS = 10000 # rows collected before a block is written
+
+# Characters in the column order of the results
+CHARACTER_NAMES = ("Huey, Dewey & Louie", "Goofy", "Donald", "Horace", \
+                   "Clarabelle")
+CHARACTER_LABELS = ("HDL", "Goofy", "Donald", "Horace", "Clarabelle")
+
+RESULT_COLUMNS = ("SimulationRunID", "NumberOfRoundsPlayed", "WinnerName", \
+    "WinnerHDL", "WinnerGoofy", "WinnerDonald", "WinnerHorace", \
+    "WinnerClarabelle", "TurnsWaitingHDL", "TurnsWaitingGoofy", \
+    "TurnsWaitingDonald", "TurnsWaitingHorace", "TurnsWaitingClarabelle", \
+    "NumberOfCampingCards", "NumberOfRouteMaps", "NumberOfCameras", \
+    "NumberOfPostcards", "TurnsLedWinner", "NumberOfLeaders", \
+    "NumberOfShortcutsHDL", "NumberOfShortcutsGoofy", \
+    "NumberOfShortcutsDonald", "NumberOfShortcutsHorace", \
+    "NumberOfShortcutsClarabelle", "StartingPositionHDL", \
+    "StartingPositionGoofy", "StartingPositionDonald", \
+    "StartingPositionHorace", "StartingPositionClarabelle", \
+    "NumberOfEventSquaresVisitedHDL", "NumberOfEventSquaresVisitedGoofy", \
+    "NumberOfEventSquaresVisitedDonald", "NumberOfEventSquaresVisitedHorace", \
+    "NumberOfEventSquaresVisitedClarabelle", "NumberOfEventCardsDrawnHDL", \
+    "NumberOfEventCardsDrawnGoofy", "NumberOfEventCardsDrawnDonald", \
+    "NumberOfEventCardsDrawnHorace", "NumberOfEventCardsDrawnClarabelle", \
+    "NumberSquaresRandomHDL", "NumberSquaresRandomGoofy", \
+    "NumberSquaresRandomDonald", "NumberSquaresRandomHorace", \
+    "NumberSquaresRandomClarabelle", "NumberOfCoffees", \
+    "NumberOfDishesWashed", "NumberOfTunnels")
+
+# Fixed-width record of one simulation run ("Huey, Dewey & Louie" is 19 bytes)
+RESULT_DTYPE = np.dtype([(name, "S19") if name == "WinnerName" else \
+    (name, "<i8") if name == "SimulationRunID" or \
+    name.startswith("Winner") else (name, "<i4") for name in RESULT_COLUMNS])
+
+def results_format(path):
+    """Derive the results format from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        return "npy"
+    if extension in (".arrow", ".feather"):
+        return "arrow"
+    if extension in (".sqlite", ".sqlite3", ".db"):
+        return "sqlite"
+    return "csv"
+
+def pyarrow_available():
+    """Return whether .arrow results can be written and read"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+def load_pyarrow(action):
+    """Import pyarrow when it is first needed, as it is slow to import"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError(action + " .arrow results requires pyarrow") \
+            from None
+    return pyarrow
+
+def npy_header(dtype, number_of_rows):
+    """Return a .npy header for a record array
+
+    The header is padded to fit any row count, so it can be rewritten
+    in place once the final number of rows is known.
+    """
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), \
+              "fortran_order": False, "shape": (number_of_rows,)}
+    largest = dict(header, shape=(sys.maxsize,))
+    magic = np.lib.format.magic(1, 0)
+    length = -(-(len(magic) + 3 + len(repr(largest))) // 64) * 64 - \
+             len(magic) - 2
+    header = repr(header).ljust(length - 1) + "\n"
+    return magic + length.to_bytes(2, "little") + header.encode("latin1")
+
+
+class NpyAppender:
+    """Append blocks of records to a .npy file of growing length
+
+    With resume_rows, an existing file is cut back to its first
+    resume_rows records and appended to.
+    """
+    def __init__(self, path, dtype, resume_rows=None):
+        self.dtype = np.dtype(dtype)
+        if resume_rows is None:
+            self.number_of_rows = 0
+            self.file = open(path, "wb")
+            self.file.write(npy_header(self.dtype, 0))
+        else:
+            self.number_of_rows = resume_rows
+            self.file = open(path, "r+b")
+            self.file.truncate(len(npy_header(self.dtype, 0)) + \
+                               resume_rows * self.dtype.itemsize)
+            self.file.seek(0, os.SEEK_END)
+
+    def write(self, block):
+        """Append a block of records"""
+        block = np.asarray(block, dtype=self.dtype)
+        self.file.write(block.tobytes())
+        self.number_of_rows += len(block)
+
+    def sync(self):
+        """Make the records written so far durable"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        """Write the final row count into the header and close the file"""
+        self.file.seek(0)
+        self.file.write(npy_header(self.dtype, self.number_of_rows))
+        self.file.close()
+
+
+class ResultsWriter:
+    """Collect game results and write them in large blocks
+
+    With resume_from (a value returned by checkpoint), an existing
+    results file is cut back to the checkpoint and appended to.
+    """
+    def __init__(self, path, file_format=None, buffer_rows=BUFFER_ROWS, \
+                 resume_from=None):
+        self.path = path
+        self.file_format = file_format or results_format(path)
+        self.buffer_rows = buffer_rows
+        self.rows = []
+        self.number_of_rows = 0
+
+        if self.file_format == "csv" and resume_from is None:
+            self.file = open(path, "w")
+            self.file.write(";".join(RESULT_COLUMNS) + ";;\n")
+        elif self.file_format == "csv":
+            self.file = open(path, "r+")
+            self.file.truncate(resume_from)
+            self.file.seek(resume_from)
+        elif self.file_format == "npy":
+            self.file = NpyAppender(path, RESULT_DTYPE, resume_from)
+        elif self.file_format == "sqlite":
+            from donald_duck_sqlite import SqliteAppender
+            self.file = SqliteAppender(path, resume_from)
+        elif resume_from is not None:
+            raise ValueError("Cannot resume " + self.file_format + " results")
+        elif self.file_format == "arrow":
+            pyarrow = self.pyarrow = load_pyarrow("Writing")
+            self.file = pyarrow.OSFile(path, "wb")
+            self.arrow_writer = pyarrow.ipc.new_file(self.file, \
+                pyarrow.schema([(name, pyarrow.string()) \
+                                if name == "WinnerName" else \
+                                (name, pyarrow.from_numpy_dtype( \
+                                    RESULT_DTYPE[name])) \
+                                for name in RESULT_COLUMNS]))
+        else:
+            raise ValueError("Unknown results format: " + str(file_format))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_row(self, row):
+        """Add the results of one simulation run, in column order"""
+        self.rows.append(row)
+        if len(self.rows) >= self.buffer_rows:
+            self.flush()
+
+    def write_columns(self, columns):
+        """Write the results of many runs, given as one array per column"""
+        self.flush()
+        if self.file_format == "csv":
+            values = [columns[name].tolist() for name in RESULT_COLUMNS]
+            self.write_block(list(zip(*values)))
+        else:
+            records = np.empty(len(columns[RESULT_COLUMNS[0]]), \
+                               dtype=RESULT_DTYPE)
+            for name in RESULT_COLUMNS:
+                records[name] = columns[name]
+            self.write_block(records)
+
+    def flush(self):
+        """Write the collected rows as one block"""
+        if self.rows:
+            if self.file_format == "csv":
+                self.write_block(self.rows)
+            else:
+                self.write_block(np.array([tuple(row) for row in self.rows], \
+                                          dtype=RESULT_DTYPE))
+            self.rows = []
+
+    def checkpoint(self):
+        """Write and sync the collected rows, return the position to resume"""
+        if self.file_format == "arrow":
+            raise ValueError("Cannot checkpoint arrow results")
+        self.flush()
+        if self.file_format in ("npy", "sqlite"):
+            self.file.sync()
+            return self.file.number_of_rows
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def write_block(self, block):
+        """Write rows (text) or a record array (binary) in one go"""
+        self.number_of_rows += len(block)
+        if self.file_format == "csv":
+            self.file.write("".join([";".join(map(str, row)) + ";\n" \
+                                     for row in block]))
+        elif self.file_format in ("npy", "sqlite"):
+            self.file.write(block)
+        else:
+            pyarrow = self.pyarrow
+            self.arrow_writer.write_batch(pyarrow.RecordBatch.from_arrays( \
+                [pyarrow.array(np.char.decode(block[name], "ascii")) \
+                 if name == "WinnerName" else pyarrow.array(block[name]) \
+                 for name in RESULT_COLUMNS], names=list(RESULT_COLUMNS)))
+
+    def close(self):
+        """Write the remaining rows and close the file"""
+        if self.file is None:
+            return
+        self.flush()
+        if self.file_format == "arrow":
+            self.arrow_writer.close()
+        self.file.close()
+        self.file = None
+
+
+def read_results(path, file_format=None):
+    """Read a results file into a record array"""
+    file_format = file_format or results_format(path)
+    if file_format == "npy":
+        return np.load(path, mmap_mode="r")
+    if file_format == "arrow":
+        pyarrow = load_pyarrow("Reading")
+        with pyarrow.memory_map(path) as source:
+            table = pyarrow.ipc.open_file(source).read_all()
+        records = np.empty(table.num_rows, dtype=RESULT_DTYPE)
+        for name in RESULT_COLUMNS:
+            records[name] = table.column(name).to_numpy()
+        return records
+    if file_format == "sqlite":
+        from donald_duck_sqlite import read_sqlite
+        return read_sqlite(path)
+    with open(path) as game_results:
+        next(game_results)
+        return np.array([tuple(line.split(";")[:len(RESULT_COLUMNS)]) \
+                         for line in game_results], dtype=RESULT_DTYPE)
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Simulation service for the Donald Duck Holiday Game
+Serves simulation jobs over line-delimited JSON on localhost or a Unix
+socket. A client sends jobs (number of runs and players, master seed
+and a variant as in donald_duck_sweep) and cancellations, one JSON
+object per line; the service plays the runs on a pool of worker
+processes and streams a results row per simulation run and an
+aggregate snapshot every SNAPSHOT_INTERVAL seconds, so clients can
+follow the win probabilities while they converge and stop a job early.
+At most MAX_PENDING_TASKS tasks per job are queued ahead of the client:
+a client that reads slowly holds its jobs back instead of filling the
+memory of the service. Closing the connection cancels its jobs.
+This code has been published under the GNU GPLv3 license
+"""
+import asyncio
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from donald_duck_results import CHARACTER_LABELS, CHARACTER_NAMES, \
+    RESULT_COLUMNS
+from donald_duck_stats import STATISTIC_COLUMNS, GameStatistics
+from donald_duck_sweep import DEFAULT_CONFIGURATION, configured_game
+
+HOST = "127.0.0.1" # only local clients can connect
+PORT = 8765
+UNIX_SOCKET = None # e.g. "donald_duck.sock" to serve on a Unix socket
+NUMBER_OF_WORKERS = os.cpu_count() # worker processes shared by all jobs
+RUNS_PER_TASK = 200 # simulation runs handed to a worker at once
+MAX_PENDING_TASKS = 2 * NUMBER_OF_WORKERS # tasks per job queued ahead
+SNAPSHOT_INTERVAL = 1 # seconds between aggregate snapshots of a job
+
+# A job, as sent by the client (only runs is required):
+# {"job": "a", "runs": 10000, "players": 5, "seed": 1996,
+#  "variant": {"board_changes": {"bounce_back": false}}, "rows": true}
+# and its cancellation: {"cancel": "a"}
+# The service answers with messages {"job": "a", "event": ...}: started
+# (with the master seed and the results columns), row, snapshot, then
+# done, cancelled or error.
+JOB_DEFAULTS = {"job": None, "players": 5, "seed": None, "variant": {}, \
+                "rows": True}
+WON_COLUMNS = [STATISTIC_COLUMNS.index("Won" + label) for label in \
+               CHARACTER_LABELS]
+ROUNDS_COLUMN = STATISTIC_COLUMNS.index("NumberOfRoundsPlayed")
+
+def play_task(configuration, master_seed, simulation_runs):
+    """Play a range of simulation runs of a configuration (one task)"""
+    game = configured_game(configuration)
+    return [game_result for game_result, _ in \
+            game.play_many(len(simulation_runs), master_seed, \
+                           simulation_runs.start)]
+
+def job_configuration(request):
+    """Return the game configuration of a job, checking the request"""
+    variant = request["variant"]
+    if not isinstance(variant, dict) or \
+       not set(variant) <= set(DEFAULT_CONFIGURATION) - \
+           {"number_of_players"}:
+        raise ValueError("Unknown variant entries")
+    if not isinstance(request["runs"], int) or request["runs"] < 1:
+        raise ValueError("Please select a positve number of simulation runs")
+    if request["seed"] is not None and not isinstance(request["seed"], int):
+        raise ValueError("The seed must be an integer")
+    configuration = dict(DEFAULT_CONFIGURATION, **variant)
+    configuration["number_of_players"] = request["players"]
+    # Fails early on bad players, rosters or board changes
+    configured_game(configuration)
+    return configuration
+
+def snapshot(statistics):
+    """Return the aggregate of a job so far as a message"""
+    mean = statistics.mean()
+    lower, upper = statistics.confidence_interval()
+    return {"event": "snapshot", "games": statistics.count, \
+            "mean_rounds": mean[ROUNDS_COLUMN], \
+            "win_probability": {name: mean[column] for name, column in \
+                                zip(CHARACTER_NAMES, WON_COLUMNS)}, \
+            "confidence_interval": {name: [lower[column], upper[column]] \
+                                    for name, column in \
+                                    zip(CHARACTER_NAMES, WON_COLUMNS)}}
+
+
+class Connection:
+    """Run the jobs of one client and stream their messages to it"""
+    def __init__(self, reader, writer, executor):
+        self.reader = reader
+        self.writer = writer
+        self.executor = executor
+        self.jobs = {}
+        self.running = set() # jobs whose run_job has started
+
+    def send(self, job, message):
+        """Write one message of a job, unless the client is gone"""
+        if not self.writer.is_closing():
+            self.writer.write((json.dumps(dict(message, job=job)) + \
+                               "\n").encode())
+
+    async def serve(self):
+        """Read jobs and cancellations until the client disconnects"""
+        try:
+            async for line in self.reader:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    self.send(None, {"event": "error", \
+                                     "message": "Invalid JSON"})
+                    continue
+                if not isinstance(request, dict):
+                    self.send(None, {"event": "error", \
+                                     "message": "Expected a JSON object"})
+                elif "cancel" in request:
+                    if request["cancel"] in self.jobs:
+                        self.jobs[request["cancel"]].cancel()
+                else:
+                    self.start(request)
+        except ConnectionError:
+            pass
+        finally:
+            for job in list(self.jobs.values()):
+                job.cancel()
+            self.writer.close()
+
+    def start(self, request):
+        """Check a job request and start the job"""
+        request = dict(JOB_DEFAULTS, **request)
+        job = request["job"]
+        try:
+            if job in self.jobs:
+                raise ValueError("Job {} is still running".format(job))
+            configuration = job_configuration(request)
+        except (KeyError, TypeError, ValueError) as error:
+            self.send(job, {"event": "error", "message": str(error)})
+            return
+        master_seed = request["seed"]
+        if master_seed is None:
+            master_seed = int(np.random.SeedSequence().entropy)
+        self.send(job, {"event": "started", "seed": master_seed, \
+                        "columns": RESULT_COLUMNS})
+        task = asyncio.create_task(self.run_job(job, configuration, \
+            request["runs"], master_seed, request["rows"]))
+        self.jobs[job] = task
+        task.add_done_callback(lambda task: self.finish(job, task))
+
+    def finish(self, job, task):
+        """Forget a finished job
+
+        A job cancelled before run_job started has sent no cancelled
+        message yet, so it is sent here.
+        """
+        self.jobs.pop(job, None)
+        if task.cancelled() and job not in self.running:
+            self.send(job, {"event": "cancelled", "games": 0})
+        self.running.discard(job)
+
+    async def run_job(self, job, configuration, number_of_games, \
+                      master_seed, send_rows):
+        """Play the runs of a job, streaming rows and snapshots in run order"""
+        self.running.add(job)
+        loop = asyncio.get_running_loop()
+        tasks = (range(first_run, min(first_run + RUNS_PER_TASK, \
+                                      number_of_games)) \
+                 for first_run in range(0, number_of_games, RUNS_PER_TASK))
+        pending = deque()
+        statistics = GameStatistics()
+        winners = [0] * len(CHARACTER_NAMES)
+        games_played = 0
+        next_snapshot = loop.time() + SNAPSHOT_INTERVAL
+
+        def submit():
+            for simulation_runs in tasks:
+                pending.append(loop.run_in_executor(self.executor, \
+                    play_task, configuration, master_seed, simulation_runs))
+                if len(pending) >= MAX_PENDING_TASKS:
+                    break
+
+        try:
+            submit()
+            while pending:
+                game_results = await pending.popleft()
+                submit()
+                for game_result in game_results:
+                    games_played += 1
+                    winners[CHARACTER_NAMES.index(game_result[1])] += 1
+                    row = [games_played, game_result[0], game_result[1]] + \
+                          winners + game_result[2:]
+                    statistics.update_row(row)
+                    if send_rows:
+                        self.send(job, {"event": "row", "row": row})
+                # Wait here while the client cannot keep up
+                await self.writer.drain()
+                if loop.time() >= next_snapshot:
+                    self.send(job, snapshot(statistics))
+                    next_snapshot = loop.time() + SNAPSHOT_INTERVAL
+            self.send(job, snapshot(statistics))
+            self.send(job, {"event": "done", "games": games_played})
+        except asyncio.CancelledError:
+            self.send(job, {"event": "cancelled", "games": games_played})
+            raise
+        except ConnectionError:
+            pass
+        except Exception as error:
+            self.send(job, {"event": "error", "message": repr(error)})
+        finally:
+            # Tasks a worker has not started yet are dropped
+            for future in pending:
+                future.cancel()
+
+
+async def serve(host=HOST, port=PORT, unix_socket=UNIX_SOCKET, \
+                number_of_workers=NUMBER_OF_WORKERS, started=None):
+    """Serve simulation jobs until cancelled
+
+    started, if given, is an asyncio.Event that is set once clients can
+    connect.
+    """
+    with ProcessPoolExecutor(number_of_workers) as executor:
+        def connected(reader, writer):
+            return Connection(reader, writer, executor).serve()
+
+        if unix_socket is not None:
+            server = await asyncio.start_unix_server(connected, unix_socket)
+        else:
+            server = await asyncio.start_server(connected, host, port)
+        async with server:
+            if started is not None:
+                started.set()
+            await server.serve_forever()
+
+async def request_job(job, host=HOST, port=PORT, unix_socket=UNIX_SOCKET):
+    """Send one job to the service and yield its messages until it ends
+
+    Leaving the loop early closes the connection, which cancels the job.
+    """
+    if unix_socket is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_socket)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write((json.dumps(job) + "\n").encode())
+        await writer.drain()
+        async for line in reader:
+            message = json.loads(line)
+            yield message
+            if message["event"] in ("done", "cancelled", "error"):
+                break
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    print("Serving simulation jobs on", UNIX_SOCKET or \
+          "{}:{}".format(HOST, PORT), file=sys.stderr)
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
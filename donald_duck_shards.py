@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Sharded runner for the Donald Duck Holiday Game
+A coordinator splits a batch into shards, ranges of simulation runs,
+and hands them to workers through a work queue; the workers return the
+streaming statistics and the exact integer totals of every metric of
+their shard. Every run is seeded from the master seed and its run
+index, so a shard gives the same result wherever and however often it
+is played: shards of a lost worker are simply handed out again once
+their lease expires. The coordinator merges the shards in run order,
+which makes the aggregate deterministic, and the totals (winner counts
+included) equal those of a single-process run of the same seed.
+The queue is pluggable; SpoolQueue keeps it in a spool directory and
+claims shards by renaming files, which works for processes on one
+machine and for machines sharing the directory.
+This code has been published under the GNU GPLv3 license
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from multiprocessing import Process
+
+import numpy as np
+
+from donald_duck_holiday_game import ENGINE_VERSION
+from donald_duck_results import CHARACTER_LABELS
+from donald_duck_stats import STATISTIC_COLUMNS, GameStatistics, \
+    load_statistics, metric_values
+from donald_duck_sweep import DEFAULT_CONFIGURATION, configured_game
+
+SHARD_SIZE = 1000 # simulation runs per shard
+LEASE = 600 # seconds before a claimed shard is handed out again
+POLL_INTERVAL = 1 # seconds between looks at the queue while waiting
+
+
+class SpoolQueue:
+    """Work queue of a job in a spool directory
+
+    A shard is a file in todo/, moved to claimed/ by the worker that
+    plays it and replaced by its result in done/. Renames and the
+    results are atomic, so workers can crash at any point.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.todo = os.path.join(directory, "todo")
+        self.claimed = os.path.join(directory, "claimed")
+        self.done = os.path.join(directory, "done")
+
+    @staticmethod
+    def shard_name(shard):
+        """Return the file name of a shard, sorting in run order"""
+        return "{:012d}".format(shard["first_run"])
+
+    def submit(self, job, shards):
+        """Create the queue of a job and put all shards into it
+
+        The spool directory must not hold another job, whose results
+        would be merged into this one.
+        """
+        if os.path.exists(os.path.join(self.directory, "job.json")) or \
+           any(os.path.isdir(directory) and os.listdir(directory) for \
+               directory in (self.todo, self.claimed, self.done)):
+            raise ValueError("The spool directory " + self.directory + \
+                             " holds another job, please select a new one")
+        for directory in (self.todo, self.claimed, self.done):
+            os.makedirs(directory, exist_ok=True)
+        self.write_json(os.path.join(self.directory, "job.json"), job)
+        for shard in shards:
+            self.write_json(os.path.join(self.todo, self.shard_name(shard) + \
+                                         ".json"), shard)
+
+    def job(self):
+        """Return the job description"""
+        with open(os.path.join(self.directory, "job.json")) as job_file:
+            return json.load(job_file)
+
+    def claim(self):
+        """Take a shard from the queue, return it or None if there is none"""
+        for name in sorted(self.shard_files(self.todo)):
+            todo_path = os.path.join(self.todo, name)
+            claimed_path = os.path.join(self.claimed, name)
+            try:
+                # The lease starts now, before the shard shows up in
+                # claimed/ where requeue_expired looks at its age
+                os.utime(todo_path)
+                os.rename(todo_path, claimed_path)
+            except FileNotFoundError:
+                continue # claimed by another worker
+            with open(claimed_path) as shard_file:
+                return json.load(shard_file)
+        return None
+
+    def complete(self, shard, statistics, totals):
+        """Store the result of a shard and take it off the queue"""
+        name = self.shard_name(shard)
+        temporary_path = os.path.join(self.done, name + ".tmp")
+        with open(temporary_path, "wb") as result_file:
+            statistics.save(result_file, totals=totals)
+        os.replace(temporary_path, os.path.join(self.done, name + ".npz"))
+        try:
+            os.remove(os.path.join(self.claimed, name + ".json"))
+        except FileNotFoundError:
+            pass # handed out again and completed twice, same result
+
+    def requeue_expired(self, lease=LEASE):
+        """Hand out shards again whose lease expired, return their number"""
+        requeued = 0
+        for name in self.shard_files(self.claimed):
+            path = os.path.join(self.claimed, name)
+            try:
+                if time.time() - os.path.getmtime(path) > lease:
+                    os.rename(path, os.path.join(self.todo, name))
+                    requeued += 1
+            except FileNotFoundError:
+                pass # completed meanwhile
+        return requeued
+
+    def unfinished(self):
+        """Return the number of shards waiting or being played"""
+        return len(self.shard_files(self.todo)) + \
+               len(self.shard_files(self.claimed))
+
+    def results(self):
+        """Yield shard name, statistics and totals of the finished shards"""
+        for name in sorted(os.listdir(self.done)):
+            if name.endswith(".npz"):
+                path = os.path.join(self.done, name)
+                with np.load(path) as result:
+                    totals = result["totals"]
+                yield name[:-len(".npz")], load_statistics(path), totals
+
+    @staticmethod
+    def shard_files(directory):
+        """Return the shard files in a directory, without temporary files"""
+        return [name for name in os.listdir(directory) \
+                if name.endswith(".json")]
+
+    @staticmethod
+    def write_json(path, value):
+        """Atomically write a JSON file"""
+        with open(path + ".tmp", "w") as json_file:
+            json.dump(value, json_file)
+        os.replace(path + ".tmp", path)
+
+
+def shard_ranges(number_of_games, shard_size=SHARD_SIZE):
+    """Split a batch into shards of consecutive simulation runs"""
+    return [{"first_run": first_run, \
+             "last_run": min(first_run + shard_size, number_of_games)} \
+            for first_run in range(0, number_of_games, shard_size)]
+
+def submit_job(queue, number_of_games, master_seed, configuration=None, \
+               shard_size=SHARD_SIZE):
+    """Put all shards of a batch into the queue"""
+    if master_seed is None:
+        raise ValueError("A sharded batch needs a fixed master seed")
+    configuration = dict(DEFAULT_CONFIGURATION, **(configuration or {}))
+    configured_game(configuration) # fails early on bad configurations
+    job = {"configuration": configuration, \
+           "number_of_games": number_of_games, "master_seed": master_seed, \
+           "engine_version": ENGINE_VERSION}
+    queue.submit(job, shard_ranges(number_of_games, shard_size))
+    return job
+
+def play_shard(job, shard):
+    """Play the runs of a shard, return their statistics and totals"""
+    game = configured_game(job["configuration"])
+    statistics = GameStatistics()
+    totals = np.zeros(len(STATISTIC_COLUMNS), dtype=np.int64)
+    for game_result, _ in game.play_many(shard["last_run"] - \
+                                         shard["first_run"], \
+                                         job["master_seed"], \
+                                         shard["first_run"]):
+        values = metric_values(game_result[0], game_result[1], \
+                               game_result[2:])
+        statistics.update_values(values)
+        totals += values
+    statistics.flush()
+    return statistics, totals
+
+def run_worker(queue, lease=LEASE, poll_interval=POLL_INTERVAL):
+    """Play shards until the queue is empty, return the number played
+
+    A worker that runs out of shards while others are still being
+    played waits, and takes over the shards whose lease expires.
+    """
+    job = queue.job()
+    if job["engine_version"] != ENGINE_VERSION:
+        raise ValueError("The job was submitted for another engine version")
+    shards_played = 0
+    while True:
+        shard = queue.claim()
+        if shard is not None:
+            statistics, totals = play_shard(job, shard)
+            queue.complete(shard, statistics, totals)
+            shards_played += 1
+        elif queue.unfinished() == 0:
+            return shards_played
+        elif not queue.requeue_expired(lease):
+            time.sleep(poll_interval)
+
+def collect(queue, lease=LEASE, poll_interval=POLL_INTERVAL):
+    """Wait for all shards, return the merged statistics and totals"""
+    while queue.unfinished():
+        if not queue.requeue_expired(lease):
+            time.sleep(poll_interval)
+    statistics = GameStatistics()
+    totals = np.zeros(len(STATISTIC_COLUMNS), dtype=np.int64)
+    # Merged in run order, so the result does not depend on the workers
+    number_of_games = 0
+    for _, shard_statistics, shard_totals in queue.results():
+        statistics.merge(shard_statistics)
+        totals += shard_totals
+        number_of_games += shard_statistics.count
+    if number_of_games != queue.job()["number_of_games"]:
+        raise ValueError("Shards are missing from the spool directory")
+    return statistics, totals
+
+def parse_arguments(argv=None):
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(description="Sharded runner of the " \
+                                     "Donald Duck Holiday Game")
+    parser.add_argument("command", choices=("submit", "work", "collect", \
+                                            "run"), \
+                        help="submit a job, work on it, collect its " \
+                        "results, or all of these with local workers (run)")
+    parser.add_argument("spool", help="spool directory of the job")
+    parser.add_argument("-n", "--runs", type=int, default=100000, \
+                        help="number of simulation runs (submit, run)")
+    parser.add_argument("-s", "--seed", type=int, \
+                        help="master seed (submit, run)")
+    parser.add_argument("-p", "--players", type=int, default=5, \
+                        help="2 to 5 players (submit, run)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, \
+                        help="simulation runs per shard (submit, run)")
+    parser.add_argument("-w", "--workers", type=int, \
+                        default=os.cpu_count(), \
+                        help="local worker processes (run)")
+    parser.add_argument("--lease", type=float, default=LEASE, \
+                        help="seconds before a claimed shard is handed " \
+                        "out again")
+    arguments = parser.parse_args(argv)
+    if arguments.command in ("submit", "run") and arguments.seed is None:
+        parser.error("Please select a master seed")
+    if arguments.players < 2 or arguments.players > 5:
+        parser.error("Please select a number of players between 2 and 5")
+    if arguments.runs < 1 or arguments.shard_size < 1:
+        parser.error("Please select a positive number of simulation runs")
+    return arguments
+
+def main(argv=None):
+    """Run the role given on the command line"""
+    arguments = parse_arguments(argv)
+    queue = SpoolQueue(arguments.spool)
+    if arguments.command in ("submit", "run"):
+        try:
+            submit_job(queue, arguments.runs, arguments.seed, \
+                       {"number_of_players": arguments.players}, \
+                       arguments.shard_size)
+        except ValueError as error:
+            sys.exit(str(error))
+    if arguments.command == "work":
+        print(socket.gethostname(), "played", \
+              run_worker(queue, arguments.lease), "shards", file=sys.stderr)
+    if arguments.command == "run":
+        workers = [Process(target=run_worker, args=(queue, arguments.lease)) \
+                   for _ in range(arguments.workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    if arguments.command in ("collect", "run"):
+        statistics, totals = collect(queue, arguments.lease)
+        print("Games:", statistics.count)
+        for label in CHARACTER_LABELS:
+            print("Winner" + label + ":", \
+                  totals[STATISTIC_COLUMNS.index("Won" + label)])
+        print(statistics.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite results store for the Donald Duck Holiday Game
+Writes the game results into an indexed SQLite database instead of a
+flat file: one row per simulation run in runs, and the per-character
+columns normalised into players, one row per character that played
+(characters with only zeros are left out). The cumulative Winner*
+counters of GAMERESULTS.txt are not stored; read_sqlite rebuilds them.
+Blocks of rows are inserted in one transaction each and the indexes
+are built once, when the file is closed, so filtered questions need
+no full scan:
+  games Goofy won with two camping cards back to start:
+    SELECT * FROM runs WHERE Winner = 1 AND NumberOfCampingCards = 2
+  winner share by starting position:
+    SELECT WinnerStartingPosition, Winner, COUNT(*) FROM runs
+    GROUP BY WinnerStartingPosition, Winner
+Characters are numbered as in CHARACTER_NAMES, see the characters table.
+This code has been published under the GNU GPLv3 license
+"""
+import os
+import sqlite3
+
+import numpy as np
+
+from donald_duck_results import CHARACTER_LABELS, CHARACTER_NAMES, \
+    RESULT_DTYPE
+
+# Game columns of the results, stored in runs
+GAME_COLUMNS = ("NumberOfRoundsPlayed", "NumberOfCampingCards", \
+                "NumberOfRouteMaps", "NumberOfCameras", "NumberOfPostcards", \
+                "TurnsLedWinner", "NumberOfLeaders", "NumberOfCoffees", \
+                "NumberOfDishesWashed", "NumberOfTunnels")
+# Per-character columns of the results (without the label), in players
+PLAYER_COLUMNS = ("TurnsWaiting", "NumberOfShortcuts", "StartingPosition", \
+                  "NumberOfEventSquaresVisited", "NumberOfEventCardsDrawn", \
+                  "NumberSquaresRandom")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS characters (Character INTEGER PRIMARY KEY,
+    Name TEXT, Label TEXT);
+CREATE TABLE IF NOT EXISTS runs (SimulationRunID INTEGER PRIMARY KEY,
+    Winner INTEGER, WinnerStartingPosition INTEGER, {});
+CREATE TABLE IF NOT EXISTS players (SimulationRunID INTEGER,
+    Character INTEGER, {},
+    PRIMARY KEY (SimulationRunID, Character)) WITHOUT ROWID;
+""".format(", ".join(name + " INTEGER" for name in GAME_COLUMNS), \
+           ", ".join(name + " INTEGER" for name in PLAYER_COLUMNS))
+INDEXES = """
+CREATE INDEX IF NOT EXISTS runs_winner ON runs (Winner, NumberOfRoundsPlayed);
+CREATE INDEX IF NOT EXISTS runs_rounds ON runs (NumberOfRoundsPlayed);
+CREATE INDEX IF NOT EXISTS runs_starting_position
+    ON runs (WinnerStartingPosition, Winner);
+CREATE INDEX IF NOT EXISTS players_starting_position
+    ON players (Character, StartingPosition);
+"""
+
+STARTING_POSITION = PLAYER_COLUMNS.index("StartingPosition")
+# Winner names in sorted order and their character numbers
+WINNER_ORDER = np.argsort([name.encode() for name in CHARACTER_NAMES])
+WINNER_NAMES = np.array([name.encode() for name in CHARACTER_NAMES], \
+                        dtype=RESULT_DTYPE["WinnerName"])[WINNER_ORDER]
+
+
+class SqliteAppender:
+    """Insert blocks of result records into an SQLite database
+
+    With resume_rows, the runs after the first resume_rows simulation
+    runs are deleted and the database is appended to.
+    """
+    def __init__(self, path, resume_rows=None):
+        if resume_rows is None and os.path.exists(path):
+            os.remove(path)
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.executemany("INSERT OR REPLACE INTO characters " \
+                "VALUES (?, ?, ?)", [(character, name, label) for \
+                character, (name, label) in \
+                enumerate(zip(CHARACTER_NAMES, CHARACTER_LABELS))])
+        self.number_of_rows = 0
+        if resume_rows is not None:
+            with self.connection:
+                for table in ("runs", "players"):
+                    self.connection.execute("DELETE FROM " + table + \
+                        " WHERE SimulationRunID > ?", (resume_rows,))
+            self.number_of_rows = resume_rows
+        self.runs = "INSERT INTO runs VALUES ({})".format( \
+            ", ".join("?" * (3 + len(GAME_COLUMNS))))
+        self.players = "INSERT INTO players VALUES ({})".format( \
+            ", ".join("?" * (2 + len(PLAYER_COLUMNS))))
+
+    def write(self, block):
+        """Insert a block of records in one transaction"""
+        runs = block["SimulationRunID"].astype(np.int64)
+        winners = np.searchsorted(WINNER_NAMES, block["WinnerName"])
+        winners = WINNER_ORDER[winners]
+        players = np.stack([np.column_stack( \
+            [runs, np.full(len(block), character)] + \
+            [block[name + label] for name in PLAYER_COLUMNS]) \
+            for character, label in enumerate(CHARACTER_LABELS)])
+        winner_starts = players[winners, np.arange(len(block)), \
+                                2 + STARTING_POSITION]
+        # In key order, run by run
+        players = players.transpose(1, 0, 2).reshape(-1, players.shape[2])
+        with self.connection:
+            self.connection.executemany(self.runs, np.column_stack( \
+                [runs, winners, winner_starts] + \
+                [block[name] for name in GAME_COLUMNS]).tolist())
+            self.connection.executemany(self.players, \
+                players[players[:, 2:].any(axis=1)].tolist())
+        self.number_of_rows += len(block)
+
+    def sync(self):
+        """Make the rows written so far durable (every block is committed)"""
+
+    def close(self):
+        """Build the indexes and close the database"""
+        with self.connection:
+            self.connection.executescript(INDEXES)
+        self.connection.execute("ANALYZE")
+        self.connection.close()
+
+
+def read_sqlite(path):
+    """Read an SQLite results store into a record array"""
+    with sqlite3.connect(path) as connection:
+        runs = np.array(connection.execute("SELECT SimulationRunID, " \
+            "Winner, " + ", ".join(GAME_COLUMNS) + " FROM runs ORDER BY " \
+            "SimulationRunID").fetchall(), dtype=np.int64) \
+            .reshape(-1, 2 + len(GAME_COLUMNS))
+        players = np.array(connection.execute("SELECT SimulationRunID, " \
+            "Character, " + ", ".join(PLAYER_COLUMNS) + " FROM players") \
+            .fetchall(), dtype=np.int64).reshape(-1, 2 + len(PLAYER_COLUMNS))
+    records = np.zeros(len(runs), dtype=RESULT_DTYPE)
+    records["SimulationRunID"] = runs[:, 0]
+    winners = runs[:, 1]
+    records["WinnerName"] = np.array([name.encode() for name in \
+                                      CHARACTER_NAMES])[winners]
+    for column, name in enumerate(GAME_COLUMNS, 2):
+        records[name] = runs[:, column]
+    rows = np.searchsorted(runs[:, 0], players[:, 0])
+    for character, label in enumerate(CHARACTER_LABELS):
+        records["Winner" + label] = np.cumsum(winners == character)
+        played = players[:, 1] == character
+        for column, name in enumerate(PLAYER_COLUMNS, 2):
+            records[name + label][rows[played]] = players[played, column]
+    return records
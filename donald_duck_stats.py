@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming statistics for the Donald Duck Holiday Game
+Keeps the count, running mean and variance, minimum, maximum and a
+fixed-bin histogram of every game metric while the games are played,
+so a summary with confidence intervals is available at any time
+without writing or rereading a results file. Rows are collected in
+blocks and folded in with the pairwise update of Chan, Golub and
+LeVeque; partial aggregates of separate workers merge the same way.
+Memory use does not depend on the number of games.
+This code has been published under the GNU GPLv3 license
+"""
+from statistics import NormalDist
+
+import numpy as np
+
+from donald_duck_results import CHARACTER_LABELS, CHARACTER_NAMES, \
+    RESULT_COLUMNS
+
+BUFFER_ROWS = 10000 # rows collected before they are folded in
+CONFIDENCE = 0.95 # confidence level of the reported intervals
+HISTOGRAM_MINIMUM = -512 # value counted in the first histogram bin
+HISTOGRAM_BINS = 1536 # unit-width bins, outliers go to the first/last bin
+
+# Metrics of one game: the number of rounds, whether each character won
+# and the per-game counters of the results (not the cumulative winners)
+FIRST_METRIC = RESULT_COLUMNS.index("TurnsWaitingHDL")
+STATISTIC_COLUMNS = ("NumberOfRoundsPlayed",) + \
+    tuple("Won" + label for label in CHARACTER_LABELS) + \
+    RESULT_COLUMNS[FIRST_METRIC:]
+
+WINNER_INDEX = {name: index for index, name in enumerate(CHARACTER_NAMES)}
+WINNER_INDEX.update({name.encode(): index for name, index in \
+                     list(WINNER_INDEX.items())})
+
+def metric_values(number_of_rounds, winner_name, counters):
+    """Return the metrics of one game in the order of STATISTIC_COLUMNS
+
+    counters are the per-game results columns from TurnsWaitingHDL on.
+    """
+    won = [0] * len(CHARACTER_NAMES)
+    won[WINNER_INDEX[winner_name]] = 1
+    return [number_of_rounds] + won + list(counters)
+
+
+class GameStatistics:
+    """Aggregate game metrics without keeping the games"""
+    def __init__(self, buffer_rows=BUFFER_ROWS):
+        self.buffer_rows = buffer_rows
+        self.rows = []
+        columns = len(STATISTIC_COLUMNS)
+        self.count = 0
+        self.running_mean = np.zeros(columns)
+        self.sum_of_squares = np.zeros(columns) # squared deviations from mean
+        self.minimum = np.full(columns, np.inf)
+        self.maximum = np.full(columns, -np.inf)
+        self.histogram = np.zeros((columns, HISTOGRAM_BINS), dtype=np.int64)
+
+    def update_row(self, row):
+        """Add one game, given as a results row in column order"""
+        self.update_values(metric_values(row[1], row[2], row[FIRST_METRIC:]))
+
+    def update_values(self, values):
+        """Add one game, given as metrics in the order of STATISTIC_COLUMNS"""
+        self.rows.append(values)
+        if len(self.rows) >= self.buffer_rows:
+            self.flush()
+
+    def update_columns(self, columns):
+        """Add many games, given as one array per results column"""
+        self.flush()
+        winners = np.asarray(columns["WinnerName"])
+        if winners.dtype.kind == "S":
+            winners = np.char.decode(winners, "ascii")
+        values = [columns["NumberOfRoundsPlayed"]] + \
+                 [winners == name for name in CHARACTER_NAMES] + \
+                 [columns[name] for name in RESULT_COLUMNS[FIRST_METRIC:]]
+        self.update_block(np.column_stack(values))
+
+    def flush(self):
+        """Fold the collected rows into the aggregate"""
+        if self.rows:
+            self.update_block(np.array(self.rows))
+            self.rows = []
+
+    def update_block(self, values):
+        """Fold a block of games (rows) and metrics (columns) in"""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        mean = values.mean(axis=0)
+        bins = np.clip(values - HISTOGRAM_MINIMUM, 0, \
+                       HISTOGRAM_BINS - 1).astype(np.int64)
+        bins += np.arange(values.shape[1]) * HISTOGRAM_BINS
+        histogram = np.bincount(bins.ravel(), \
+                                minlength=self.histogram.size)
+        self.combine(len(values), mean, ((values - mean) ** 2).sum(axis=0), \
+                     values.min(axis=0), values.max(axis=0), \
+                     histogram.reshape(self.histogram.shape))
+
+    def combine(self, count, mean, sum_of_squares, minimum, maximum, \
+                histogram):
+        """Combine the aggregate with the aggregate of other games"""
+        total = self.count + count
+        delta = mean - self.running_mean
+        self.running_mean = self.running_mean + delta * (count / total)
+        self.sum_of_squares = self.sum_of_squares + sum_of_squares + \
+                              delta ** 2 * (self.count * count / total)
+        self.count = total
+        self.minimum = np.minimum(self.minimum, minimum)
+        self.maximum = np.maximum(self.maximum, maximum)
+        self.histogram += histogram
+
+    def merge(self, other):
+        """Add the games aggregated by another GameStatistics"""
+        self.flush()
+        other.flush()
+        if other.count:
+            self.combine(other.count, other.running_mean, \
+                         other.sum_of_squares, other.minimum, \
+                         other.maximum, other.histogram)
+
+    def mean(self):
+        """Return the mean of every metric"""
+        self.flush()
+        return self.running_mean.copy()
+
+    def variance(self):
+        """Return the sample variance of every metric"""
+        self.flush()
+        return self.sum_of_squares / max(self.count - 1, 1)
+
+    def standard_error(self):
+        """Return the standard error of the mean of every metric"""
+        return np.sqrt(self.variance() / max(self.count, 1))
+
+    def confidence_interval(self, confidence=CONFIDENCE):
+        """Return lower and upper bounds of the means (normal approximation)"""
+        margin = NormalDist().inv_cdf((1 + confidence) / 2) * \
+                 self.standard_error()
+        mean = self.mean()
+        return mean - margin, mean + margin
+
+    def quantile(self, probability):
+        """Return a quantile of every metric, read from the histograms"""
+        self.flush()
+        cumulative = np.cumsum(self.histogram, axis=1)
+        return np.argmax(cumulative >= probability * self.count, axis=1) + \
+               HISTOGRAM_MINIMUM
+
+    def summary(self, confidence=CONFIDENCE):
+        """Return one line per metric with mean, interval and range"""
+        lower, upper = self.confidence_interval(confidence)
+        deviation = np.sqrt(self.variance())
+        median = self.quantile(0.5)
+        lines = ["{} games, {:.0%} confidence intervals".format( \
+                 self.count, confidence)]
+        for column, name in enumerate(STATISTIC_COLUMNS):
+            lines.append("{}: mean {:.4f} [{:.4f}, {:.4f}], sd {:.4f}, " \
+                         "median {}, min {:.0f}, max {:.0f}".format( \
+                         name, self.running_mean[column], lower[column], \
+                         upper[column], deviation[column], median[column], \
+                         self.minimum[column], self.maximum[column]))
+        return "\n".join(lines)
+
+    def save(self, path, **arrays):
+        """Write the aggregate, collected rows and extra arrays to a .npz file"""
+        np.savez(path, count=self.count, running_mean=self.running_mean, \
+                 sum_of_squares=self.sum_of_squares, minimum=self.minimum, \
+                 maximum=self.maximum, histogram=self.histogram, \
+                 buffered_rows=np.array(self.rows, dtype=np.float64) \
+                 .reshape(-1, len(STATISTIC_COLUMNS)), **arrays)
+
+
+def load_statistics(path):
+    """Read an aggregate written by GameStatistics.save"""
+    statistics = GameStatistics()
+    with np.load(path) as aggregate:
+        if int(aggregate["count"]):
+            statistics.combine(int(aggregate["count"]), \
+                               aggregate["running_mean"], \
+                               aggregate["sum_of_squares"], \
+                               aggregate["minimum"], aggregate["maximum"], \
+                               aggregate["histogram"])
+        if "buffered_rows" in aggregate:
+            statistics.rows = aggregate["buffered_rows"].tolist()
+    return statistics
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Parameter sweep for the Donald Duck Holiday Game
+Plays a grid of game configurations (number of players, roster of
+characters, random or fixed starting order and board rule changes) on
+a pool of worker processes and aggregates every configuration into
+streaming statistics. Finished aggregates are cached on disk under a
+hash of the configuration, the number of games, the master seed, the
+engine version and the board file, so running a sweep again only plays
+the configurations that are missing.
+This code has been published under the GNU GPLv3 license
+"""
+import hashlib
+import itertools
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+
+from donald_duck_board import BOARD_FILE, load_board
+from donald_duck_holiday_game import ENGINE_VERSION, GameState
+from donald_duck_results import CHARACTER_LABELS, CHARACTER_NAMES
+from donald_duck_stats import GameStatistics, load_statistics, metric_values
+
+NUMBER_OF_SIMULATION_RUNS = 10000 # games per configuration
+NUMBER_OF_WORKERS = os.cpu_count() # worker processes
+MASTER_SEED = None # fixed integer for reproducible results, None for random
+RUNS_PER_TASK = 1000 # games handed to a worker at once
+CACHE_DIRECTORY = "sweep_cache" # finished configurations, None to disable
+
+# Configurations to sweep: every combination of the values below
+SWEEP_GRID = {"number_of_players": [2, 3, 4, 5], \
+              "board_changes": [{}, {"bounce_back": False}]}
+
+# Configuration entries and their defaults
+DEFAULT_CONFIGURATION = {"number_of_players": 5, "roster": None, \
+                         "random_order": True, "board_changes": {}}
+
+def configuration_grid(grid):
+    """Return all combinations of the values in grid as configurations"""
+    names = sorted(grid)
+    return [dict(DEFAULT_CONFIGURATION, **dict(zip(names, values))) \
+            for values in itertools.product(*[grid[name] for name in names])]
+
+def configuration_key(configuration, number_of_games, master_seed):
+    """Return the cache key of a configuration
+
+    Entries left out of the configuration are keyed as their defaults.
+    """
+    configuration = dict(DEFAULT_CONFIGURATION, **configuration)
+    with open(BOARD_FILE, "rb") as board_file:
+        board = hashlib.sha256(board_file.read()).hexdigest()
+    description = json.dumps({"configuration": configuration, \
+                              "number_of_games": number_of_games, \
+                              "master_seed": master_seed, \
+                              "engine_version": ENGINE_VERSION, \
+                              "board": board}, sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()[:32]
+
+def configured_game(configuration):
+    """Create the game of a configuration"""
+    configuration = dict(DEFAULT_CONFIGURATION, **configuration)
+    return GameState(configuration["number_of_players"], \
+                     board=load_board(**configuration["board_changes"]), \
+                     roster=configuration["roster"] or CHARACTER_NAMES, \
+                     random_order=configuration["random_order"])
+
+def play_configuration(configuration, master_seed, simulation_runs):
+    """Play a range of simulation runs of a configuration (one task)"""
+    game = configured_game(configuration)
+    statistics = GameStatistics()
+    for game_result, _ in game.play_many(len(simulation_runs), master_seed, \
+                                         simulation_runs.start):
+        statistics.update_values(metric_values(game_result[0], \
+                                               game_result[1], \
+                                               game_result[2:]))
+    statistics.flush()
+    return statistics
+
+def run_task(task):
+    """Unpack a task for the worker pool"""
+    cell, configuration, master_seed, simulation_runs = task
+    return cell, play_configuration(configuration, master_seed, \
+                                    simulation_runs)
+
+def run_sweep(configurations, number_of_games, master_seed, \
+              number_of_workers=1, cache_directory=CACHE_DIRECTORY):
+    """Return the statistics of every configuration, playing missing ones"""
+    if master_seed is None:
+        raise ValueError("A sweep needs a fixed master seed to be cached")
+    statistics = [None] * len(configurations)
+    keys = [configuration_key(configuration, number_of_games, master_seed) \
+            for configuration in configurations]
+    if cache_directory is not None:
+        os.makedirs(cache_directory, exist_ok=True)
+        for cell, key in enumerate(keys):
+            path = os.path.join(cache_directory, key + ".npz")
+            if os.path.exists(path):
+                statistics[cell] = load_statistics(path)
+
+    # Split the missing configurations into tasks of RUNS_PER_TASK games
+    tasks = [(cell, configurations[cell], master_seed, \
+              range(first_run, min(first_run + RUNS_PER_TASK, \
+                                   number_of_games))) \
+             for cell in range(len(configurations)) \
+             if statistics[cell] is None \
+             for first_run in range(0, number_of_games, RUNS_PER_TASK)]
+    remaining = {}
+    for cell, _, _, simulation_runs in tasks:
+        remaining[cell] = remaining.get(cell, 0) + len(simulation_runs)
+        statistics[cell] = GameStatistics()
+
+    def collect(results):
+        for cell, task_statistics in results:
+            statistics[cell].merge(task_statistics)
+            remaining[cell] -= task_statistics.count
+            if remaining[cell] == 0 and cache_directory is not None:
+                # Atomically, a cache entry is used once its .npz exists
+                path = os.path.join(cache_directory, keys[cell])
+                with open(path + ".json.tmp", "w") as description:
+                    json.dump(dict(DEFAULT_CONFIGURATION, \
+                                   **configurations[cell]), description, \
+                              indent=1)
+                os.replace(path + ".json.tmp", path + ".json")
+                with open(path + ".npz.tmp", "wb") as aggregate:
+                    statistics[cell].save(aggregate)
+                os.replace(path + ".npz.tmp", path + ".npz")
+
+    if number_of_workers == 1:
+        collect(map(run_task, tasks))
+    else:
+        with Pool(number_of_workers) as pool:
+            collect(pool.imap(run_task, tasks))
+    return statistics
+
+def describe(configuration):
+    """Return the entries of a configuration that differ from the default"""
+    return ", ".join("{}={}".format(name, value) for name, value in \
+                     sorted(configuration.items()) \
+                     if DEFAULT_CONFIGURATION.get(name) != value) or "default"
+
+
+if __name__ == "__main__":
+    # Draw a master seed, printed so the sweep can be repeated
+    if MASTER_SEED is None:
+        MASTER_SEED = int(np.random.SeedSequence().entropy)
+        print("Master seed:", MASTER_SEED, file=sys.stderr)
+
+    CONFIGURATIONS = configuration_grid(SWEEP_GRID)
+    RESULTS = run_sweep(CONFIGURATIONS, NUMBER_OF_SIMULATION_RUNS, \
+                        MASTER_SEED, NUMBER_OF_WORKERS)
+    for CONFIGURATION, STATISTICS in zip(CONFIGURATIONS, RESULTS):
+        MEAN = STATISTICS.mean()
+        LOWER, UPPER = STATISTICS.confidence_interval()
+        print(describe(CONFIGURATION) + ":", "rounds {:.2f} [{:.2f}, {:.2f}]," \
+              .format(MEAN[0], LOWER[0], UPPER[0]), ", ".join( \
+              "{} {:.4f}".format(LABEL, SHARE) for LABEL, SHARE in \
+              zip(CHARACTER_LABELS, MEAN[1:1 + len(CHARACTER_LABELS)])))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Trajectory log for the Donald Duck Holiday Game
+Records the position of the active player after every turn of every
+simulation run as one int8 per player turn. The positions of all runs
+are stored back to back in one .npy file, and a second .npy file holds
+a fixed-width index record per run (offset, number of turns and the
+characters in starting order). Both files can be memory-mapped, so a
+single game is sliced out without parsing text.
+This code has been published under the GNU GPLv3 license
+"""
+import os
+
+import numpy as np
+
+from donald_duck_results import CHARACTER_NAMES, NpyAppender
+
+BUFFER_TURNS = 1000000 # player turns collected before a block is written
+
+INDEX_DTYPE = np.dtype([("SimulationRunID", "<i8"), ("Offset", "<i8"), \
+                        ("NumberOfTurns", "<i4"), \
+                        ("Characters", "i1", (len(CHARACTER_NAMES),))])
+
+def index_path(path):
+    """Return the path of the index belonging to a trajectory file"""
+    root, extension = os.path.splitext(path)
+    return root + ".index" + (extension or ".npy")
+
+
+class TrajectoryRecorder:
+    """Append the trajectories of finished games to a trajectory file
+
+    With resume_from (a value returned by checkpoint), existing files
+    are cut back to the checkpoint and appended to.
+    """
+    def __init__(self, path, buffer_turns=BUFFER_TURNS, resume_from=None):
+        offset, number_of_runs = resume_from or (None, None)
+        self.buffer_turns = buffer_turns
+        self.positions = NpyAppender(path, np.int8, offset)
+        self.index = NpyAppender(index_path(path), INDEX_DTYPE, \
+                                 number_of_runs)
+        self.pending_positions = bytearray()
+        self.pending_index = []
+        self.offset = offset or 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, simulation_run_id, character_names, positions):
+        """Add the positions after each player turn of one game"""
+        characters = [CHARACTER_NAMES.index(name) for name in character_names]
+        characters += [-1] * (len(CHARACTER_NAMES) - len(characters))
+        self.pending_index.append((simulation_run_id, self.offset, \
+                                   len(positions), characters))
+        self.pending_positions += positions
+        self.offset += len(positions)
+        if len(self.pending_positions) >= self.buffer_turns:
+            self.flush()
+
+    def flush(self):
+        """Write the collected trajectories as one block"""
+        self.positions.write(np.frombuffer(self.pending_positions, np.int8))
+        self.index.write(self.pending_index)
+        self.pending_positions = bytearray()
+        self.pending_index = []
+
+    def checkpoint(self):
+        """Write and sync the collected trajectories, return resume position"""
+        self.flush()
+        self.positions.sync()
+        self.index.sync()
+        return [self.offset, self.index.number_of_rows]
+
+    def close(self):
+        """Write the remaining trajectories and close both files"""
+        self.flush()
+        self.positions.close()
+        self.index.close()
+
+
+class TrajectoryReader:
+    """Slice games out of a memory-mapped trajectory file"""
+    def __init__(self, path):
+        self.positions = np.load(path, mmap_mode="r")
+        self.index = np.load(index_path(path))
+
+    def __len__(self):
+        return len(self.index)
+
+    def record(self, simulation_run_id):
+        """Return the index record of a simulation run"""
+        run = np.searchsorted(self.index["SimulationRunID"], simulation_run_id)
+        if run == len(self.index) or \
+           self.index["SimulationRunID"][run] != simulation_run_id:
+            raise KeyError("No trajectory for simulation run " + \
+                           str(simulation_run_id))
+        return self.index[run]
+
+    def character_names(self, simulation_run_id):
+        """Return the characters of a simulation run in starting order"""
+        return [CHARACTER_NAMES[character] for character in \
+                self.record(simulation_run_id)["Characters"] if character >= 0]
+
+    def turns(self, simulation_run_id):
+        """Return the position after every player turn of a simulation run"""
+        record = self.record(simulation_run_id)
+        return self.positions[record["Offset"]: \
+                              record["Offset"] + record["NumberOfTurns"]]
+
+    def rounds(self, simulation_run_id):
+        """Return positions per round (rows) and player (columns)
+
+        Players that did not get a turn in the final round are set to -1.
+        """
+        number_of_players = len(self.character_names(simulation_run_id))
+        turns = self.turns(simulation_run_id)
+        rounds = np.full(-(-len(turns) // number_of_players) * \
+                         number_of_players, -1, dtype=np.int8)
+        rounds[:len(turns)] = turns
+        return rounds.reshape(-1, number_of_players)
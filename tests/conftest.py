@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Test setup for the Donald Duck Holiday Game
+The modules live in the repository root, next to this directory.
+This code has been published under the GNU GPLv3 license
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath( \
+    __file__))))
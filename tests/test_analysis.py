@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Regression tests of the analysis of Donald Duck Holiday Game results
+This code has been published under the GNU GPLv3 license
+"""
+import numpy as np
+
+from donald_duck_analysis import analyse, open_results
+from donald_duck_holiday_game import main
+
+def test_unplayed_positions(tmp_path):
+    """Starting positions nobody started from have no winner share"""
+    results = str(tmp_path / "GAMERESULTS.txt")
+    main(["-n", "50", "-p", "3", "-s", "1996", "-v", "0", \
+          "--progress-interval", "0", "-o", results])
+    analysis = analyse(open_results(results))
+    shares = analysis.winner_shares()
+    assert np.isnan(shares[:, 4:]).all() and not np.isnan(shares[:, :4]).any()
+    assert analysis.report().splitlines()[4].endswith("n/a      n/a")
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Tests that the batch engine plays the rules of the scalar engine
+This code has been published under the GNU GPLv3 license
+"""
+import numpy as np
+import pytest
+
+from donald_duck_batch import BatchGames, iterate_batches
+from donald_duck_holiday_game import GameState, run_simulations
+from donald_duck_results import CHARACTER_NAMES
+from donald_duck_stats import STATISTIC_COLUMNS, GameStatistics, \
+    metric_values
+
+PARITY_RUNS = 10000 # games per engine
+PARITY_SEED = 1996
+PARITY_Z = 5 # largest z score of a metric for the engines to agree
+
+def engine_parity(number_of_games, number_of_players, seed):
+    """Return the largest z score of the difference between the engines
+    for every metric, over its mean and the frequency of every value"""
+    batch = GameStatistics()
+    for columns in iterate_batches(number_of_games, number_of_players, seed):
+        batch.update_columns(columns)
+    scalar = GameStatistics()
+    for game_result, _ in run_simulations(number_of_games, \
+                                          number_of_players, 1, seed):
+        scalar.update_values(metric_values(game_result[0], game_result[1], \
+                                           game_result[2:]))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_z = (batch.mean() - scalar.mean()) / \
+                 np.sqrt(batch.standard_error() ** 2 + \
+                         scalar.standard_error() ** 2)
+        pooled = (batch.histogram + scalar.histogram) / \
+                 (batch.count + scalar.count)
+        frequency_z = (batch.histogram / batch.count - \
+                       scalar.histogram / scalar.count) / \
+                      np.sqrt(pooled * (1 - pooled) * \
+                              (1 / batch.count + 1 / scalar.count))
+    # Metrics and values that never vary have no z score
+    mean_z = np.nan_to_num(mean_z, nan=0.0)
+    frequency_z = np.nan_to_num(frequency_z, nan=0.0)
+    return np.maximum(np.abs(mean_z), np.abs(frequency_z).max(axis=1))
+
+
+class OnesGame(GameState):
+    """Game that always throws 1"""
+    def dicethrow(self):
+        return 1
+
+
+class OnesBatch(BatchGames):
+    """Batch of games that always throw 1"""
+    def dicethrow(self, size):
+        return np.ones(size, dtype=np.int64)
+
+
+@pytest.mark.parametrize("character_name, entry", \
+                         [("Clarabelle", 45), ("Goofy", 100)])
+def test_staying_on_a_shortcut(character_name, entry):
+    """A throw too small to leave a shortcut keeps the entry square"""
+    roster = (character_name, "Donald")
+    game = OnesGame(2, roster=roster, random_order=False)
+    game.new_game(1)
+    for player in game.active_characters:
+        player.allowed_to_start = True
+    player = game.active_characters[0]
+    player.position_on_board = entry
+    player.shortcut_position = 1
+    game.step_turn()
+    assert (player.position_on_board, player.shortcut_position) == \
+           (entry, 2)
+
+    batch = OnesBatch(1, 2, np.random.default_rng(1))
+    batch.character[:, 0] = [CHARACTER_NAMES.index(name) for name in roster]
+    batch.allowed_to_start[:] = True
+    batch.position_on_board[0, 0] = entry
+    batch.shortcut_position[0, 0] = 1
+    batch.play_turn(0)
+    assert (batch.position_on_board[0, 0], \
+            batch.shortcut_position[0, 0]) == (entry, 2)
+
+@pytest.mark.parametrize("number_of_players", [3, 5])
+def test_engine_parity(number_of_players):
+    """Every metric has the same distribution in both engines"""
+    z_scores = engine_parity(PARITY_RUNS, number_of_players, PARITY_SEED)
+    assert [name for name, z_score in zip(STATISTIC_COLUMNS, z_scores) \
+            if z_score > PARITY_Z] == []
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Regression tests of the simulation script of the Donald Duck Holiday Game
+This code has been published under the GNU GPLv3 license
+"""
+import hashlib
+import os
+
+import pytest
+
+import donald_duck_holiday_game
+from donald_duck_checkpoint import checkpoint_path
+from donald_duck_holiday_game import main
+from donald_duck_results import read_results
+
+# GAMERESULTS.txt of 100 runs with master seed 1996, update together
+# with ENGINE_VERSION
+BASELINE_SHA256 = \
+    "12bcc441c04af70d3016a61e8c7e1215238772fc367c3148844463ed6f610721"
+
+def simulate(results, *options):
+    """Run the script quietly, writing the results to a file"""
+    main(["-n", "100", "-s", "1996", "-w", "1", "-v", "0", \
+          "--progress-interval", "0", "-o", str(results)] + list(options))
+    return results.read_bytes()
+
+def test_baseline(tmp_path):
+    """A fixed master seed gives the baseline results"""
+    results = simulate(tmp_path / "GAMERESULTS.txt", \
+                       "--checkpoint-interval", "0")
+    assert hashlib.sha256(results).hexdigest() == BASELINE_SHA256
+
+def test_worker_count(tmp_path):
+    """The results do not depend on the number of workers"""
+    assert simulate(tmp_path / "GAMERESULTS.txt", "-w", "2") == \
+           simulate(tmp_path / "GAMERESULTS1.txt")
+
+@pytest.mark.parametrize("extension", [".txt", ".npy", ".sqlite"])
+def test_checkpoint_resume(tmp_path, monkeypatch, extension):
+    """A batch stopped after a checkpoint resumes to the same results"""
+    run_simulations = donald_duck_holiday_game.run_simulations
+
+    def interrupted(*args):
+        for simulation_run, game in enumerate(run_simulations(*args)):
+            if simulation_run == 60:
+                raise KeyboardInterrupt
+            yield game
+
+    results = tmp_path / ("GAMERESULTS" + extension)
+    monkeypatch.setattr(donald_duck_holiday_game, "run_simulations", \
+                        interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        simulate(results, "--checkpoint-interval", "1e-9")
+    assert os.path.exists(checkpoint_path(str(results)))
+    monkeypatch.undo()
+    simulate(results, "--checkpoint-interval", "1e-9")
+    complete = tmp_path / ("complete" + extension)
+    simulate(complete, "--checkpoint-interval", "0")
+    # Compared by record, an SQLite file is laid out differently
+    assert read_results(str(results)).tobytes() == \
+           read_results(str(complete)).tobytes()
+
+@pytest.mark.parametrize("engine", ["scalar", "batch"])
+@pytest.mark.parametrize("players", ["1", "6"])
+def test_number_of_players(engine, players):
+    """The command line rejects numbers of players the game has no rules for"""
+    with pytest.raises(SystemExit):
+        main(["-p", players, "-e", engine, "--no-results"])
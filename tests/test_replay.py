@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Regression tests of the replay of the Donald Duck Holiday Game
+This code has been published under the GNU GPLv3 license
+"""
+import pytest
+
+from donald_duck_holiday_game import main as simulate
+from donald_duck_replay import main
+
+def test_replay(tmp_path, capsys):
+    """A replayed run is as in the results file, a missing run is refused"""
+    results = str(tmp_path / "GAMERESULTS.txt")
+    simulate(["-n", "20", "-s", "1996", "-v", "0", "--progress-interval", \
+              "0", "-o", results])
+    main([results, "3"])
+    assert capsys.readouterr().out.endswith(", as in the results file\n")
+    with pytest.raises(SystemExit):
+        main([results, "21"])
+    assert "Simulation run 21 is not in the results" in \
+           capsys.readouterr().err
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Regression tests of the sharded runner of the Donald Duck Holiday Game
+This code has been published under the GNU GPLv3 license
+"""
+import numpy as np
+import pytest
+
+from donald_duck_shards import SpoolQueue, collect, play_shard, run_worker, \
+    submit_job
+
+def test_merge(tmp_path):
+    """Merged shards equal a single-process run of the same seed"""
+    queue = SpoolQueue(str(tmp_path / "spool"))
+    job = submit_job(queue, 250, 1996, {"number_of_players": 3}, 60)
+    assert run_worker(queue) == 5
+    statistics, totals = collect(queue)
+    single_statistics, single_totals = play_shard(job, {"first_run": 0, \
+                                                        "last_run": 250})
+    assert np.array_equal(totals, single_totals)
+    assert statistics.count == single_statistics.count == 250
+    assert np.allclose(statistics.mean(), single_statistics.mean())
+    assert np.allclose(statistics.variance(), single_statistics.variance())
+
+def test_used_spool(tmp_path):
+    """A job is not submitted into the spool directory of another job"""
+    queue = SpoolQueue(str(tmp_path / "spool"))
+    submit_job(queue, 10, 1996, shard_size=5)
+    with pytest.raises(ValueError):
+        submit_job(queue, 10, 1997, shard_size=5)
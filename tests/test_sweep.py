@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Regression tests of the parameter sweep of the Donald Duck Holiday Game
+This code has been published under the GNU GPLv3 license
+"""
+import numpy as np
+import pytest
+
+import donald_duck_sweep
+from donald_duck_sweep import DEFAULT_CONFIGURATION, run_sweep
+
+def test_cache_hit(tmp_path, monkeypatch):
+    """A cached configuration is loaded instead of played again"""
+    cache_directory = str(tmp_path / "cache")
+    played = run_sweep([{"number_of_players": 2}], 50, 1996, \
+                       cache_directory=cache_directory)
+
+    def run_task(task):
+        raise AssertionError("Played a cached configuration")
+
+    monkeypatch.setattr(donald_duck_sweep, "run_task", run_task)
+    # Left out entries are cached as their defaults
+    cached = run_sweep([dict(DEFAULT_CONFIGURATION, number_of_players=2)], \
+                       50, 1996, cache_directory=cache_directory)
+    assert cached[0].count == played[0].count == 50
+    assert np.allclose(cached[0].mean(), played[0].mean())
+    with pytest.raises(AssertionError):
+        run_sweep([{"number_of_players": 2}], 50, 1997, \
+                  cache_directory=cache_directory)